@@ -0,0 +1,94 @@
+"""add hot-path indexes for company/period lookups
+
+Revision ID: 2ae1412db184
+Revises: caef4cd19613
+Create Date: 2025-10-06 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2ae1412db184'
+down_revision: Union[str, Sequence[str], None] = 'caef4cd19613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, columns, partial predicate)
+HOT_PATH_INDEXES = [
+    # Engine fetch, input→KPI mapper and /dashboard/latest-period
+    (
+        "ix_esg_form_submissions_current_lookup",
+        "esg_form_submissions",
+        ["company_id", "reporting_period", "methodology"],
+        "is_current",
+    ),
+    # /form-submissions/historic
+    (
+        "ix_esg_form_submissions_historic",
+        "esg_form_submissions",
+        ["company_id", "reporting_period", "updated_at"],
+        "NOT is_current",
+    ),
+    # /kpi-mappings/form-fields dropdown
+    (
+        "ix_esg_form_submissions_kpi_fields",
+        "esg_form_submissions",
+        ["form_field"],
+        "is_kpi",
+    ),
+    # Engine clears and rewrites scores per company + period
+    ("ix_esg_raw_scores_company_period", "esg_raw_scores", ["company_id", "reporting_period"], None),
+    ("ix_esg_final_scores_company_period", "esg_final_scores", ["company_id", "reporting_period"], None),
+    # Weight lookups (engine, /weights/*, /engine/weights-check)
+    (
+        "ix_esg_kpi_weights_company_current",
+        "esg_kpi_weights",
+        ["company_id", "reporting_period"],
+        "is_current",
+    ),
+    ("ix_esg_pillar_weights_company_period", "esg_pillar_weights", ["company_id", "reporting_period"], None),
+    # Current mapping set for the engine and /kpi-mappings/current/{period}
+    (
+        "ix_esg_kpi_mappings_current",
+        "esg_kpi_mappings",
+        ["reporting_period", "form_field"],
+        "is_current",
+    ),
+    # /kpi-mappings/history/{form_field}
+    ("ix_esg_kpi_mappings_history", "esg_kpi_mappings", ["form_field", "updated_at"], None),
+]
+
+
+def upgrade() -> None:
+    """Create composite + partial indexes without locking writers."""
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in HOT_PATH_INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+            )
+    # Refresh planner statistics so the new indexes are picked up immediately
+    for table in sorted({table for _, table, _, _ in HOT_PATH_INDEXES}):
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    """Drop the hot-path indexes."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(HOT_PATH_INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                if_exists=True,
+                postgresql_concurrently=True,
+            )
@@ -0,0 +1,91 @@
+"""esg_score_rankings: rank only companies with a score
+
+Revision ID: 2c7d5b9e3f14
+Revises: 9a1c6e4d2b37
+Create Date: 2025-10-17 11:03:41.902115
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2c7d5b9e3f14'
+down_revision: Union[str, Sequence[str], None] = '9a1c6e4d2b37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# metric column in esg_final_scores → prefix used in the view
+METRICS = {
+    "final_esg_score": "final",
+    "environmental_score": "environmental",
+    "social_score": "social",
+    "governance_score": "governance",
+}
+
+
+def _ranked(scored_only: bool) -> str:
+    if scored_only:
+        # NULL scores get NULL rank/percentile and don't count towards anyone else's position
+        template = """
+            CASE WHEN {src} IS NOT NULL THEN
+                rank() OVER (PARTITION BY reporting_period, {src} IS NULL ORDER BY {src} DESC) END AS {name}_rank,
+            CASE WHEN {src} IS NOT NULL THEN
+                percent_rank() OVER (PARTITION BY reporting_period, {src} IS NULL ORDER BY {src} ASC) END AS {name}_percentile"""
+    else:
+        template = """
+            rank() OVER (PARTITION BY reporting_period ORDER BY {src} DESC NULLS LAST) AS {name}_rank,
+            percent_rank() OVER (PARTITION BY reporting_period ORDER BY {src} ASC NULLS FIRST) AS {name}_percentile"""
+    return ",\n".join(template.format(src=src, name=name) for src, name in METRICS.items())
+
+
+def _create_view(scored_only: bool) -> None:
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS esg_score_rankings")
+    op.execute(f"""
+        CREATE MATERIALIZED VIEW esg_score_rankings AS
+        WITH latest AS (
+            SELECT DISTINCT ON (company_id, reporting_period)
+                company_id, reporting_period,
+                final_esg_score, environmental_score, social_score, governance_score
+            FROM esg_final_scores
+            ORDER BY company_id, reporting_period, id DESC
+        )
+        SELECT
+            company_id,
+            reporting_period,
+            final_esg_score::float8 AS final_score,
+            environmental_score::float8 AS environmental,
+            social_score::float8 AS social,
+            governance_score::float8 AS governance,
+            count(*) OVER (PARTITION BY reporting_period) AS companies_in_period,
+            {_ranked(scored_only)}
+        FROM latest
+        WITH DATA
+    """)
+
+    # Unique index: required for REFRESH ... CONCURRENTLY
+    op.create_index(
+        "ux_esg_score_rankings_period_company",
+        "esg_score_rankings",
+        ["reporting_period", "company_id"],
+        unique=True,
+    )
+    # Keyset pagination: (period, rank, company_id) per metric
+    for name in METRICS.values():
+        op.create_index(
+            f"ix_esg_score_rankings_{name}_rank",
+            "esg_score_rankings",
+            ["reporting_period", f"{name}_rank", "company_id"],
+        )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_view(scored_only=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _create_view(scored_only=False)
@@ -0,0 +1,32 @@
+"""add cache invalidation version sequences
+
+Revision ID: 3f6b1d2a9c47
+Revises: ec39ced86029
+Create Date: 2025-10-15 10:42:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6b1d2a9c47'
+down_revision: Union[str, Sequence[str], None] = 'ec39ced86029'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# One counter per cache topic (backend.services.cache_bus.TOPICS)
+TOPICS = ("kpi_catalog", "kpi_mappings", "weights", "weight_profile", "form_fields", "schema")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for topic in TOPICS:
+        op.execute(f"CREATE SEQUENCE IF NOT EXISTS cache_version_{topic}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for topic in TOPICS:
+        op.execute(f"DROP SEQUENCE IF EXISTS cache_version_{topic}")
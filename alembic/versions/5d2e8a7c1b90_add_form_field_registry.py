@@ -0,0 +1,67 @@
+"""add form_field_registry, backfilled from esg_form_submissions
+
+Revision ID: 5d2e8a7c1b90
+Revises: 3f6b1d2a9c47
+Create Date: 2025-10-15 15:08:53.274611
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5d2e8a7c1b90'
+down_revision: Union[str, Sequence[str], None] = '3f6b1d2a9c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'form_field_registry',
+        sa.Column('form_field', sa.String(), nullable=False),
+        sa.Column('label', sa.String(), nullable=True),
+        sa.Column('is_kpi', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+        sa.Column('in_schema', sa.Boolean(), server_default=sa.text('false'), nullable=False),
+        sa.Column('usage_count', sa.Integer(), server_default=sa.text('0'), nullable=False),
+        sa.Column('last_seen_period', sa.Date(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('form_field'),
+    )
+    op.create_index(
+        'ix_form_field_registry_kpi_prefix',
+        'form_field_registry',
+        ['form_field'],
+        postgresql_ops={'form_field': 'text_pattern_ops'},
+        postgresql_where=sa.text('is_kpi'),
+    )
+
+    # One-time scan of existing submissions; schema fields are seeded at app startup
+    op.execute(
+        """
+        INSERT INTO form_field_registry (form_field, is_kpi, usage_count, last_seen_period)
+        SELECT form_field, bool_or(COALESCE(is_kpi, false)), count(*), max(reporting_period)
+        FROM esg_form_submissions
+        WHERE form_field IS NOT NULL
+        GROUP BY form_field
+        """
+    )
+
+    # Only served the old SELECT DISTINCT dropdown query
+    op.execute("DROP INDEX IF EXISTS ix_esg_form_submissions_kpi_fields")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index(
+        'ix_esg_form_submissions_kpi_fields',
+        'esg_form_submissions',
+        ['form_field'],
+        postgresql_where=sa.text('is_kpi'),
+    )
+    op.drop_index('ix_form_field_registry_kpi_prefix', table_name='form_field_registry')
+    op.drop_table('form_field_registry')
@@ -0,0 +1,49 @@
+"""add idempotency_keys (Idempotency-Key replays shared by all workers)
+
+Revision ID: 6e3b8d1f4a52
+Revises: 2c7d5b9e3f14
+Create Date: 2025-10-17 14:27:50.116438
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e3b8d1f4a52'
+down_revision: Union[str, Sequence[str], None] = '2c7d5b9e3f14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'idempotency_keys',
+        sa.Column('scope', sa.String(), nullable=False),
+        sa.Column('client_id', sa.String(), nullable=False),
+        sa.Column('key', sa.String(), nullable=False),
+        sa.Column('fingerprint', sa.String(), nullable=False),
+        sa.Column('state', sa.String(), server_default='in_flight', nullable=False),
+        sa.Column('status_code', sa.Integer(), nullable=True),
+        sa.Column('body', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('headers', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+        sa.Column('claimed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('scope', 'client_id', 'key'),
+    )
+    op.create_index(
+        'ix_idempotency_keys_completed',
+        'idempotency_keys',
+        ['completed_at'],
+        postgresql_where=sa.text("state = 'done'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_idempotency_keys_completed', table_name='idempotency_keys')
+    op.drop_table('idempotency_keys')
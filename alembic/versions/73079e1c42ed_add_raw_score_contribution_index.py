@@ -0,0 +1,42 @@
+"""add raw score contribution index for the KPI drilldown
+
+Revision ID: 73079e1c42ed
+Revises: ef81c5e25a70
+Create Date: 2025-10-10 14:08:52.611940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '73079e1c42ed'
+down_revision: Union[str, Sequence[str], None] = 'ef81c5e25a70'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """/dashboard/scores/{company_id}/{period}/kpis: filter + sort + keyset from one index."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_esg_raw_scores_contribution",
+            "esg_raw_scores",
+            ["company_id", "reporting_period", "weighted_score", "id"],
+            unique=False,
+            if_not_exists=True,
+            postgresql_concurrently=True,
+        )
+    op.execute("ANALYZE esg_raw_scores")
+
+
+def downgrade() -> None:
+    """Drop the contribution index."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_esg_raw_scores_contribution",
+            table_name="esg_raw_scores",
+            if_exists=True,
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,59 @@
+"""add valid_from/valid_to to KPI and pillar weights
+
+Revision ID: 732d280267c2
+Revises: 73079e1c42ed
+Create Date: 2025-10-13 09:52:40.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '732d280267c2'
+down_revision: Union[str, Sequence[str], None] = '73079e1c42ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+WEIGHT_TABLES = ["esg_kpi_weights", "esg_pillar_weights"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in WEIGHT_TABLES:
+        op.add_column(table, sa.Column('valid_from', sa.Date(), nullable=True))
+        op.add_column(table, sa.Column('valid_to', sa.Date(), nullable=True))
+
+        # Each saved set is in force from its reporting_period until the next set starts
+        op.execute(f"UPDATE {table} SET valid_from = reporting_period")
+        op.execute(f"""
+            UPDATE {table} w
+            SET valid_to = s.next_from
+            FROM (
+                SELECT company_id, valid_from,
+                       lead(valid_from) OVER (PARTITION BY company_id ORDER BY valid_from) AS next_from
+                FROM (SELECT DISTINCT company_id, valid_from FROM {table} WHERE is_current) sets
+            ) s
+            WHERE w.company_id = s.company_id
+              AND w.valid_from = s.valid_from
+              AND w.is_current
+        """)
+        op.alter_column(table, 'valid_from', nullable=False)
+
+        op.create_index(
+            f"ix_{table}_company_valid",
+            table,
+            ["company_id", "valid_from"],
+            postgresql_where=sa.text("is_current"),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(WEIGHT_TABLES):
+        op.drop_index(f"ix_{table}_company_valid", table_name=table)
+        op.drop_column(table, 'valid_to')
+        op.drop_column(table, 'valid_from')
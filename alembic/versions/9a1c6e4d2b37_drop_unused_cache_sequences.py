@@ -0,0 +1,32 @@
+"""drop cache version sequences for topics without consumers
+
+Revision ID: 9a1c6e4d2b37
+Revises: 5d2e8a7c1b90
+Create Date: 2025-10-17 09:12:04.318562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a1c6e4d2b37'
+down_revision: Union[str, Sequence[str], None] = '5d2e8a7c1b90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# form_fields had no registered cache; schema reloads by file mtime
+TOPICS = ("form_fields", "schema")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for topic in TOPICS:
+        op.execute(f"DROP SEQUENCE IF EXISTS cache_version_{topic}")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for topic in TOPICS:
+        op.execute(f"CREATE SEQUENCE IF NOT EXISTS cache_version_{topic}")
@@ -0,0 +1,58 @@
+"""add esg_submission_snapshots (one JSONB row per company + period)
+
+Revision ID: c94ba8fbfa4a
+Revises: 2ae1412db184
+Create Date: 2025-10-08 09:41:17.520331
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c94ba8fbfa4a'
+down_revision: Union[str, Sequence[str], None] = '2ae1412db184'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'esg_submission_snapshots',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('reporting_period', sa.Date(), nullable=False),
+        sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=False,
+                  server_default=sa.text("'{}'::jsonb")),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_id', 'reporting_period'),
+    )
+
+    # Backfill from the current EAV rows
+    op.execute("""
+        INSERT INTO esg_submission_snapshots (company_id, reporting_period, data, updated_at)
+        SELECT
+            company_id,
+            reporting_period,
+            jsonb_object_agg(
+                form_field,
+                jsonb_build_object(
+                    'value', field_value,
+                    'is_kpi', is_kpi,
+                    'methodology', methodology,
+                    'updated_at', updated_at
+                )
+            ),
+            max(updated_at)
+        FROM esg_form_submissions
+        WHERE is_current
+        GROUP BY company_id, reporting_period
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('esg_submission_snapshots')
@@ -0,0 +1,43 @@
+"""add company_latest_period lookup
+
+Revision ID: e4ad1bf37ec9
+Revises: c94ba8fbfa4a
+Create Date: 2025-10-08 15:02:44.183265
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4ad1bf37ec9'
+down_revision: Union[str, Sequence[str], None] = 'c94ba8fbfa4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'company_latest_period',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('latest_period', sa.Date(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_id'),
+    )
+
+    # Backfill from the current submissions
+    op.execute("""
+        INSERT INTO company_latest_period (company_id, latest_period)
+        SELECT company_id, max(reporting_period)
+        FROM esg_form_submissions
+        WHERE is_current
+        GROUP BY company_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('company_latest_period')
@@ -0,0 +1,73 @@
+"""add weight profiles, company assignments and sparse overrides
+
+Revision ID: ec39ced86029
+Revises: 732d280267c2
+Create Date: 2025-10-14 16:20:11.094512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ec39ced86029'
+down_revision: Union[str, Sequence[str], None] = '732d280267c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'weight_profiles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    op.create_index(op.f('ix_weight_profiles_id'), 'weight_profiles', ['id'], unique=False)
+
+    op.create_table(
+        'weight_profile_entries',
+        sa.Column('profile_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('weight', sa.Numeric(), nullable=False),
+        sa.ForeignKeyConstraint(['profile_id'], ['weight_profiles.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('profile_id', 'kind', 'code'),
+    )
+
+    op.create_table(
+        'company_weight_profiles',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('profile_id', sa.Integer(), nullable=False),
+        sa.Column('assigned_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['profile_id'], ['weight_profiles.id']),
+        sa.PrimaryKeyConstraint('company_id'),
+    )
+    op.create_index('ix_company_weight_profiles_profile', 'company_weight_profiles', ['profile_id'])
+
+    op.create_table(
+        'company_weight_overrides',
+        sa.Column('company_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('code', sa.String(), nullable=False),
+        sa.Column('weight', sa.Numeric(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('company_id', 'kind', 'code'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('company_weight_overrides')
+    op.drop_index('ix_company_weight_profiles_profile', table_name='company_weight_profiles')
+    op.drop_table('company_weight_profiles')
+    op.drop_table('weight_profile_entries')
+    op.drop_index(op.f('ix_weight_profiles_id'), table_name='weight_profiles')
+    op.drop_table('weight_profiles')
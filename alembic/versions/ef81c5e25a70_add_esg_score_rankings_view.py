@@ -0,0 +1,78 @@
+"""add esg_score_rankings materialized view
+
+Revision ID: ef81c5e25a70
+Revises: e4ad1bf37ec9
+Create Date: 2025-10-09 11:26:05.774912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ef81c5e25a70'
+down_revision: Union[str, Sequence[str], None] = 'e4ad1bf37ec9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# metric column in esg_final_scores → prefix used in the view
+METRICS = {
+    "final_esg_score": "final",
+    "environmental_score": "environmental",
+    "social_score": "social",
+    "governance_score": "governance",
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    ranked = ",\n".join(
+        f"""
+            rank() OVER (PARTITION BY reporting_period ORDER BY {src} DESC NULLS LAST) AS {name}_rank,
+            percent_rank() OVER (PARTITION BY reporting_period ORDER BY {src} ASC NULLS FIRST) AS {name}_percentile"""
+        for src, name in METRICS.items()
+    )
+    op.execute(f"""
+        CREATE MATERIALIZED VIEW esg_score_rankings AS
+        WITH latest AS (
+            SELECT DISTINCT ON (company_id, reporting_period)
+                company_id, reporting_period,
+                final_esg_score, environmental_score, social_score, governance_score
+            FROM esg_final_scores
+            ORDER BY company_id, reporting_period, id DESC
+        )
+        SELECT
+            company_id,
+            reporting_period,
+            final_esg_score::float8 AS final_score,
+            environmental_score::float8 AS environmental,
+            social_score::float8 AS social,
+            governance_score::float8 AS governance,
+            count(*) OVER (PARTITION BY reporting_period) AS companies_in_period,
+            {ranked}
+        FROM latest
+        WITH DATA
+    """)
+
+    # Unique index: required for REFRESH ... CONCURRENTLY
+    op.create_index(
+        "ux_esg_score_rankings_period_company",
+        "esg_score_rankings",
+        ["reporting_period", "company_id"],
+        unique=True,
+    )
+    # Keyset pagination: (period, rank, company_id) per metric
+    for name in METRICS.values():
+        op.create_index(
+            f"ix_esg_score_rankings_{name}_rank",
+            "esg_score_rankings",
+            ["reporting_period", f"{name}_rank", "company_id"],
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS esg_score_rankings")
@@ -1,10 +1,13 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 import json
-from pathlib import Path
-import psycopg2   # 👈 missing import
-import re
+from typing import List, Optional
+from psycopg2.extras import execute_values
+
+from backend.database import engine
+from backend.services.schema_artifact import ARTIFACT_PATH, load_artifact
+from backend.services.schema_registry import SchemaDocument
 
 app = FastAPI()
 
@@ -17,29 +20,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Paths
-BASE_DIR = Path(__file__).resolve().parent.parent
-UI_SCHEMA_PATH = BASE_DIR / "esg_schema_gui.json"
-VALIDATION_SCHEMA_PATH = BASE_DIR / "esg_validation_schema.json"
-
-# Load schemas
-with open(UI_SCHEMA_PATH, "r", encoding="utf-8") as f:
-    ESG_UI_SCHEMA = json.load(f)
-
-with open(VALIDATION_SCHEMA_PATH, "r", encoding="utf-8") as f:
-    ESG_VALIDATION_SCHEMA = json.load(f)
+# Schemas come from the prebuilt artifact (backend/scripts/build_schema_artifact.py),
+# loaded once and reloaded when the file changes
+ui_schema_document = SchemaDocument(ARTIFACT_PATH, transform=lambda a: a["ui_tree"], default={})
+validation_schema_document = SchemaDocument(
+    ARTIFACT_PATH, transform=lambda a: a["validation_rules"], default={}
+)
+VALIDATION_RULES = load_artifact().compiled_rules
 
 
 @app.get("/schema")
-def get_schema():
+def get_schema(request: Request):
     """Return schema for frontend UI rendering"""
-    return ESG_UI_SCHEMA
+    return ui_schema_document.response(request)
 
 
 @app.get("/validation-schema")
-def get_validation_schema():
+def get_validation_schema(request: Request):
     """Return schema used for backend validation rules"""
-    return ESG_VALIDATION_SCHEMA
+    return validation_schema_document.response(request)
 
 
 # ✅ Model for submissions
@@ -49,52 +48,89 @@ class ESGSubmission(BaseModel):
     metrics: dict
 
 
+# Rows per INSERT statement for bulk loads
+SUBMIT_PAGE_SIZE = 1000
+
+
+def validate_metrics(metrics: dict) -> Optional[str]:
+    """Check only the submitted keys against the precompiled rules; return the first error."""
+    for field, value in metrics.items():
+        rules = VALIDATION_RULES.get(field)
+        if rules is None:
+            continue
+
+        if rules.type == "numeric":
+            try:
+                val = float(value)
+            except (TypeError, ValueError):
+                return f"{field} must be a number"
+            if rules.min is not None and val < rules.min:
+                return f"{field} must be ≥ {rules.min}"
+            if rules.max is not None and val > rules.max:
+                return f"{field} must be ≤ {rules.max}"
+
+        elif rules.type == "regex" and rules.pattern:
+            if not rules.pattern.match(str(value)):
+                return f"{field} must match {rules.pattern.pattern}"
+
+        elif rules.type == "boolean":
+            if not isinstance(value, bool):
+                return f"{field} must be true/false"
+    return None
+
+
+def insert_metrics(submissions: List[ESGSubmission]):
+    """Insert rows on a pooled connection, SUBMIT_PAGE_SIZE rows per statement."""
+    rows = [(s.company_id, s.year, json.dumps(s.metrics)) for s in submissions]
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            execute_values(
+                cur,
+                "INSERT INTO esg_metrics (company_id, year, metrics) VALUES %s",
+                rows,
+                template="(%s, %s, %s::jsonb)",
+                page_size=SUBMIT_PAGE_SIZE,
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()  # returns the connection to the pool
+
+
 # ✅ Endpoint to save data
 @app.post("/submit")
 def submit_data(data: ESGSubmission):
-    # ✅ Validation loop
-    for field, rules in ESG_VALIDATION_SCHEMA.items():   # 👈 fixed name
-        if field in data.metrics:
-            value = data.metrics[field]
-
-            if rules["type"] == "numeric":
-                try:
-                    val = float(value)
-                    if "min" in rules and val < rules["min"]:
-                        return {"status": "error", "message": f"{field} must be ≥ {rules['min']}"}
-                    if "max" in rules and val > rules["max"]:
-                        return {"status": "error", "message": f"{field} must be ≤ {rules['max']}"}
-                except ValueError:
-                    return {"status": "error", "message": f"{field} must be a number"}
-
-            if rules["type"] == "regex":
-                if not re.match(rules["pattern"], str(value)):
-                    return {"status": "error", "message": f"{field} must match {rules['pattern']}"}
-
-            if rules["type"] == "boolean":
-                if not isinstance(value, bool):
-                    return {"status": "error", "message": f"{field} must be true/false"}
-
-    # ✅ If all validations pass → insert into DB
+    error = validate_metrics(data.metrics)
+    if error:
+        return {"status": "error", "message": error}
+
+    # ✅ If all validations pass → insert into DB (shared connection pool)
     try:
-        conn = psycopg2.connect(
-            dbname="esgdb",
-            user="esguser",
-            password="esgpass",
-            host="localhost",
-            port="5432"
-        )
-        cur = conn.cursor()
-        cur.execute(
-            """
-            INSERT INTO esg_metrics (company_id, year, metrics)
-            VALUES (%s, %s, %s)
-            """,
-            (data.company_id, data.year, json.dumps(data.metrics))
-        )
-        conn.commit()
-        cur.close()
-        conn.close()
+        insert_metrics([data])
         return {"status": "success", "message": "ESG data saved"}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+# ✅ Bulk endpoint for partner systems: all rows are validated, then inserted in one transaction
+@app.post("/submit/batch")
+def submit_batch(data: List[ESGSubmission]):
+    if not data:
+        return {"status": "error", "message": "Empty submission list"}
+
+    errors = []
+    for index, submission in enumerate(data):
+        error = validate_metrics(submission.metrics)
+        if error:
+            errors.append({"index": index, "company_id": submission.company_id, "message": error})
+    if errors:
+        return {"status": "error", "message": f"{len(errors)} submission(s) failed validation", "errors": errors}
+
+    try:
+        insert_metrics(data)
+        return {"status": "success", "message": f"{len(data)} ESG submissions saved", "inserted": len(data)}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
@@ -2,6 +2,11 @@
 
 from sqlalchemy.orm import Session
 from backend.models import esg_scorecard
+from backend.services.mapping_resolver import mapping_resolver
+from backend.services.metrics import registry, timed
+from backend.services.score_stream import publish_scores
+from backend.services.submission_snapshots import snapshot_submissions
+from backend.services.weight_resolver import weight_resolver
 
 
 def normalize_value(value, method: str):
@@ -31,6 +36,11 @@ def normalize_value(value, method: str):
         return max(0.0, min(100.0, v))
 
 
+ENGINE_RUNS = registry.counter("esg_engine_runs_total", "ESG engine runs by outcome", ("outcome",))
+ENGINE_DURATION = registry.histogram("esg_engine_duration_seconds", "ESG engine run time")
+
+
+@timed(ENGINE_DURATION, ENGINE_RUNS)
 def run_esg_engine(company_id: int, reporting_period, db: Session):
     """
     Run ESG scoring engine:
@@ -43,13 +53,17 @@ def run_esg_engine(company_id: int, reporting_period, db: Session):
     """
 
     # -----------------------------
-    # 1. Fetch form submissions
+    # 1. Fetch form submissions (one snapshot row; EAV rows as fallback)
     # -----------------------------
-    submissions = db.query(esg_scorecard.EsgFormSubmission).filter_by(
-        company_id=company_id,
-        reporting_period=reporting_period,
-        is_current=True
-    ).all()
+    snapshot = db.get(esg_scorecard.EsgSubmissionSnapshot, (company_id, reporting_period))
+    if snapshot is not None:
+        submissions = snapshot_submissions(snapshot)
+    else:
+        submissions = db.query(esg_scorecard.EsgFormSubmission).filter_by(
+            company_id=company_id,
+            reporting_period=reporting_period,
+            is_current=True
+        ).all()
 
     if not submissions:
         return {
@@ -77,26 +91,13 @@ def run_esg_engine(company_id: int, reporting_period, db: Session):
     # -----------------------------
     # 3. Load mappings, weights
     # -----------------------------
-    mappings = {
-        m.form_field: {"kpi_code": m.kpi_code, "aggregation_method": m.aggregation_method or "SUM"}
-        for m in db.query(esg_scorecard.ESGKpiMapping).filter_by(is_current=True).all()
-    }
-
-    kpi_weights = {
-        w.kpi_code: float(w.weight)
-        for w in db.query(esg_scorecard.ESGKpiWeight).filter_by(
-            company_id=company_id,
-            is_current=True
-        ).all()
-    }
+    # form_field → KPI table in effect for this period (cached; includes pillar/normalization)
+    mappings = mapping_resolver.for_period(db, reporting_period)
 
-    pillar_weights = {
-        w.pillar: float(w.pillar_weight)
-        for w in db.query(esg_scorecard.ESGPillarWeight).filter_by(
-            company_id=company_id,
-            is_current=True
-        ).all()
-    }
+    # Weights in force on this period (effective-dated, cached per company)
+    weights = weight_resolver.resolve(db, company_id, reporting_period)
+    kpi_weights = weights.kpi
+    pillar_weights = weights.pillar
 
     # -----------------------------
     # 4. Group submissions by form_field and aggregate
@@ -114,13 +115,9 @@ def run_esg_engine(company_id: int, reporting_period, db: Session):
     pillar_scores = {"Environmental": [], "Social": [], "Governance": []}
 
     for form_field, subs in grouped.items():
-        kpi_info = mappings[form_field]
-        kpi_code = kpi_info["kpi_code"]
-        agg_method = (kpi_info["aggregation_method"] or "SUM").upper()
-
-        kpi = db.query(esg_scorecard.ESGKpi).filter_by(kpi_code=kpi_code).first()
-        if not kpi:
-            continue
+        kpi = mappings[form_field]
+        kpi_code = kpi.kpi_code
+        agg_method = kpi.aggregation_method
 
         # Apply aggregation
         values = []
@@ -206,11 +203,15 @@ def run_esg_engine(company_id: int, reporting_period, db: Session):
     )
     db.add(final_row)
 
-    db.commit()
-
-    return {
+    result = {
         "company_id": company_id,
         "reporting_period": reporting_period,
         "pillar_scores": pillar_results,
         "final_score": final_score,
     }
+
+    # ✅ Push to /dashboard/stream subscribers (NOTIFY is sent on commit)
+    publish_scores(db, result)
+    db.commit()
+
+    return result
@@ -1,12 +1,23 @@
 import logging
-import json
-import os
-from pathlib import Path
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+from backend.database import AsyncSessionLocal, _pool_status, async_engine, engine, pool_monitor
+from backend.services.cache_bus import cache_bus
+from backend.services.fast_responses import FastJSONResponse
+from backend.services.form_field_registry import seed_from_artifact
+from backend.services.mapping_resolver import mapping_resolver
+from backend.services.metrics import MetricsMiddleware, registry
+from backend.services.pg_listener import pg_listener
+from backend.services.schema_artifact import ARTIFACT_PATH
+from backend.services.schema_registry import SchemaDocument
+from backend.services.score_stream import SCORE_CHANNEL, score_broadcaster
+from backend.services.structured_logging import logging_stats, setup_logging
+from backend.services.weight_resolver import weight_resolver
+
 # Import routers
 from backend.routes import dashboard_routes
 from backend.routes import kpi_mapping_routes
@@ -15,11 +26,35 @@ from backend.routes import engine_routes   # 👈 added
 from backend.routes import weight_routes
 from backend.routes import form_routes
 
-# Configure logging
-logging.basicConfig(level=logging.DEBUG)
+# Configure logging (queue-based, JSON; levels from LOG_LEVEL / LOG_LEVELS)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+# Schema fields in the form-field registry (idempotent; unchanged rows are skipped)
+async def _seed_form_fields():
+    try:
+        async with AsyncSessionLocal() as db:
+            await seed_from_artifact(db)
+    except Exception as e:
+        logger.warning("Form field registry seed skipped: %s", e)
+
+
+# One LISTEN connection per worker for cross-worker push (score stream, cache invalidation)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pg_listener.subscribe(SCORE_CHANNEL, score_broadcaster.on_notify)
+    cache_bus.start()
+    pg_listener.start()
+    registry.start_flusher()  # no-op unless METRICS_MULTIPROC_DIR is set
+    await _seed_form_fields()
+    yield
+    await cache_bus.stop()
+    await pg_listener.stop()
+
 
 # Create FastAPI app
-app = FastAPI(title="ESG UI API")
+app = FastAPI(title="ESG UI API", lifespan=lifespan, default_response_class=FastJSONResponse)
 
 # Enable CORS for frontend (React dev server + AWS later)
 app.add_middleware(
@@ -33,12 +68,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-route request count and latency for /metrics
+app.add_middleware(MetricsMiddleware)
+
 # Health check
 @app.get("/")
 def root():
     return {"message": "ESG UI backend is running"}
 
 
+# DB pool health (checkout wait, queries and transaction time per request)
+@app.get("/health/db")
+def db_health():
+    return {
+        **pool_monitor.snapshot(),
+        "listener": {"connected": pg_listener.connected, "reconnects": pg_listener.reconnects},
+        "score_stream_clients": score_broadcaster.clients,
+        "cache_bus": cache_bus.snapshot(),
+        "logging": logging_stats(),
+    }
+
+
+# Values kept elsewhere, read at scrape time
+def _pools():
+    status = {"sync": _pool_status(engine), "async": _pool_status(async_engine.sync_engine)}
+    return {(name, state): p[state] for name, p in status.items() for state in ("size", "checkedout", "overflow") if state in p}
+
+
+registry.callback("db_pool_connections", "Pool connections by pool and state", _pools, labelnames=("pool", "state"))
+registry.callback("pg_listener_connected", "LISTEN connection up (1) or down (0)",
+                  lambda: int(pg_listener.connected), multiprocess_mode="all")
+registry.callback("pg_listener_reconnects_total", "LISTEN reconnects", lambda: pg_listener.reconnects, type_="counter")
+registry.callback("score_stream_clients", "Connected score stream clients", lambda: score_broadcaster.clients)
+registry.callback("cache_bus_events_total", "Cache invalidation events received by topic",
+                  lambda: {(t,): n for t, n in cache_bus.by_topic.items()}, type_="counter", labelnames=("topic",))
+registry.callback("cache_bus_lag_max_seconds", "Max NOTIFY→evict lag", lambda: cache_bus.lag_max_ms / 1000,
+                  multiprocess_mode="max")
+registry.callback("weight_cache_lookups_total", "Weight resolver cache lookups by result",
+                  lambda: {("hit",): weight_resolver.hits, ("miss",): weight_resolver.misses},
+                  type_="counter", labelnames=("result",))
+registry.callback("mapping_index_builds_total", "KPI mapping index rebuilds", lambda: mapping_resolver.builds,
+                  type_="counter")
+registry.callback("log_records_dropped_total", "Log records dropped on a full queue",
+                  lambda: logging_stats().get("dropped", 0), type_="counter")
+
+
+# Prometheus text exposition (all workers in multiprocess mode)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ✅ Pydantic model for schema fields (aligned with flat JSON)
 class SchemaField(BaseModel):
     name: str
@@ -55,19 +135,14 @@ class SchemaField(BaseModel):
     pattern: Optional[str] = None
 
 
-# ✅ Unified schema endpoint (reads from flat JSON)
+# Flat field list from the prebuilt artifact (already normalised at build time)
+schema_document = SchemaDocument(ARTIFACT_PATH, transform=lambda artifact: artifact["fields"], default=[])
+
+
+# ✅ Unified schema endpoint (prebuilt artifact, cached with ETag)
 @app.get("/schema", response_model=List[SchemaField])
-def get_schema():
-    base_dir = os.path.dirname(__file__)
-    schema_path = os.path.join(base_dir, "schemas", "esg_validation_schema_flat.json")
-    if not os.path.exists(schema_path):
-        return []
-    try:
-        with open(schema_path, "r") as f:
-            schema_list = json.load(f)
-        return schema_list
-    except Exception:
-        return []
+def get_schema(request: Request):
+    return schema_document.response(request)
 
 
 # ✅ Include routers
@@ -7,13 +7,29 @@ from sqlalchemy import (
     Boolean,
     ForeignKey,
     UniqueConstraint,
+    Index,
     Numeric,
     Float,
+    text,
+    JSON,
 )
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.sql import func
 from backend.database import Base
 
 
+# ------------------------------------------------------------------
+# 🏢 COMPANIES (created by migration 95d24e6d8a8a)
+# ------------------------------------------------------------------
+class Company(Base):
+    __tablename__ = "companies"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=False)
+    parent_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+
+
 # ------------------------------------------------------------------
 # 📊 RAW ESG SCORES (Per-KPI level, drilldown)
 # ------------------------------------------------------------------
@@ -28,6 +44,11 @@ class ESGRawScore(Base):
     company_id = Column(Integer, nullable=False)
     reporting_period = Column(Date, nullable=False)
 
+    __table_args__ = (
+        Index("ix_esg_raw_scores_company_period", "company_id", "reporting_period"),
+        Index("ix_esg_raw_scores_contribution", "company_id", "reporting_period", "weighted_score", "id"),
+    )
+
 
 # ------------------------------------------------------------------
 # 📈 FINAL ESG SCORES (Aggregated pillar + overall ESG score)
@@ -43,6 +64,10 @@ class ESGFinalScore(Base):
     company_id = Column(Integer, nullable=False)
     reporting_period = Column(Date, nullable=False)
 
+    __table_args__ = (
+        Index("ix_esg_final_scores_company_period", "company_id", "reporting_period"),
+    )
+
 
 # ------------------------------------------------------------------
 # 🧾 KPI MASTER (canonical list of KPIs)
@@ -72,6 +97,18 @@ class ESGPillarWeight(Base):
     reporting_period = Column(Date, nullable=False)
     is_current = Column(Boolean, default=True)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+    # Effective dating: in force from valid_from until valid_to (exclusive, NULL = open)
+    valid_from = Column(Date, nullable=False)
+    valid_to = Column(Date, nullable=True)
+
+    __table_args__ = (
+        Index("ix_esg_pillar_weights_company_period", "company_id", "reporting_period"),
+        Index(
+            "ix_esg_pillar_weights_company_valid",
+            "company_id", "valid_from",
+            postgresql_where=text("is_current"),
+        ),
+    )
 
 
 # ------------------------------------------------------------------
@@ -87,12 +124,71 @@ class ESGKpiWeight(Base):
     reporting_period = Column(Date, nullable=False)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     is_current = Column(Boolean, default=True)
+    # Effective dating: in force from valid_from until valid_to (exclusive, NULL = open)
+    valid_from = Column(Date, nullable=False)
+    valid_to = Column(Date, nullable=True)
 
     __table_args__ = (
         UniqueConstraint("company_id", "reporting_period", "kpi_code", name="uniq_kpi_weight"),
+        Index(
+            "ix_esg_kpi_weights_company_current",
+            "company_id", "reporting_period",
+            postgresql_where=text("is_current"),
+        ),
+        Index(
+            "ix_esg_kpi_weights_company_valid",
+            "company_id", "valid_from",
+            postgresql_where=text("is_current"),
+        ),
     )
 
 
+# ------------------------------------------------------------------
+# 🧩 WEIGHT PROFILES (shared schemes + sparse per-company overrides)
+# ------------------------------------------------------------------
+class WeightProfile(Base):
+    __tablename__ = "weight_profiles"
+
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class WeightProfileEntry(Base):
+    """One weight in a profile; kind is "kpi" (code = kpi_code) or "pillar" (code = pillar)."""
+    __tablename__ = "weight_profile_entries"
+
+    profile_id = Column(Integer, ForeignKey("weight_profiles.id", ondelete="CASCADE"), primary_key=True)
+    kind = Column(String, primary_key=True)
+    code = Column(String, primary_key=True)
+    weight = Column(Numeric, nullable=False)
+
+
+class CompanyWeightProfile(Base):
+    __tablename__ = "company_weight_profiles"
+
+    company_id = Column(Integer, primary_key=True)
+    profile_id = Column(Integer, ForeignKey("weight_profiles.id"), nullable=False)
+    assigned_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_company_weight_profiles_profile", "profile_id"),
+    )
+
+
+class CompanyWeightOverride(Base):
+    """Sparse delta on top of the company's profile (same kind/code scheme)."""
+    __tablename__ = "company_weight_overrides"
+
+    company_id = Column(Integer, primary_key=True)
+    kind = Column(String, primary_key=True)
+    code = Column(String, primary_key=True)
+    weight = Column(Numeric, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 # ------------------------------------------------------------------
 # 📝 FORM SUBMISSIONS (with history)
 # ------------------------------------------------------------------
@@ -112,9 +208,79 @@ class EsgFormSubmission(Base):
 
     __table_args__ = (
         UniqueConstraint("company_id", "reporting_period", "form_field", name="uniq_form_submission"),
+        # Engine fetch, input→KPI mapper, /dashboard/latest-period
+        Index(
+            "ix_esg_form_submissions_current_lookup",
+            "company_id", "reporting_period", "methodology",
+            postgresql_where=text("is_current"),
+        ),
+        # /form-submissions/historic
+        Index(
+            "ix_esg_form_submissions_historic",
+            "company_id", "reporting_period", "updated_at",
+            postgresql_where=text("NOT is_current"),
+        ),
+    )
+
+
+# ------------------------------------------------------------------
+# 🗃️ FORM FIELD REGISTRY (replaces SELECT DISTINCT over submissions)
+# ------------------------------------------------------------------
+class FormFieldRegistry(Base):
+    """
+    One row per form field: seeded from the schema artifact, updated when a
+    (company, period, field) submission row is first inserted.
+    """
+    __tablename__ = "form_field_registry"
+
+    form_field = Column(String, primary_key=True)
+    label = Column(String, nullable=True)
+    is_kpi = Column(Boolean, nullable=False, server_default=text("false"))
+    in_schema = Column(Boolean, nullable=False, server_default=text("false"))
+    usage_count = Column(Integer, nullable=False, server_default=text("0"))  # company-periods submitted
+    last_seen_period = Column(Date, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # /kpi-mappings/form-fields?q=<prefix>
+        Index(
+            "ix_form_field_registry_kpi_prefix",
+            "form_field",
+            postgresql_ops={"form_field": "text_pattern_ops"},
+            postgresql_where=text("is_kpi"),
+        ),
     )
 
 
+# ------------------------------------------------------------------
+# 🗂️ SUBMISSION SNAPSHOTS (one JSONB document per company + period)
+# ------------------------------------------------------------------
+class EsgSubmissionSnapshot(Base):
+    """
+    Wide copy of the current esg_form_submissions rows for a company/period:
+    {form_field: {"value", "is_kpi", "methodology", "updated_at"}}.
+    Maintained in the same transaction as every submission upsert.
+    """
+    __tablename__ = "esg_submission_snapshots"
+
+    company_id = Column(Integer, primary_key=True)
+    reporting_period = Column(Date, primary_key=True)
+    data = Column(JSON().with_variant(JSONB, "postgresql"), nullable=False, default=dict)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+# ------------------------------------------------------------------
+# 📅 LATEST REPORTING PERIOD PER COMPANY (maintained on submission writes)
+# ------------------------------------------------------------------
+class CompanyLatestPeriod(Base):
+    __tablename__ = "company_latest_period"
+
+    company_id = Column(Integer, primary_key=True)
+    latest_period = Column(Date, nullable=False)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
 # ------------------------------------------------------------------
 # 🔗 KPI MAPPINGS
 # ------------------------------------------------------------------
@@ -128,3 +294,35 @@ class ESGKpiMapping(Base):
     reporting_period = Column(Date, nullable=True)
     is_current = Column(Boolean, default=True)
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index(
+            "ix_esg_kpi_mappings_current",
+            "reporting_period", "form_field",
+            postgresql_where=text("is_current"),
+        ),
+        Index("ix_esg_kpi_mappings_history", "form_field", "updated_at"),
+    )
+
+
+# ------------------------------------------------------------------
+# 🔁 IDEMPOTENCY KEYS (replayed responses for retried writes, all workers)
+# ------------------------------------------------------------------
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    scope = Column(String, primary_key=True)       # route, e.g. "form-submissions:batch"
+    client_id = Column(String, primary_key=True)   # X-Client-Id, else remote address
+    key = Column(String, primary_key=True)         # Idempotency-Key header
+    fingerprint = Column(String, nullable=False)   # hash of the request body
+    state = Column(String, nullable=False, server_default="in_flight")  # "in_flight" | "done"
+    status_code = Column(Integer, nullable=True)
+    body = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    headers = Column(JSON().with_variant(JSONB, "postgresql"), nullable=True)
+    claimed_at = Column(DateTime, server_default=func.now(), nullable=False)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Expiry purge
+        Index("ix_idempotency_keys_completed", "completed_at", postgresql_where=text("state = 'done'")),
+    )
@@ -1,27 +1,28 @@
 # backend/routes/dashboard_routes.py
 
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy import func, or_, select, true, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List, Literal, Optional
 
-from backend.database import SessionLocal
+from backend.database import AsyncSessionLocal, get_db, get_read_db
 from backend.models import esg_scorecard
 from backend.engine.esg_engine import run_esg_engine
+from backend.services.rankings import RANKING_METRICS, esg_score_rankings
+from backend.services.score_stream import score_broadcaster
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
-# -----------------------------
-# Dependency for DB session
-# -----------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # -----------------------------
 # ESG Dashboard Scores (Canonical Endpoint)
 # -----------------------------
@@ -30,6 +31,7 @@ def get_scores(company_id: int, reporting_period: date, db: Session = Depends(ge
     """
     Run ESG engine, persist results into esg_raw_scores & esg_final_scores,
     and return pillar + final scores for the dashboard.
+    (Sync on purpose: the engine runs on the sync session path.)
     """
     results = run_esg_engine(company_id=company_id, reporting_period=reporting_period, db=db)
 
@@ -41,20 +43,467 @@ def get_scores(company_id: int, reporting_period: date, db: Session = Depends(ge
     }
 
 
+# -----------------------------
+# Per-KPI drilldown from esg_raw_scores (no engine run)
+# -----------------------------
+KPI_DRILLDOWN_MAX_LIMIT = 500
+KPI_TREND_MAX_PERIODS = 40
+
+
+class KpiScoreRow(BaseModel):
+    kpi_code: str
+    kpi_description: Optional[str] = None
+    pillar: Optional[str] = None
+    unit: Optional[str] = None
+    weight: Optional[float] = None
+    normalized_score: Optional[float] = None
+    weighted_score: Optional[float] = None
+
+
+class KpiScoresOut(BaseModel):
+    company_id: int
+    reporting_period: date
+    items: List[KpiScoreRow]
+    next_cursor: Optional[str] = None
+
+
+class KpiTrendPeriod(BaseModel):
+    reporting_period: date
+    kpis: List[KpiScoreRow]
+
+
+class KpiTrendOut(BaseModel):
+    company_id: int
+    periods: List[KpiTrendPeriod]
+
+
+def _kpi_scores_query(company_id: int, pillar: Optional[str]):
+    raw, kpi = esg_scorecard.ESGRawScore, esg_scorecard.ESGKpi
+    query = (
+        select(
+            raw.id,
+            raw.reporting_period,
+            raw.kpi_code,
+            kpi.kpi_description,
+            kpi.pillar,
+            kpi.unit,
+            raw.user_weightage,
+            raw.normalized_score,
+            raw.weighted_score,
+        )
+        .outerjoin(kpi, kpi.kpi_code == raw.kpi_code)
+        .where(raw.company_id == company_id)
+    )
+    if pillar:
+        query = query.where(kpi.pillar == pillar)
+    return query
+
+
+def _kpi_score_row(r) -> KpiScoreRow:
+    return KpiScoreRow(
+        kpi_code=r.kpi_code,
+        kpi_description=r.kpi_description,
+        pillar=r.pillar,
+        unit=r.unit,
+        weight=_float(r.user_weightage),
+        normalized_score=_float(r.normalized_score),
+        weighted_score=_float(r.weighted_score),
+    )
+
+
+@router.get("/scores/{company_id}/{reporting_period}/kpis", response_model=KpiScoresOut)
+async def get_kpi_scores(
+    company_id: int,
+    reporting_period: date,
+    pillar: Optional[str] = Query(None, description="Environmental, Social or Governance"),
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(100, ge=1, le=KPI_DRILLDOWN_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Persisted per-KPI scores for one company/period with KPI metadata,
+    sorted by weighted contribution and paged by (weighted_score, id).
+    """
+    raw = esg_scorecard.ESGRawScore
+    key = tuple_(raw.weighted_score, raw.id)
+
+    query = _kpi_scores_query(company_id, pillar).where(raw.reporting_period == reporting_period)
+    if cursor:
+        try:
+            score, row_id = cursor.rsplit(":", 1)
+            after = tuple_(Decimal(score), int(row_id))
+        except (ValueError, InvalidOperation):
+            raise HTTPException(status_code=400, detail="Invalid cursor; expected '<weighted_score>:<id>'")
+        query = query.where(key < after if order == "desc" else key > after)
+    if order == "desc":
+        query = query.order_by(raw.weighted_score.desc(), raw.id.desc())
+    else:
+        query = query.order_by(raw.weighted_score.asc(), raw.id.asc())
+
+    rows = (await db.execute(query.limit(limit))).all()
+    next_cursor = f"{rows[-1].weighted_score}:{rows[-1].id}" if len(rows) == limit else None
+
+    return KpiScoresOut(
+        company_id=company_id,
+        reporting_period=reporting_period,
+        items=[_kpi_score_row(r) for r in rows],
+        next_cursor=next_cursor,
+    )
+
+
+@router.get("/scores/{company_id}/kpis/trend", response_model=KpiTrendOut)
+async def get_kpi_trend(
+    company_id: int,
+    period: Optional[List[date]] = Query(None, description="Repeat for each period"),
+    period_from: Optional[date] = None,
+    period_to: Optional[date] = None,
+    pillar: Optional[str] = None,
+    kpi_code: Optional[List[str]] = Query(None, description="Repeat to restrict to some KPIs"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Per-KPI scores across several periods (trend charts) in one query."""
+    raw = esg_scorecard.ESGRawScore
+
+    query = _kpi_scores_query(company_id, pillar)
+    if period:
+        if len(period) > KPI_TREND_MAX_PERIODS:
+            raise HTTPException(status_code=400, detail=f"At most {KPI_TREND_MAX_PERIODS} periods")
+        query = query.where(raw.reporting_period.in_(period))
+    elif period_from or period_to:
+        if period_from:
+            query = query.where(raw.reporting_period >= period_from)
+        if period_to:
+            query = query.where(raw.reporting_period <= period_to)
+    else:
+        raise HTTPException(status_code=400, detail="Pass period=... or period_from/period_to")
+    if kpi_code:
+        query = query.where(raw.kpi_code.in_(kpi_code))
+
+    rows = (await db.execute(
+        query.order_by(raw.reporting_period, raw.weighted_score.desc(), raw.id.desc())
+    )).all()
+
+    periods: Dict[date, List[KpiScoreRow]] = {}
+    for r in rows:
+        periods.setdefault(r.reporting_period, []).append(_kpi_score_row(r))
+
+    return KpiTrendOut(
+        company_id=company_id,
+        periods=[KpiTrendPeriod(reporting_period=p, kpis=k) for p, k in periods.items()],
+    )
+
+
 # -----------------------------
 # Latest Reporting Period (helper for frontend)
 # -----------------------------
 @router.get("/latest-period/{company_id}", response_model=dict)
-def get_latest_period(company_id: int, db: Session = Depends(get_db)):
+async def get_latest_period(company_id: int, db: AsyncSession = Depends(get_read_db)):
     """
     Return the latest reporting period for a company where submissions exist.
-    This ignores mappings/weights dates and just looks at form submissions (is_current = true).
+    This ignores mappings/weights dates and just looks at form submissions.
+    Served from company_latest_period (one primary-key lookup).
+    """
+    latest = await db.get(esg_scorecard.CompanyLatestPeriod, company_id)
+    period = latest.latest_period if latest else None
+
+    return {"latest_reporting_period": str(period) if period else None}
+
+
+@router.get("/latest-periods", response_model=dict)
+async def get_latest_periods(
+    company_id: List[int] = Query(..., description="Repeat for each company"),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Batch form of /latest-period: {company_id: latest period or null}."""
+    rows = (await db.execute(
+        select(
+            esg_scorecard.CompanyLatestPeriod.company_id,
+            esg_scorecard.CompanyLatestPeriod.latest_period,
+        ).where(esg_scorecard.CompanyLatestPeriod.company_id.in_(company_id))
+    )).all()
+    found = {cid: str(period) for cid, period in rows}
+
+    return {"latest_reporting_periods": {str(cid): found.get(cid) for cid in company_id}}
+
+
+# -----------------------------
+# Portfolio: latest scores for many companies in one query
+# -----------------------------
+PORTFOLIO_METRICS = ("final_score", "environmental", "social", "governance")
+PORTFOLIO_SORTS = PORTFOLIO_METRICS + ("company_id", "company_name", "reporting_period")
+PORTFOLIO_MAX_LIMIT = 500
+
+
+class PortfolioRow(BaseModel):
+    company_id: int
+    company_name: Optional[str] = None
+    reporting_period: date
+    final_score: Optional[float] = None
+    environmental: Optional[float] = None
+    social: Optional[float] = None
+    governance: Optional[float] = None
+
+
+class MetricSummary(BaseModel):
+    mean: Optional[float] = None
+    p25: Optional[float] = None
+    median: Optional[float] = None
+    p75: Optional[float] = None
+
+
+class PortfolioOut(BaseModel):
+    total: int
+    limit: int
+    offset: int
+    summary: Dict[str, MetricSummary]
+    items: List[PortfolioRow]
+
+
+def _float(value):
+    return float(value) if value is not None else None
+
+
+def _portfolio_query(company_ids, parent_id, as_of, sort_by, order, limit, offset):
+    fs = esg_scorecard.ESGFinalScore
+    company = esg_scorecard.Company
+
+    # Latest final score row per company (DISTINCT ON)
+    latest = (
+        select(
+            fs.company_id,
+            company.name.label("company_name"),
+            fs.reporting_period,
+            fs.final_esg_score.label("final_score"),
+            fs.environmental_score.label("environmental"),
+            fs.social_score.label("social"),
+            fs.governance_score.label("governance"),
+        )
+        .outerjoin(company, company.id == fs.company_id)
+        .distinct(fs.company_id)
+        .order_by(fs.company_id, fs.reporting_period.desc(), fs.id.desc())
+    )
+    if company_ids:
+        latest = latest.where(fs.company_id.in_(company_ids))
+    if parent_id is not None:
+        latest = latest.where(or_(company.parent_id == parent_id, company.id == parent_id))
+    if as_of is not None:
+        latest = latest.where(fs.reporting_period <= as_of)
+    latest = latest.cte("latest")
+
+    # Summary statistics over the whole filtered set, not just the page
+    stat_cols = [func.count().label("total")]
+    for m in PORTFOLIO_METRICS:
+        col = latest.c[m]
+        stat_cols += [
+            func.avg(col).label(f"{m}_mean"),
+            func.percentile_cont(0.25).within_group(col).label(f"{m}_p25"),
+            func.percentile_cont(0.5).within_group(col).label(f"{m}_median"),
+            func.percentile_cont(0.75).within_group(col).label(f"{m}_p75"),
+        ]
+    stats = select(*stat_cols).select_from(latest).cte("stats")
+
+    def ordering(cols):
+        key = cols[sort_by]
+        key = key.desc().nulls_last() if order == "desc" else key.asc().nulls_last()
+        return (key, cols["company_id"])
+
+    page = (
+        select(latest)
+        .order_by(*ordering(latest.c))
+        .limit(limit)
+        .offset(offset)
+        .subquery("page")
+    )
+    # LEFT JOIN so the stats row comes back even when the page is empty
+    return (
+        select(stats, page)
+        .select_from(stats.outerjoin(page, true()))
+        .order_by(*ordering(page.c))
+    )
+
+
+@router.get("/portfolio", response_model=PortfolioOut)
+async def get_portfolio(
+    company_id: Optional[List[int]] = Query(None, description="Repeat to select several companies"),
+    parent_id: Optional[int] = Query(None, description="Parent company and its direct subsidiaries"),
+    as_of: Optional[date] = Query(None, description="Ignore periods after this date"),
+    sort_by: Literal[PORTFOLIO_SORTS] = "final_score",
+    order: Literal["asc", "desc"] = "desc",
+    limit: int = Query(100, ge=1, le=PORTFOLIO_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Latest final and pillar scores for many companies from esg_final_scores
+    (no engine runs), with sorting, pagination and SQL-side summary stats.
+    """
+    rows = (await db.execute(
+        _portfolio_query(company_id, parent_id, as_of, sort_by, order, limit, offset)
+    )).mappings().all()
+
+    first = rows[0] if rows else {}
+    summary = {
+        m: MetricSummary(
+            mean=_float(first.get(f"{m}_mean")),
+            p25=_float(first.get(f"{m}_p25")),
+            median=_float(first.get(f"{m}_median")),
+            p75=_float(first.get(f"{m}_p75")),
+        )
+        for m in PORTFOLIO_METRICS
+    }
+    items = [
+        PortfolioRow(
+            company_id=r["company_id"],
+            company_name=r["company_name"],
+            reporting_period=r["reporting_period"],
+            **{m: _float(r[m]) for m in PORTFOLIO_METRICS},
+        )
+        for r in rows
+        if r["company_id"] is not None
+    ]
+    return PortfolioOut(
+        total=first.get("total") or 0,
+        limit=limit,
+        offset=offset,
+        summary=summary,
+        items=items,
+    )
+
+
+# -----------------------------
+# Rankings: keyset pages over the esg_score_rankings materialized view
+# -----------------------------
+RANKINGS_MAX_LIMIT = 200
+
+
+class RankingRow(BaseModel):
+    company_id: int
+    reporting_period: date
+    score: Optional[float] = None
+    rank: int
+    percentile: Optional[float] = None
+    companies_in_period: int
+
+
+class RankingsOut(BaseModel):
+    metric: str
+    direction: str
+    items: List[RankingRow]
+    next_cursor: Optional[str] = None
+
+
+def _parse_cursor(cursor: str):
+    try:
+        rank, company_id = cursor.split(":")
+        return int(rank), int(company_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor; expected '<rank>:<company_id>'")
+
+
+@router.get("/rankings", response_model=RankingsOut)
+async def get_rankings(
+    reporting_period: date,
+    metric: Literal[tuple(RANKING_METRICS)] = "final_score",
+    direction: Literal["top", "bottom"] = "top",
+    limit: int = Query(50, ge=1, le=RANKINGS_MAX_LIMIT),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    db: AsyncSession = Depends(get_read_db),
+):
     """
-    row = (
-        db.query(esg_scorecard.EsgFormSubmission.reporting_period)
-        .filter_by(company_id=company_id, is_current=True)
-        .order_by(esg_scorecard.EsgFormSubmission.reporting_period.desc())
-        .first()
+    Top/bottom N companies for a period by final or pillar score.
+    Reads precomputed ranks (refreshed after /engine/run-batch) and pages by
+    (rank, company_id) so each page is an index range scan. Companies with no
+    score for the metric are left out of both directions.
+    """
+    score_col, rank_col, pct_col = (esg_score_rankings.c[c] for c in RANKING_METRICS[metric])
+    company_col = esg_score_rankings.c.company_id
+    key = tuple_(rank_col, company_col)
+
+    query = select(
+        company_col,
+        esg_score_rankings.c.reporting_period,
+        score_col.label("score"),
+        rank_col.label("rank"),
+        pct_col.label("percentile"),
+        esg_score_rankings.c.companies_in_period,
+    ).where(
+        esg_score_rankings.c.reporting_period == reporting_period,
+        rank_col.is_not(None),  # companies without this score aren't ranked
     )
 
-    return {"latest_reporting_period": str(row[0]) if row else None}
+    if cursor:
+        after = tuple_(*_parse_cursor(cursor))
+        query = query.where(key > after if direction == "top" else key < after)
+    if direction == "top":
+        query = query.order_by(rank_col.asc(), company_col.asc())
+    else:
+        query = query.order_by(rank_col.desc(), company_col.desc())
+
+    rows = (await db.execute(query.limit(limit))).mappings().all()
+    items = [RankingRow(**r) for r in rows]
+    next_cursor = f"{items[-1].rank}:{items[-1].company_id}" if len(items) == limit else None
+
+    return RankingsOut(metric=metric, direction=direction, items=items, next_cursor=next_cursor)
+
+
+# -----------------------------
+# Live score updates (Server-Sent Events)
+# -----------------------------
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+
+async def _latest_scores(company_id: int):
+    """Most recent persisted scores, sent once when a client connects."""
+    fs = esg_scorecard.ESGFinalScore
+    async with AsyncSessionLocal() as db:
+        row = (await db.execute(
+            select(fs)
+            .filter_by(company_id=company_id)
+            .order_by(fs.reporting_period.desc(), fs.id.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+    if row is None:
+        return None
+    return {
+        "company_id": company_id,
+        "reporting_period": str(row.reporting_period),
+        "pillar_scores": {
+            "Environmental": _float(row.environmental_score),
+            "Social": _float(row.social_score),
+            "Governance": _float(row.governance_score),
+        },
+        "final_score": _float(row.final_esg_score),
+    }
+
+
+@router.get("/stream/{company_id}")
+async def stream_scores(company_id: int, request: Request):
+    """
+    SSE stream of pillar + final scores for a company. Pushes an event each
+    time an engine run persists new scores (any worker, via LISTEN/NOTIFY),
+    with a keep-alive comment every SSE_KEEPALIVE_SECONDS.
+    """
+    async def events():
+        with score_broadcaster.subscribe(company_id) as queue:
+            yield "retry: 5000\n\n"
+            try:
+                latest = await _latest_scores(company_id)
+            except Exception:
+                latest = None  # the stream still works without the initial event
+            if latest:
+                yield f"event: scores\ndata: {json.dumps(latest)}\n\n"
+
+            while not await request.is_disconnected():
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: scores\ndata: {payload}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -5,7 +5,16 @@ from datetime import datetime
 from backend.database import get_db
 from backend.models import esg_scorecard
 from backend.engine import esg_engine
-from backend.schemas.engine_schemas import EngineRunRequest, EngineRunResponse
+from backend.schemas.engine_schemas import (
+    EngineBatchRequest,
+    EngineBatchResponse,
+    EngineRunRequest,
+    EngineRunResponse,
+    WeightsAuditRequest,
+    WeightsAuditResponse,
+)
+from backend.services.rankings import refresh_rankings
+from backend.services.weight_validation import check_weight_totals
 
 router = APIRouter(prefix="/engine", tags=["engine"])
 
@@ -17,36 +26,24 @@ def check_weights(company_id: int, reporting_period: str, db: Session = Depends(
     """
     period = datetime.strptime(reporting_period, "%Y-%m-%d").date()
 
-    pillar_weights = (
-        db.query(esg_scorecard.ESGPillarWeight)
-        .filter_by(company_id=company_id, reporting_period=period)
-        .all()
-    )
-    kpi_weights = (
-        db.query(esg_scorecard.ESGKpiWeight)
-        .filter_by(company_id=company_id, reporting_period=period)
-        .all()
-    )
+    return check_weight_totals(db, period, [company_id])[company_id]
 
-    pillar_total = sum(float(pw.pillar_weight) for pw in pillar_weights)
-    pillar_sum_ok = abs(pillar_total - 100.0) < 0.001
 
-    kpi_totals = {}
-    kpi_sum_ok = True
-    for pillar in {pw.pillar for pw in pillar_weights}:
-        pillar_kpis = [
-            kw for kw in kpi_weights if kw.kpi_code.startswith(pillar[:3].upper())
-        ]
-        total = sum(float(kw.weight) for kw in pillar_kpis)
-        kpi_totals[pillar] = total
-        if abs(total - 100.0) > 0.001:
-            kpi_sum_ok = False
+@router.post("/weights-check", response_model=WeightsAuditResponse)
+def audit_weights(req: WeightsAuditRequest, db: Session = Depends(get_db)):
+    """
+    Same check for many companies (or "all") in one grouped query; use it
+    as a pre-run audit before /engine/run-batch.
+    """
+    period = datetime.strptime(req.reporting_period, "%Y-%m-%d").date()
+    company_ids = None if req.companies == "all" else req.companies
 
-    return {
-        "pillar_weights": {"total": pillar_total, "details": {pw.pillar: float(pw.pillar_weight) for pw in pillar_weights}},
-        "kpi_weights": {"totals": kpi_totals},
-        "validations": {"pillar_sum_ok": pillar_sum_ok, "kpi_sum_ok": kpi_sum_ok},
-    }
+    reports = check_weight_totals(db, period, company_ids)
+    failing = sorted(
+        cid for cid, r in reports.items()
+        if not (r["validations"]["pillar_sum_ok"] and r["validations"]["kpi_sum_ok"])
+    )
+    return WeightsAuditResponse(reporting_period=req.reporting_period, companies=reports, failing=failing)
 
 
 @router.post("/run", response_model=EngineRunResponse)
@@ -63,6 +60,38 @@ def run_engine(req: EngineRunRequest, db: Session = Depends(get_db)):
     return EngineRunResponse(**scores)
 
 
+@router.post("/run-batch", response_model=EngineBatchResponse)
+def run_engine_batch(req: EngineBatchRequest, db: Session = Depends(get_db)):
+    """
+    Run the ESG Engine for many companies in one period, then refresh the
+    rankings view once (concurrently, readers are not blocked).
+    """
+    period = datetime.strptime(req.reporting_period, "%Y-%m-%d").date()
+
+    company_ids = req.company_ids
+    if company_ids is None:
+        company_ids = [
+            cid for (cid,) in db.query(esg_scorecard.EsgSubmissionSnapshot.company_id)
+            .filter_by(reporting_period=period)
+            .order_by(esg_scorecard.EsgSubmissionSnapshot.company_id)
+        ]
+
+    results, failed = {}, {}
+    for company_id in company_ids:
+        try:
+            results[company_id] = EngineRunResponse(**esg_engine.run_esg_engine(company_id, period, db))
+        except Exception as e:
+            db.rollback()
+            failed[company_id] = str(e)
+
+    return EngineBatchResponse(
+        reporting_period=req.reporting_period,
+        results=results,
+        failed=failed,
+        rankings_refreshed=refresh_rankings(db) if results else False,
+    )
+
+
 @router.get("/score")
 def calculate_score(company_id: int, reporting_period: str, db: Session = Depends(get_db)):
     """
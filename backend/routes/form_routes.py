@@ -1,148 +1,353 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql import func
-from typing import List
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
 
-from backend.database import get_db
-from backend.models.esg_scorecard import EsgFormSubmission
+from backend.database import get_async_db, get_read_db, rows_per_statement
+from backend.models.esg_scorecard import EsgFormSubmission, EsgSubmissionSnapshot
 from backend.schemas.form_submission import FormSubmissionIn, FormSubmissionOut
+from backend.services.fast_responses import list_response
+from backend.services.form_field_registry import INSERTED, kpi_promotion_stmt, registry_upsert_stmt
+from backend.services.idempotency import CachedResponse, client_identity, idempotency_store
 from backend.services.input_to_kpi_mapper import map_inputs_to_kpis
+from backend.services.submission_snapshots import (
+    SNAPSHOT_COLUMNS,
+    latest_period_upsert_stmt,
+    snapshot_upsert_stmt,
+)
 
 router = APIRouter(prefix="/form-submissions", tags=["form-submissions"])
+logger = logging.getLogger(__name__)
+
+_single_out = TypeAdapter(FormSubmissionOut)
+_batch_out = TypeAdapter(List[FormSubmissionOut])
+
+# Rows per submission INSERT (7 bind params each, under the per-statement limit)
+SUBMISSION_CHUNK_ROWS = rows_per_statement(7)
 
 
 # ---------------------------------------------------------------------
-# Helper: Upsert a single record (re-usable for both batch & single)
+# Helper: block negative numeric values
 # ---------------------------------------------------------------------
-def _upsert_single(req: FormSubmissionIn, db: Session):
-    company_id = req.company_id
-    reporting_period = req.reporting_period
-    form_field = req.form_field
-    field_value = req.field_value
-    is_kpi = req.is_kpi
-    methodology = req.methodology
+def _validate_value(req: FormSubmissionIn):
+    if req.field_value is None:
+        return
+    try:
+        val = float(req.field_value)
+        if val < 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Negative values are not allowed for field: {req.form_field}"
+            )
+    except ValueError:
+        # Non-numeric values (bool, text, etc.) are fine
+        pass
 
-    # ✅ Validation: block negative numeric values
-    if field_value is not None:
-        try:
-            val = float(field_value)
-            if val < 0:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Negative values are not allowed for field: {form_field}"
-                )
-        except ValueError:
-            # Non-numeric values (bool, text, etc.) are fine
-            pass
-
-    # Mark previous as not current
-    db.query(EsgFormSubmission).filter_by(
-        company_id=company_id,
-        form_field=form_field,
-        reporting_period=reporting_period
-    ).update({"is_current": False}, synchronize_session=False)
 
-    # Insert or update
-    stmt = insert(EsgFormSubmission).values(
-        company_id=company_id,
-        reporting_period=reporting_period,
-        form_field=form_field,
-        field_value=field_value,
-        is_current=True,
-        is_kpi=is_kpi,
-        methodology=methodology,
-    )
-    stmt = stmt.on_conflict_do_update(
+# ---------------------------------------------------------------------
+# Helper: multi-row upsert that skips unchanged rows (no-op writes)
+# ---------------------------------------------------------------------
+async def _upsert_rows(reqs: List[FormSubmissionIn], db: AsyncSession) -> set:
+    """
+    Upsert rows and return the set of (company_id, reporting_period, form_field)
+    keys that were actually written. Rows whose value, is_kpi and methodology
+    are unchanged are left alone (no UPDATE, no new updated_at). Written rows
+    are merged into esg_submission_snapshots and company_latest_period, and
+    first inserts into form_field_registry, in the same transaction. Large
+    batches are split into several INSERTs under the bind-parameter limit;
+    the derived statements run on the combined RETURNING rows (sliced the
+    same way; each merges, so splitting a group across slices is harmless).
+    """
+    rows = []
+    for start in range(0, len(reqs), SUBMISSION_CHUNK_ROWS):
+        rows.extend((await db.execute(_submission_upsert_stmt(reqs[start:start + SUBMISSION_CHUNK_ROWS]))).all())
+
+    by_field = sorted(rows, key=lambda r: r.form_field)  # registry rows locked in one global order
+    for build, source in (
+        (snapshot_upsert_stmt, rows),
+        (latest_period_upsert_stmt, rows),
+        (registry_upsert_stmt, by_field),
+        (kpi_promotion_stmt, by_field),
+    ):
+        for start in range(0, len(source), SUBMISSION_CHUNK_ROWS):
+            derived = build(source[start:start + SUBMISSION_CHUNK_ROWS])
+            if derived is not None:
+                await db.execute(derived)
+    return {(r.company_id, r.reporting_period, r.form_field) for r in rows}
+
+
+def _submission_upsert_stmt(reqs: List[FormSubmissionIn]):
+    stmt = insert(EsgFormSubmission).values([
+        {
+            "company_id": r.company_id,
+            "reporting_period": r.reporting_period,
+            "form_field": r.form_field,
+            "field_value": r.field_value,
+            "is_current": True,
+            "is_kpi": r.is_kpi,
+            "methodology": r.methodology,
+        }
+        for r in reqs
+    ])
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
         index_elements=["company_id", "reporting_period", "form_field"],
         set_={
-            "field_value": field_value,
+            "field_value": excluded.field_value,
             "updated_at": func.now(),
-            "is_current": True,
-            "is_kpi": is_kpi,
-            "methodology": methodology,
-        }
-    )
-    db.execute(stmt)
-    db.commit()
+            "is_current": excluded.is_current,  # always true; no extra bind param
+            "is_kpi": excluded.is_kpi,
+            "methodology": excluded.methodology,
+        },
+        where=or_(
+            EsgFormSubmission.field_value.is_distinct_from(excluded.field_value),
+            EsgFormSubmission.is_kpi.is_distinct_from(excluded.is_kpi),
+            EsgFormSubmission.methodology.is_distinct_from(excluded.methodology),
+            EsgFormSubmission.is_current.is_not(True),
+        ),
+    ).returning(*SNAPSHOT_COLUMNS, INSERTED)
+
 
-    # ✅ Auto-map inputs → KPIs
-    if methodology == "input":
+async def _run_mapper(reqs: List[FormSubmissionIn], written: set, db: AsyncSession):
+    """✅ Auto-map inputs → KPIs, once per company/period with changed inputs."""
+    targets = {
+        (r.company_id, r.reporting_period)
+        for r in reqs
+        if r.methodology == "input"
+        and (r.company_id, r.reporting_period, r.form_field) in written
+    }
+    for company_id, reporting_period in targets:
         try:
-            map_inputs_to_kpis(db, company_id, reporting_period)
-        except Exception as e:
-            print(f"[WARN] Input→KPI mapping failed: {e}")
+            await db.run_sync(map_inputs_to_kpis, company_id, reporting_period)
+        except Exception:
+            await db.rollback()
+            logger.exception(
+                "Input→KPI mapping failed",
+                extra={"company_id": company_id, "reporting_period": str(reporting_period)},
+            )
 
-    saved = db.query(EsgFormSubmission).filter_by(
-        company_id=company_id, reporting_period=reporting_period, form_field=form_field
-    ).first()
+
+def _set_write_counts(response: Response, written: int, skipped: int):
+    response.headers["X-Rows-Written"] = str(written)
+    response.headers["X-Rows-Skipped"] = str(skipped)
+
+
+# ---------------------------------------------------------------------
+# Helper: Upsert a single record
+# ---------------------------------------------------------------------
+async def _upsert_single(req: FormSubmissionIn, db: AsyncSession, response: Response):
+    _validate_value(req)
+
+    written = await _upsert_rows([req], db)
+    await db.commit()
+    await _run_mapper([req], written, db)
+    _set_write_counts(response, len(written), 1 - len(written))
+
+    saved = await db.scalar(
+        select(EsgFormSubmission).filter_by(
+            company_id=req.company_id,
+            reporting_period=req.reporting_period,
+            form_field=req.form_field,
+        )
+    )
     return saved
 
 
+# ---------------------------------------------------------------------
+# Helper: Upsert a batch in one statement
+# ---------------------------------------------------------------------
+async def _upsert_batch(reqs: List[FormSubmissionIn], db: AsyncSession, response: Response):
+    # Last value wins if the same field is posted twice in one batch
+    unique = {}
+    for req in reqs:
+        _validate_value(req)
+        unique[(req.company_id, req.reporting_period, req.form_field)] = req
+    reqs = list(unique.values())
+
+    written = await _upsert_rows(reqs, db)
+    await db.commit()
+    await _run_mapper(reqs, written, db)
+    _set_write_counts(response, len(written), len(reqs) - len(written))
+
+    rows = (await db.scalars(
+        select(EsgFormSubmission).where(
+            tuple_(
+                EsgFormSubmission.company_id,
+                EsgFormSubmission.reporting_period,
+                EsgFormSubmission.form_field,
+            ).in_(list(unique.keys()))
+        )
+    )).all()
+    by_key = {(r.company_id, r.reporting_period, r.form_field): r for r in rows}
+    return [by_key[k] for k in unique if k in by_key]
+
+
+# ---------------------------------------------------------------------
+# Helper: replay cached responses for retried requests (Idempotency-Key)
+# ---------------------------------------------------------------------
+async def _idempotent(scope, request: Request, idempotency_key, payload, response: Response, adapter, produce):
+    if not idempotency_key:
+        return await produce()
+
+    client_id = client_identity(request)
+    fingerprint = idempotency_store.fingerprint(jsonable_encoder(payload))
+    cached = await idempotency_store.begin(scope, client_id, idempotency_key, fingerprint)
+    if cached:
+        return JSONResponse(
+            cached.body,
+            status_code=cached.status_code,
+            headers={**cached.headers, "Idempotent-Replayed": "true"},
+        )
+
+    try:
+        body = jsonable_encoder(adapter.validate_python(await produce(), from_attributes=True))
+    except Exception:
+        await idempotency_store.release(scope, client_id, idempotency_key)
+        raise
+    headers = {
+        k: response.headers[k] for k in ("X-Rows-Written", "X-Rows-Skipped") if k in response.headers
+    }
+    await idempotency_store.complete(
+        scope, client_id, idempotency_key, CachedResponse(fingerprint, 200, body, headers)
+    )
+    return body
+
+
 # ---------------------------------------------------------------------
 # Create or update a single submission (legacy-compatible)
 # ---------------------------------------------------------------------
 @router.post("/", response_model=FormSubmissionOut)
-def upsert_form_submission(req: FormSubmissionIn, db: Session = Depends(get_db)):
-    return _upsert_single(req, db)
+async def upsert_form_submission(
+    req: FormSubmissionIn,
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _idempotent(
+        "form-submissions:single", request, idempotency_key, req, response, _single_out,
+        lambda: _upsert_single(req, db, response),
+    )
 
 
 # ---------------------------------------------------------------------
 # NEW: Batch upsert route — accepts a list of FormSubmissionIn
 # ---------------------------------------------------------------------
 @router.post("/batch", response_model=List[FormSubmissionOut])
-def upsert_form_submissions(reqs: List[FormSubmissionIn], db: Session = Depends(get_db)):
+async def upsert_form_submissions(
+    reqs: List[FormSubmissionIn],
+    request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    db: AsyncSession = Depends(get_async_db),
+):
     if not reqs:
         raise HTTPException(status_code=400, detail="Empty submission list.")
 
-    results = []
-    for req in reqs:
-        result = _upsert_single(req, db)
-        if result:
-            results.append(result)
-    return results
+    return await _idempotent(
+        "form-submissions:batch", request, idempotency_key, reqs, response, _batch_out,
+        lambda: _upsert_batch(reqs, db, response),
+    )
 
 
 # ---------------------------------------------------------------------
 # Fetch current ESG snapshot
 # ---------------------------------------------------------------------
 @router.get("/current", response_model=List[FormSubmissionOut])
-def get_current(
+async def get_current(
     company_id: int,
     methodology: str | None = Query(None, description="input or kpi"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(EsgFormSubmission).filter_by(company_id=company_id, is_current=True)
+    query = select(EsgFormSubmission).filter_by(company_id=company_id, is_current=True)
     if methodology:
-        query = query.filter(EsgFormSubmission.methodology == methodology)
+        query = query.where(EsgFormSubmission.methodology == methodology)
 
-    submissions = query.all()
+    submissions = (await db.scalars(query)).all()
     if not submissions:
         raise HTTPException(status_code=404, detail="No current submissions found")
     return submissions
 
 
+# ---------------------------------------------------------------------
+# Fetch one company/period as a single wide document (form hydration, export)
+# ---------------------------------------------------------------------
+class SnapshotOut(BaseModel):
+    company_id: int
+    reporting_period: date
+    fields: Dict[str, Any]
+    updated_at: Optional[datetime] = None
+
+
+@router.get("/snapshot", response_model=SnapshotOut)
+async def get_snapshot(
+    company_id: int,
+    reporting_period: date,
+    db: AsyncSession = Depends(get_read_db)
+):
+    snapshot = await db.get(EsgSubmissionSnapshot, (company_id, reporting_period))
+    if snapshot is not None:
+        return SnapshotOut(
+            company_id=company_id,
+            reporting_period=reporting_period,
+            fields=snapshot.data or {},
+            updated_at=snapshot.updated_at,
+        )
+
+    # Fallback for periods written before the snapshot table existed
+    rows = (await db.scalars(
+        select(EsgFormSubmission).filter_by(
+            company_id=company_id, reporting_period=reporting_period, is_current=True
+        )
+    )).all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No current submissions found")
+    return SnapshotOut(
+        company_id=company_id,
+        reporting_period=reporting_period,
+        fields={
+            r.form_field: {
+                "value": r.field_value,
+                "is_kpi": r.is_kpi,
+                "methodology": r.methodology,
+                "updated_at": r.updated_at,
+            }
+            for r in rows
+        },
+        updated_at=max((r.updated_at for r in rows if r.updated_at), default=None),
+    )
+
+
 # ---------------------------------------------------------------------
 # Fetch historic ESG records (no date range — use is_current=False)
 # ---------------------------------------------------------------------
 @router.get("/historic", response_model=List[FormSubmissionOut])
-def get_historic(
+async def get_historic(
+    request: Request,
     company_id: int,
     methodology: str | None = Query(None, description="input or kpi"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    query = db.query(EsgFormSubmission).filter(
+    query = select(EsgFormSubmission).where(
         EsgFormSubmission.company_id == company_id,
         EsgFormSubmission.is_current == False
     )
     if methodology:
-        query = query.filter(EsgFormSubmission.methodology == methodology)
+        query = query.where(EsgFormSubmission.methodology == methodology)
 
-    submissions = query.order_by(
+    submissions = (await db.scalars(query.order_by(
         EsgFormSubmission.reporting_period.desc(),
         EsgFormSubmission.updated_at.desc()
-    ).all()
+    ))).all()
 
     if not submissions:
         raise HTTPException(status_code=404, detail="No historic submissions found")
-    return submissions
+    return list_response(request, submissions, FormSubmissionOut)
@@ -1,34 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime
 
-from backend.database import SessionLocal
-from backend.models.esg_scorecard import ESGKpiMapping
-from backend.schemas.kpi_mapping_schemas import KpiMappingIn, KpiMappingOut, AggregationMethod
-from sqlalchemy import text
+from backend.database import get_async_db, get_read_db
+from backend.models.esg_scorecard import ESGKpiMapping, FormFieldRegistry
+from backend.schemas.kpi_mapping_schemas import FormFieldOut, KpiMappingIn, KpiMappingOut, AggregationMethod
+from backend.services.cache_bus import KPI_MAPPINGS, apublish
+from backend.services.fast_responses import list_response
+from sqlalchemy import select, update
 
 
 # Router
 router = APIRouter(prefix="/kpi-mappings", tags=["KPI Mappings"])
 
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # -----------------------------
 # CRUD Routes
 # -----------------------------
 
 # ✅ Create new mapping
 @router.post("/", response_model=KpiMappingOut)
-def create_mapping(mapping: KpiMappingIn, db: Session = Depends(get_db)):
+async def create_mapping(mapping: KpiMappingIn, db: AsyncSession = Depends(get_async_db)):
     # Guardrails
     if not mapping.form_field:
         raise HTTPException(status_code=400, detail="Form field cannot be empty")
@@ -36,11 +29,16 @@ def create_mapping(mapping: KpiMappingIn, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="KPI code cannot be empty")
 
     # Step 1: mark old mapping inactive (if exists for same form_field & period)
-    db.query(ESGKpiMapping).filter(
-        ESGKpiMapping.form_field == mapping.form_field,
-        ESGKpiMapping.reporting_period == mapping.reporting_period,
-        ESGKpiMapping.is_current == True,
-    ).update({"is_current": False}, synchronize_session=False)
+    await db.execute(
+        update(ESGKpiMapping)
+        .where(
+            ESGKpiMapping.form_field == mapping.form_field,
+            ESGKpiMapping.reporting_period == mapping.reporting_period,
+            ESGKpiMapping.is_current == True,
+        )
+        .values(is_current=False)
+        .execution_options(synchronize_session=False)
+    )
 
     # Step 2: insert new mapping as current
     db_mapping = ESGKpiMapping(
@@ -52,36 +50,58 @@ def create_mapping(mapping: KpiMappingIn, db: Session = Depends(get_db)):
         updated_at=datetime.utcnow(),
     )
     db.add(db_mapping)
-    db.commit()
-    db.refresh(db_mapping)
+    await apublish(db, KPI_MAPPINGS, [mapping.form_field])
+    await db.commit()
+    await db.refresh(db_mapping)
     return db_mapping
 
 
 # ✅ List all mappings
 @router.get("/", response_model=List[KpiMappingOut])
-def list_mappings(db: Session = Depends(get_db)):
-    return db.query(ESGKpiMapping).all()
+async def list_mappings(request: Request, db: AsyncSession = Depends(get_read_db)):
+    return list_response(request, (await db.scalars(select(ESGKpiMapping))).all(), KpiMappingOut)
 
 
-# ✅ List distinct form fields from submissions (for dropdowns)
+# ✅ List KPI form fields (for dropdowns) from the maintained registry
 # Moved ABOVE dynamic routes to avoid collision
 @router.get("/form-fields", response_model=List[str])
-def list_form_fields(db: Session = Depends(get_db)):
-    results = db.execute(
-        text(
-            "SELECT DISTINCT form_field "
-            "FROM esg_form_submissions "
-            "WHERE is_kpi = TRUE AND form_field IS NOT NULL "
-            "ORDER BY form_field"
-        )
-    ).fetchall()
-    return [str(r[0]) for r in results if r[0] is not None]
+async def list_form_fields(
+    q: Optional[str] = Query(None, description="Form field prefix"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = (
+        select(FormFieldRegistry.form_field)
+        .where(FormFieldRegistry.is_kpi == True)
+        .order_by(FormFieldRegistry.form_field)
+    )
+    if q:
+        stmt = stmt.where(FormFieldRegistry.form_field.startswith(q, autoescape=True))
+    if limit:
+        stmt = stmt.limit(limit)
+    return (await db.scalars(stmt)).all()
+
+
+# ✅ Registry details (usage counts, last-seen period)
+@router.get("/form-fields/registry", response_model=List[FormFieldOut])
+async def list_form_field_registry(
+    q: Optional[str] = Query(None, description="Form field prefix"),
+    kpi_only: bool = True,
+    limit: int = Query(200, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+):
+    stmt = select(FormFieldRegistry).order_by(FormFieldRegistry.form_field).limit(limit)
+    if kpi_only:
+        stmt = stmt.where(FormFieldRegistry.is_kpi == True)
+    if q:
+        stmt = stmt.where(FormFieldRegistry.form_field.startswith(q, autoescape=True))
+    return (await db.scalars(stmt)).all()
 
 
 # ✅ Get mapping by ID
 @router.get("/{mapping_id}", response_model=KpiMappingOut)
-def get_mapping(mapping_id: int, db: Session = Depends(get_db)):
-    mapping = db.query(ESGKpiMapping).filter(ESGKpiMapping.id == mapping_id).first()
+async def get_mapping(mapping_id: int, db: AsyncSession = Depends(get_read_db)):
+    mapping = await db.get(ESGKpiMapping, mapping_id)
     if not mapping:
         raise HTTPException(status_code=404, detail="Mapping not found")
     return mapping
@@ -89,50 +109,51 @@ def get_mapping(mapping_id: int, db: Session = Depends(get_db)):
 
 # ✅ Get current mappings for a reporting period
 @router.get("/current/{reporting_period}", response_model=List[KpiMappingOut])
-def get_current_mappings(reporting_period: str, db: Session = Depends(get_db)):
+async def get_current_mappings(reporting_period: date, db: AsyncSession = Depends(get_read_db)):
     return (
-        db.query(ESGKpiMapping)
-        .filter(
-            ESGKpiMapping.reporting_period == reporting_period,
-            ESGKpiMapping.is_current == True,
+        await db.scalars(
+            select(ESGKpiMapping).where(
+                ESGKpiMapping.reporting_period == reporting_period,
+                ESGKpiMapping.is_current == True,
+            )
         )
-        .all()
-    )
+    ).all()
 
 
 # ✅ Get mapping history for a form_field
 @router.get("/history/{form_field}", response_model=List[KpiMappingOut])
-def get_mapping_history(form_field: str, db: Session = Depends(get_db)):
+async def get_mapping_history(form_field: str, db: AsyncSession = Depends(get_read_db)):
     return (
-        db.query(ESGKpiMapping)
-        .filter(ESGKpiMapping.form_field == form_field)
-        .order_by(ESGKpiMapping.updated_at.desc())
-        .all()
-    )
+        await db.scalars(
+            select(ESGKpiMapping)
+            .where(ESGKpiMapping.form_field == form_field)
+            .order_by(ESGKpiMapping.updated_at.desc())
+        )
+    ).all()
 
 
 # ✅ Update mapping (preserve history)
 @router.put("/{mapping_id}", response_model=KpiMappingOut)
-def update_mapping(mapping_id: int, updated: KpiMappingIn, db: Session = Depends(get_db)):
+async def update_mapping(mapping_id: int, updated: KpiMappingIn, db: AsyncSession = Depends(get_async_db)):
     # Guardrails
     if not updated.form_field:
         raise HTTPException(status_code=400, detail="Form field cannot be empty")
     if not updated.kpi_code:
         raise HTTPException(status_code=400, detail="KPI code cannot be empty")
 
-    old_mapping = db.query(ESGKpiMapping).filter(ESGKpiMapping.id == mapping_id).first()
+    old_mapping = await db.get(ESGKpiMapping, mapping_id)
     if not old_mapping:
         raise HTTPException(status_code=404, detail="Mapping not found")
 
     # Step 1: mark old mapping inactive
     old_mapping.is_current = False
-    db.commit()
+    await db.commit()
 
     # Step 2: insert new mapping as current
     new_mapping = ESGKpiMapping(
         form_field=updated.form_field,
         kpi_code=updated.kpi_code,
-        aggregation_method=(
+        aggregation_method=AggregationMethod(
             updated.aggregation_method or old_mapping.aggregation_method or AggregationMethod.SUM
         ).value,
         reporting_period=updated.reporting_period,
@@ -140,18 +161,20 @@ def update_mapping(mapping_id: int, updated: KpiMappingIn, db: Session = Depends
         updated_at=datetime.utcnow(),
     )
     db.add(new_mapping)
-    db.commit()
-    db.refresh(new_mapping)
+    await apublish(db, KPI_MAPPINGS, {old_mapping.form_field, updated.form_field})
+    await db.commit()
+    await db.refresh(new_mapping)
     return new_mapping
 
 
 # ✅ Delete mapping
 @router.delete("/{mapping_id}")
-def delete_mapping(mapping_id: int, db: Session = Depends(get_db)):
-    mapping = db.query(ESGKpiMapping).filter(ESGKpiMapping.id == mapping_id).first()
+async def delete_mapping(mapping_id: int, db: AsyncSession = Depends(get_async_db)):
+    mapping = await db.get(ESGKpiMapping, mapping_id)
     if not mapping:
         raise HTTPException(status_code=404, detail="Mapping not found")
 
-    db.delete(mapping)
-    db.commit()
+    await db.delete(mapping)
+    await apublish(db, KPI_MAPPINGS, [mapping.form_field])
+    await db.commit()
     return {"message": "Mapping deleted successfully", "id": mapping_id}
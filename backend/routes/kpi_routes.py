@@ -1,23 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-
-from backend.database import SessionLocal
+import csv
+import io
+import json
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import literal_column, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal
+
+from backend.database import get_async_db, get_read_db, rows_per_statement
 from backend.models.esg_scorecard import ESGKpi  # model for esg_kpis table
-from pydantic import BaseModel
+from backend.services.cache_bus import KPI_CATALOG, apublish
+from backend.services.fast_responses import list_response
+from pydantic import BaseModel, ValidationError
 
 # Router
 router = APIRouter(prefix="/kpis", tags=["KPIs"])
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 # -----------------------------
 # Pydantic Schemas
 # -----------------------------
@@ -36,15 +36,84 @@ class KpiOut(KpiIn):
         from_attributes = True  # replaces orm_mode in Pydantic v2
 
 
+class KpiBulkRow(BaseModel):
+    kpi_code: str
+    status: Literal["created", "updated", "unchanged"]
+
+
+class KpiBulkResult(BaseModel):
+    created: int
+    updated: int
+    unchanged: int
+    rows: List[KpiBulkRow]
+
+
+# -----------------------------
+# Helpers: bulk upload
+# -----------------------------
+KPI_FIELDS = tuple(KpiIn.model_fields)
+# Rows per INSERT: one bind param per field, kept under the per-statement limit
+# (KPI_BULK_CHUNK_ROWS can lower it, not raise it)
+KPI_BULK_CHUNK_ROWS = rows_per_statement(len(KPI_FIELDS), int(os.getenv("KPI_BULK_CHUNK_ROWS", "0")))
+
+
+async def _read_bulk_body(request: Request) -> List[dict]:
+    """JSON array, or CSV with a header row (Content-Type: text/csv)."""
+    body = await request.body()
+    if request.headers.get("content-type", "").split(";")[0].strip().lower() in ("text/csv", "application/csv"):
+        try:
+            reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="CSV must be UTF-8")
+        # Blank cells fall back to model defaults (e.g. status)
+        return [{k.strip(): v.strip() for k, v in row.items() if k and v and v.strip()} for row in reader]
+
+    try:
+        data = json.loads(body or b"null")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or CSV")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array of KPIs")
+    return data
+
+
+def _validate_bulk(raw: List[dict]) -> List[KpiIn]:
+    errors, kpis = [], {}
+    for i, item in enumerate(raw):
+        try:
+            kpi = KpiIn.model_validate(item)
+        except ValidationError as e:
+            errors.append({"row": i, "errors": e.errors(include_url=False, include_context=False)})
+            continue
+        kpis[kpi.kpi_code] = kpi  # last row wins for a repeated code
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return list(kpis.values())
+
+
+def _bulk_upsert_stmt(kpis: List[KpiIn]):
+    """
+    One INSERT … ON CONFLICT (kpi_code). Rows identical to the catalog are
+    skipped by the WHERE (not returned); xmax = 0 marks a fresh insert.
+    """
+    stmt = insert(ESGKpi).values([kpi.model_dump() for kpi in kpis])
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["kpi_code"],
+        set_={f: excluded[f] for f in KPI_FIELDS if f != "kpi_code"},
+        where=or_(*(getattr(ESGKpi, f).is_distinct_from(excluded[f]) for f in KPI_FIELDS if f != "kpi_code")),
+    ).returning(ESGKpi.kpi_code, literal_column("xmax = 0").label("inserted"))
+
+
 # -----------------------------
 # CRUD Routes
 # -----------------------------
 
 # ✅ Create new KPI
 @router.post("/", response_model=KpiOut)
-def create_kpi(kpi: KpiIn, db: Session = Depends(get_db)):
+async def create_kpi(kpi: KpiIn, db: AsyncSession = Depends(get_async_db)):
     # check for duplicate KPI code
-    existing = db.query(ESGKpi).filter(ESGKpi.kpi_code == kpi.kpi_code).first()
+    existing = await db.get(ESGKpi, kpi.kpi_code)
     if existing:
         raise HTTPException(status_code=400, detail="KPI code already exists")
 
@@ -58,21 +127,51 @@ def create_kpi(kpi: KpiIn, db: Session = Depends(get_db)):
         status=kpi.status,
     )
     db.add(db_kpi)
-    db.commit()
-    db.refresh(db_kpi)
+    await apublish(db, KPI_CATALOG, [kpi.kpi_code])
+    await db.commit()
+    await db.refresh(db_kpi)
     return db_kpi
 
 
+# ✅ Bulk upsert (framework catalogs: GRI, BRSR, TCFD …)
+@router.post(
+    "/bulk",
+    response_model=KpiBulkResult,
+    openapi_extra={"requestBody": {"required": True, "content": {
+        "application/json": {"schema": {"type": "array", "items": KpiIn.model_json_schema()}},
+        "text/csv": {"schema": {"type": "string"}},
+    }}},
+)
+async def bulk_upsert_kpis(request: Request, db: AsyncSession = Depends(get_async_db)):
+    kpis = _validate_bulk(await _read_bulk_body(request))
+    if not kpis:
+        raise HTTPException(status_code=400, detail="No KPIs provided")
+
+    written = {}
+    for start in range(0, len(kpis), KPI_BULK_CHUNK_ROWS):
+        for code, inserted in (await db.execute(_bulk_upsert_stmt(kpis[start:start + KPI_BULK_CHUNK_ROWS]))).all():
+            written[code] = "created" if inserted else "updated"
+
+    # One invalidation for the whole catalog load
+    if written:
+        await apublish(db, KPI_CATALOG, list(written))
+    await db.commit()
+
+    rows = [KpiBulkRow(kpi_code=k.kpi_code, status=written.get(k.kpi_code, "unchanged")) for k in kpis]
+    counts = {s: sum(1 for r in rows if r.status == s) for s in ("created", "updated", "unchanged")}
+    return KpiBulkResult(**counts, rows=rows)
+
+
 # ✅ List all KPIs
 @router.get("/", response_model=List[KpiOut])
-def list_kpis(db: Session = Depends(get_db)):
-    return db.query(ESGKpi).all()
+async def list_kpis(request: Request, db: AsyncSession = Depends(get_read_db)):
+    return list_response(request, (await db.scalars(select(ESGKpi))).all(), KpiOut)
 
 
 # ✅ Get KPI by code
 @router.get("/{kpi_code}", response_model=KpiOut)
-def get_kpi(kpi_code: str, db: Session = Depends(get_db)):
-    kpi = db.query(ESGKpi).filter(ESGKpi.kpi_code == kpi_code).first()
+async def get_kpi(kpi_code: str, db: AsyncSession = Depends(get_read_db)):
+    kpi = await db.get(ESGKpi, kpi_code)
     if not kpi:
         raise HTTPException(status_code=404, detail="KPI not found")
     return kpi
@@ -80,8 +179,8 @@ def get_kpi(kpi_code: str, db: Session = Depends(get_db)):
 
 # ✅ Update KPI
 @router.put("/{kpi_code}", response_model=KpiOut)
-def update_kpi(kpi_code: str, updated: KpiIn, db: Session = Depends(get_db)):
-    kpi = db.query(ESGKpi).filter(ESGKpi.kpi_code == kpi_code).first()
+async def update_kpi(kpi_code: str, updated: KpiIn, db: AsyncSession = Depends(get_async_db)):
+    kpi = await db.get(ESGKpi, kpi_code)
     if not kpi:
         raise HTTPException(status_code=404, detail="KPI not found")
 
@@ -92,18 +191,20 @@ def update_kpi(kpi_code: str, updated: KpiIn, db: Session = Depends(get_db)):
     kpi.framework_reference = updated.framework_reference
     kpi.status = updated.status
 
-    db.commit()
-    db.refresh(kpi)
+    await apublish(db, KPI_CATALOG, [kpi_code])
+    await db.commit()
+    await db.refresh(kpi)
     return kpi
 
 
 # ✅ Delete KPI (Hard delete only)
 @router.delete("/{kpi_code}")
-def delete_kpi(kpi_code: str, db: Session = Depends(get_db)):
-    kpi = db.query(ESGKpi).filter(ESGKpi.kpi_code == kpi_code).first()
+async def delete_kpi(kpi_code: str, db: AsyncSession = Depends(get_async_db)):
+    kpi = await db.get(ESGKpi, kpi_code)
     if not kpi:
         raise HTTPException(status_code=404, detail="KPI not found")
 
-    db.delete(kpi)
-    db.commit()
+    await db.delete(kpi)
+    await apublish(db, KPI_CATALOG, [kpi_code])
+    await db.commit()
     return {"message": f"KPI {kpi_code} deleted successfully"}
@@ -1,24 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, List, Literal, Optional
 from pydantic import BaseModel
 from datetime import date
 
-from backend.database import SessionLocal
-from backend.models.esg_scorecard import ESGKpiWeight, ESGKpi, ESGPillarWeight
+from backend.database import get_async_db, get_read_db
+from backend.models.esg_scorecard import (
+    CompanyWeightOverride,
+    CompanyWeightProfile,
+    ESGKpi,
+    ESGKpiWeight,
+    ESGPillarWeight,
+    WeightProfile,
+    WeightProfileEntry,
+)
+from backend.services.cache_bus import WEIGHT_PROFILE, WEIGHTS, apublish
+from backend.services.fast_responses import list_response
+from backend.services.weight_resolver import _by_kind, effective_weights, weight_resolver
 
 router = APIRouter(prefix="/weights", tags=["Weights"])
 
-
-# -----------------------------
-# DB Dependency
-# -----------------------------
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+PILLARS = ["Environmental", "Social", "Governance"]
 
 
 # -----------------------------
@@ -56,23 +60,95 @@ class PillarWeightOut(BaseModel):
         from_attributes = True
 
 
+class WeightEntry(BaseModel):
+    kind: Literal["kpi", "pillar"]
+    code: str  # kpi_code for kind="kpi", pillar name for kind="pillar"
+    weight: float
+
+
+class WeightProfileIn(BaseModel):
+    name: str
+    description: Optional[str] = None
+    entries: List[WeightEntry]
+
+
+class WeightProfileOut(BaseModel):
+    id: int
+    name: str
+    description: Optional[str] = None
+    companies: int = 0
+    entries: List[WeightEntry] = []
+
+
+class ProfileAssignmentIn(BaseModel):
+    profile_id: Optional[int] = None  # None removes the assignment (and the company's overrides)
+    clear_overrides: bool = False     # drop existing overrides instead of re-checking them on the new profile
+
+
+class EffectiveWeightsOut(BaseModel):
+    company_id: int
+    reporting_period: date
+    profile_id: Optional[int] = None
+    kpi_source: Optional[str] = None
+    pillar_source: Optional[str] = None
+    kpi: Dict[str, float]
+    pillar: Dict[str, float]
+
+
+# -----------------------------
+# Helper: effective dating
+# -----------------------------
+async def _open_interval(db: AsyncSession, model, company_id: int, period: date) -> Optional[date]:
+    """
+    Make room for a weight set starting at `period`: the set in force before
+    it now ends at `period`. Returns the start of the next later set, which
+    becomes the new set's valid_to (None if it is the latest).
+    """
+    await db.execute(
+        update(model)
+        .where(
+            model.company_id == company_id,
+            model.is_current == True,
+            model.valid_from < period,
+            or_(model.valid_to.is_(None), model.valid_to > period),
+        )
+        .values(valid_to=period)
+        .execution_options(synchronize_session=False)
+    )
+    return await db.scalar(
+        select(func.min(model.valid_from)).where(
+            model.company_id == company_id,
+            model.is_current == True,
+            model.valid_from > period,
+        )
+    )
+
+
 # -----------------------------
 # KPI Weight Routes
 # -----------------------------
 @router.post("/kpis")
-def save_kpi_weights(weights: List[KpiWeightIn], db: Session = Depends(get_db)):
+async def save_kpi_weights(weights: List[KpiWeightIn], db: AsyncSession = Depends(get_async_db)):
     if not weights:
         raise HTTPException(status_code=400, detail="No KPI weights provided")
 
     company_id = weights[0].company_id
     period = weights[0].reporting_period or date.today()
 
-    # 1. Validate pillar totals
+    # Last value wins if the same KPI is posted twice
+    unique = {w.kpi_code: w for w in weights}
+
+    # 1. Validate pillar totals (one catalog query for all codes)
+    pillars = dict((await db.execute(
+        select(ESGKpi.kpi_code, ESGKpi.pillar).where(ESGKpi.kpi_code.in_(list(unique)))
+    )).all())
+    missing = [code for code in unique if not pillars.get(code)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"KPI code {', '.join(missing)} not found")
+
     pillar_totals: dict[str, float] = {}
-    for w in weights:
-        pillar = db.query(ESGKpi.pillar).filter(ESGKpi.kpi_code == w.kpi_code).scalar()
-        if not pillar:
-            raise HTTPException(status_code=400, detail=f"KPI code {w.kpi_code} not found")
+    for w in unique.values():
+        pillar = pillars[w.kpi_code]
         pillar_totals.setdefault(pillar, 0.0)
         pillar_totals[pillar] += float(w.weight)
 
@@ -83,71 +159,85 @@ def save_kpi_weights(weights: List[KpiWeightIn], db: Session = Depends(get_db)):
                 detail=f"KPI weights for pillar {pillar} must sum to 100 (got {total})",
             )
 
-    # 2. Mark old weights as not current
-    db.query(ESGKpiWeight).filter(
-        ESGKpiWeight.company_id == company_id,
-        ESGKpiWeight.reporting_period == period,
-        ESGKpiWeight.is_current == True,
-    ).update({ESGKpiWeight.is_current: False}, synchronize_session=False)
-
-    # 3. Insert new weights as current
-    for w in weights:
-        db.add(
-            ESGKpiWeight(
-                company_id=w.company_id,
-                reporting_period=w.reporting_period or period,
-                kpi_code=w.kpi_code,
-                weight=float(w.weight),
-                is_current=True,
-            )
+    # 2. Replace the set starting at this period; close the previous one
+    await db.execute(
+        update(ESGKpiWeight)
+        .where(
+            ESGKpiWeight.company_id == company_id,
+            ESGKpiWeight.valid_from == period,
+            ESGKpiWeight.is_current == True,
         )
-    db.commit()
+        .values(is_current=False)
+        .execution_options(synchronize_session=False)
+    )
+    valid_to = await _open_interval(db, ESGKpiWeight, company_id, period)
+
+    # 3. Upsert new weights as current in one statement
+    #    (uniq_kpi_weight: re-saving a period updates the existing rows)
+    stmt = insert(ESGKpiWeight).values([
+        {
+            "company_id": company_id,
+            "reporting_period": period,
+            "kpi_code": w.kpi_code,
+            "weight": float(w.weight),
+            "is_current": True,
+            "valid_from": period,
+            "valid_to": valid_to,
+        }
+        for w in unique.values()
+    ])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=["company_id", "reporting_period", "kpi_code"],
+        set_={
+            "weight": stmt.excluded.weight,
+            "is_current": True,
+            "valid_from": stmt.excluded.valid_from,
+            "valid_to": stmt.excluded.valid_to,
+            "updated_at": func.now(),
+        },
+    ))
+    await apublish(db, WEIGHTS, [company_id])
+    await db.commit()
 
     return {
         "status": "ok",
-        "inserted": len(weights),
+        "inserted": len(unique),
         "company_id": company_id,
         "reporting_period": str(period),
+        "valid_to": str(valid_to) if valid_to else None,
     }
 
 
 @router.get("/kpis", response_model=List[KpiWeightOut])
-def get_kpi_weights(
+async def get_kpi_weights(
+    request: Request,
     company_id: int = 1,
-    reporting_period: date = date.today(),
-    db: Session = Depends(get_db),
+    reporting_period: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    kpis = db.query(ESGKpi).all()
-    if not kpis:
-        raise HTTPException(status_code=404, detail="No KPIs configured")
-
-    weights = {
-        w.kpi_code: float(w.weight)
-        for w in db.query(ESGKpiWeight)
-        .filter(
-            ESGKpiWeight.company_id == company_id,
-            ESGKpiWeight.reporting_period == reporting_period,
-            ESGKpiWeight.is_current == True,
+    # KPI catalog LEFT JOIN the weights in force (own set, else profile + overrides)
+    effective = effective_weights("kpi", reporting_period or date.today(), [company_id])
+    rows = (await db.execute(
+        select(
+            ESGKpi.kpi_code,
+            ESGKpi.kpi_description,
+            ESGKpi.pillar,
+            func.coalesce(effective.c.weight, 0).label("weight"),
         )
-        .all()
-    }
+        .outerjoin(effective, effective.c.code == ESGKpi.kpi_code)
+        .order_by(ESGKpi.kpi_code)
+    )).mappings().all()
+    if not rows:
+        raise HTTPException(status_code=404, detail="No KPIs configured")
 
-    return [
-        KpiWeightOut(
-            kpi_code=k.kpi_code,
-            kpi_description=k.kpi_description,
-            pillar=k.pillar,
-            weight=weights.get(k.kpi_code, 0.0),
-        )
-        for k in kpis
-    ]
+    return list_response(request, [dict(r) for r in rows], KpiWeightOut)
 
 
 # -----------------------------
 # Pillar Weight Routes
 # -----------------------------
 @router.post("/pillars")
-def save_pillar_weights(weights: List[PillarWeightIn], db: Session = Depends(get_db)):
+async def save_pillar_weights(weights: List[PillarWeightIn], db: AsyncSession = Depends(get_async_db)):
     if not weights:
         raise HTTPException(status_code=400, detail="No pillar weights provided")
 
@@ -161,51 +251,304 @@ def save_pillar_weights(weights: List[PillarWeightIn], db: Session = Depends(get
             status_code=400, detail=f"Pillar weights must sum to 100 (got {total})"
         )
 
-    # 2. Mark existing as not current
-    db.query(ESGPillarWeight).filter(
-        ESGPillarWeight.company_id == company_id,
-        ESGPillarWeight.reporting_period == period,
-        ESGPillarWeight.is_current == True,
-    ).update({"is_current": False}, synchronize_session=False)
-
-    # 3. Insert new as current
-    for w in weights:
-        db.add(
-            ESGPillarWeight(
-                company_id=w.company_id,
-                reporting_period=w.reporting_period or period,
-                pillar=w.pillar,
-                pillar_weight=float(w.pillar_weight),
-                is_current=True,
-            )
+    # 2. Replace the set starting at this period; close the previous one
+    await db.execute(
+        update(ESGPillarWeight)
+        .where(
+            ESGPillarWeight.company_id == company_id,
+            ESGPillarWeight.valid_from == period,
+            ESGPillarWeight.is_current == True,
         )
-
-    db.commit()
+        .values(is_current=False)
+        .execution_options(synchronize_session=False)
+    )
+    valid_to = await _open_interval(db, ESGPillarWeight, company_id, period)
+
+    # 3. Insert new as current (one multi-row INSERT)
+    await db.execute(insert(ESGPillarWeight).values([
+        {
+            "company_id": company_id,
+            "reporting_period": period,
+            "pillar": w.pillar,
+            "pillar_weight": float(w.pillar_weight),
+            "is_current": True,
+            "valid_from": period,
+            "valid_to": valid_to,
+        }
+        for w in weights
+    ]))
+
+    await apublish(db, WEIGHTS, [company_id])
+    await db.commit()
 
     return {
         "status": "ok",
         "inserted": len(weights),
         "company_id": company_id,
         "reporting_period": str(period),
+        "valid_to": str(valid_to) if valid_to else None,
     }
 
 
 @router.get("/pillars", response_model=List[PillarWeightOut])
-def get_pillar_weights(
+async def get_pillar_weights(
     company_id: int = 1,
-    reporting_period: date = date.today(),
-    db: Session = Depends(get_db),
+    reporting_period: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    pillars = ["Environmental", "Social", "Governance"]
+    # Set in force on the period (effective-dated, else profile + overrides)
+    weights = (await weight_resolver.aresolve(db, company_id, reporting_period or date.today())).pillar
 
-    weights = {
-        w.pillar: float(w.pillar_weight)
-        for w in db.query(ESGPillarWeight)
-        .filter(
-            ESGPillarWeight.company_id == company_id,
-            ESGPillarWeight.reporting_period == reporting_period,
+    return [PillarWeightOut(pillar=p, pillar_weight=weights.get(p, 0.0)) for p in PILLARS]
+
+
+# -----------------------------
+# Helpers: profiles
+# -----------------------------
+async def _validate_scheme(db: AsyncSession, weights: Dict[str, Dict[str, float]]):
+    """Same rules as the per-company saves: pillars sum to 100, KPIs sum to 100 per pillar."""
+    pillar_weights, kpi_weights = weights.get("pillar", {}), weights.get("kpi", {})
+
+    unknown = [p for p in pillar_weights if p not in PILLARS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown pillar {', '.join(unknown)}")
+    if pillar_weights:
+        total = sum(pillar_weights.values())
+        if abs(total - 100.0) > 1e-6:
+            raise HTTPException(status_code=400, detail=f"Pillar weights must sum to 100 (got {total})")
+
+    if not kpi_weights:
+        return
+    pillars = dict((await db.execute(
+        select(ESGKpi.kpi_code, ESGKpi.pillar).where(ESGKpi.kpi_code.in_(list(kpi_weights)))
+    )).all())
+    missing = [code for code in kpi_weights if not pillars.get(code)]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"KPI code {', '.join(missing)} not found")
+
+    pillar_totals: dict[str, float] = {}
+    for code, weight in kpi_weights.items():
+        pillar_totals[pillars[code]] = pillar_totals.get(pillars[code], 0.0) + weight
+    for pillar, total in pillar_totals.items():
+        if abs(total - 100.0) > 1e-6:
+            raise HTTPException(
+                status_code=400,
+                detail=f"KPI weights for pillar {pillar} must sum to 100 (got {total})",
+            )
+
+
+async def _profile_weights(db: AsyncSession, profile_id: int) -> Dict[str, Dict[str, float]]:
+    return _by_kind((await db.execute(
+        select(WeightProfileEntry.kind, WeightProfileEntry.code, WeightProfileEntry.weight)
+        .where(WeightProfileEntry.profile_id == profile_id)
+    )).all())
+
+
+async def _company_overrides(db: AsyncSession, company_ids: List[int]) -> Dict[int, Dict[str, Dict[str, float]]]:
+    rows = (await db.execute(
+        select(CompanyWeightOverride.company_id, CompanyWeightOverride.kind,
+               CompanyWeightOverride.code, CompanyWeightOverride.weight)
+        .where(CompanyWeightOverride.company_id.in_(company_ids))
+    )).all()
+    by_company: Dict[int, list] = {}
+    for row in rows:
+        by_company.setdefault(row.company_id, []).append(row)
+    return {cid: _by_kind(entries) for cid, entries in by_company.items()}
+
+
+def _merged(profile: Dict[str, Dict[str, float]], deltas: Dict[str, Dict[str, float]]) -> Dict[str, Dict[str, float]]:
+    merged = {kind: dict(codes) for kind, codes in profile.items()}
+    for kind, codes in deltas.items():
+        merged.setdefault(kind, {}).update(codes)
+    return merged
+
+
+async def _write_entries(db: AsyncSession, profile_id: int, weights: Dict[str, Dict[str, float]]):
+    await db.execute(delete(WeightProfileEntry).where(WeightProfileEntry.profile_id == profile_id))
+    rows = [
+        {"profile_id": profile_id, "kind": kind, "code": code, "weight": weight}
+        for kind, codes in weights.items()
+        for code, weight in codes.items()
+    ]
+    if rows:
+        await db.execute(insert(WeightProfileEntry).values(rows))
+
+
+async def _profile_out(db: AsyncSession, profile: WeightProfile) -> WeightProfileOut:
+    weights = await _profile_weights(db, profile.id)
+    companies = await db.scalar(
+        select(func.count()).where(CompanyWeightProfile.profile_id == profile.id)
+    )
+    return WeightProfileOut(
+        id=profile.id,
+        name=profile.name,
+        description=profile.description,
+        companies=companies or 0,
+        entries=[
+            WeightEntry(kind=kind, code=code, weight=weight)
+            for kind, codes in weights.items()
+            for code, weight in sorted(codes.items())
+        ],
+    )
+
+
+# -----------------------------
+# Weight Profile Routes
+# -----------------------------
+@router.get("/profiles", response_model=List[WeightProfileOut])
+async def list_profiles(db: AsyncSession = Depends(get_read_db)):
+    # Summary only (no entries); company counts in the same query
+    rows = (await db.execute(
+        select(WeightProfile, func.count(CompanyWeightProfile.company_id).label("companies"))
+        .outerjoin(CompanyWeightProfile, CompanyWeightProfile.profile_id == WeightProfile.id)
+        .group_by(WeightProfile.id)
+        .order_by(WeightProfile.name)
+    )).all()
+    return [
+        WeightProfileOut(id=p.id, name=p.name, description=p.description, companies=count)
+        for p, count in rows
+    ]
+
+
+@router.post("/profiles", response_model=WeightProfileOut)
+async def create_profile(payload: WeightProfileIn, db: AsyncSession = Depends(get_async_db)):
+    if await db.scalar(select(WeightProfile.id).where(WeightProfile.name == payload.name)):
+        raise HTTPException(status_code=400, detail=f"Profile {payload.name} already exists")
+
+    weights = _by_kind(payload.entries)
+    await _validate_scheme(db, weights)
+
+    profile = WeightProfile(name=payload.name, description=payload.description)
+    db.add(profile)
+    await db.flush()
+    await _write_entries(db, profile.id, weights)
+    await db.commit()
+    return await _profile_out(db, profile)
+
+
+@router.get("/profiles/{profile_id}", response_model=WeightProfileOut)
+async def get_profile(profile_id: int, db: AsyncSession = Depends(get_read_db)):
+    profile = await db.get(WeightProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return await _profile_out(db, profile)
+
+
+@router.put("/profiles/{profile_id}", response_model=WeightProfileOut)
+async def update_profile(profile_id: int, payload: WeightProfileIn, db: AsyncSession = Depends(get_async_db)):
+    """Replace a profile's entries; every company on it picks up the change (one write, no per-company rows)."""
+    profile = await db.get(WeightProfile, profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    weights = _by_kind(payload.entries)
+    await _validate_scheme(db, weights)
+
+    # Companies with overrides must still pass the sum checks on the new entries
+    company_ids = list((await db.scalars(
+        select(CompanyWeightProfile.company_id).where(CompanyWeightProfile.profile_id == profile_id)
+    )).all())
+    failures = []
+    for company_id, deltas in (await _company_overrides(db, company_ids)).items():
+        try:
+            await _validate_scheme(db, _merged(weights, deltas))
+        except HTTPException as e:
+            failures.append(f"company {company_id}: {e.detail}")
+    if failures:
+        raise HTTPException(
+            status_code=400,
+            detail="Profile change breaks company overrides (update or clear them first): " + "; ".join(failures),
         )
-        .all()
-    }
 
-    return [PillarWeightOut(pillar=p, pillar_weight=weights.get(p, 0.0)) for p in pillars]
+    profile.name = payload.name
+    profile.description = payload.description
+    await _write_entries(db, profile_id, weights)
+    await apublish(db, WEIGHT_PROFILE, [profile_id])
+    await db.commit()
+    return await _profile_out(db, profile)
+
+
+# -----------------------------
+# Company Assignment / Override Routes
+# -----------------------------
+@router.put("/companies/{company_id}/profile")
+async def assign_profile(company_id: int, payload: ProfileAssignmentIn, db: AsyncSession = Depends(get_async_db)):
+    """
+    Assign (or with profile_id=None remove) the company's profile. Existing
+    overrides were checked against the old profile: they are re-validated on
+    the new one (400 if the merge breaks the sums) unless clear_overrides is set.
+    """
+    if payload.profile_id is None or payload.clear_overrides:
+        await db.execute(delete(CompanyWeightOverride).where(CompanyWeightOverride.company_id == company_id))
+    if payload.profile_id is None:
+        await db.execute(delete(CompanyWeightProfile).where(CompanyWeightProfile.company_id == company_id))
+    else:
+        if not await db.get(WeightProfile, payload.profile_id):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        deltas = (await _company_overrides(db, [company_id])).get(company_id)
+        if deltas:
+            try:
+                await _validate_scheme(db, _merged(await _profile_weights(db, payload.profile_id), deltas))
+            except HTTPException as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Company overrides do not fit profile {payload.profile_id}: {e.detail} "
+                           "(update the overrides or set clear_overrides)",
+                )
+        stmt = insert(CompanyWeightProfile).values(company_id=company_id, profile_id=payload.profile_id)
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=["company_id"],
+            set_={"profile_id": stmt.excluded.profile_id, "assigned_at": func.now()},
+        ))
+    await apublish(db, WEIGHTS, [company_id])
+    await db.commit()
+    return {"status": "ok", "company_id": company_id, "profile_id": payload.profile_id}
+
+
+@router.put("/companies/{company_id}/overrides")
+async def save_overrides(company_id: int, overrides: List[WeightEntry], db: AsyncSession = Depends(get_async_db)):
+    """
+    Replace the company's overrides (sparse deltas on its profile). The
+    merged profile + overrides must still pass the usual sum checks.
+    """
+    profile_id = await db.scalar(
+        select(CompanyWeightProfile.profile_id).where(CompanyWeightProfile.company_id == company_id)
+    )
+    if profile_id is None:
+        raise HTTPException(status_code=400, detail="Company has no weight profile assigned")
+
+    deltas = _by_kind(overrides)
+    await _validate_scheme(db, _merged(await _profile_weights(db, profile_id), deltas))
+
+    await db.execute(delete(CompanyWeightOverride).where(CompanyWeightOverride.company_id == company_id))
+    rows = [
+        {"company_id": company_id, "kind": kind, "code": code, "weight": weight}
+        for kind, codes in deltas.items()
+        for code, weight in codes.items()
+    ]
+    if rows:
+        await db.execute(insert(CompanyWeightOverride).values(rows))
+    await apublish(db, WEIGHTS, [company_id])
+    await db.commit()
+
+    return {"status": "ok", "company_id": company_id, "profile_id": profile_id, "overrides": len(rows)}
+
+
+@router.get("/companies/{company_id}/effective", response_model=EffectiveWeightsOut)
+async def get_effective_weights(
+    company_id: int,
+    reporting_period: Optional[date] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Weights the engine would use for the period, and where they come from."""
+    period = reporting_period or date.today()
+    resolved = await weight_resolver.aresolve(db, company_id, period)
+    return EffectiveWeightsOut(
+        company_id=company_id,
+        reporting_period=period,
+        profile_id=resolved.profile_id,
+        kpi_source=resolved.kpi_source,
+        pillar_source=resolved.pillar_source,
+        kpi=resolved.kpi,
+        pillar=resolved.pillar,
+    )
@@ -1,7 +1,7 @@
 # backend/schemas/engine_schemas.py
 
 from pydantic import BaseModel
-from typing import Dict
+from typing import Any, Dict, List, Literal, Optional, Union
 
 class EngineRunRequest(BaseModel):
     company_id: int
@@ -10,3 +10,23 @@ class EngineRunRequest(BaseModel):
 class EngineRunResponse(BaseModel):
     pillar_scores: Dict[str, float]
     final_score: float
+
+
+class EngineBatchRequest(BaseModel):
+    reporting_period: str  # ISO date string: YYYY-MM-DD
+    company_ids: Optional[List[int]] = None  # None → every company with submissions for the period
+
+class EngineBatchResponse(BaseModel):
+    reporting_period: str
+    results: Dict[int, EngineRunResponse]
+    failed: Dict[int, str]
+    rankings_refreshed: bool
+
+class WeightsAuditRequest(BaseModel):
+    reporting_period: str  # ISO date string: YYYY-MM-DD
+    companies: Union[List[int], Literal["all"]] = "all"
+
+class WeightsAuditResponse(BaseModel):
+    reporting_period: str
+    companies: Dict[int, Dict[str, Any]]
+    failing: List[int]
@@ -1,14 +1,11 @@
 from pydantic import BaseModel, validator
 from datetime import date, datetime
 from typing import Optional, Union, Any
-import json
-import os
-import re
 
-# Load schema for validation
-SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "esg_validation_schema_flat.json")
-with open(SCHEMA_PATH, "r") as f:
-    VALIDATION_SCHEMA = {entry["name"]: entry for entry in json.load(f)}
+from backend.services.schema_artifact import load_artifact
+
+# Per-field rules from the prebuilt schema artifact (patterns precompiled)
+VALIDATION_SCHEMA = load_artifact().field_rules
 
 
 class FormSubmissionBase(BaseModel):
@@ -30,7 +27,7 @@ class FormSubmissionBase(BaseModel):
         if not rule:
             return v  # no rule → skip validation
 
-        field_type = rule.get("type")
+        field_type = rule.type
 
         # Numeric fields
         if field_type == "numeric":
@@ -52,10 +49,9 @@ class FormSubmissionBase(BaseModel):
 
         # Regex-validated fields
         if field_type == "regex":
-            pattern = rule.get("pattern")
-            if pattern and not re.match(pattern, str(v).lower()):
+            if rule.pattern and not rule.pattern.match(str(v).lower()):
                 raise ValueError(
-                    f"Field '{field_name}' must match pattern: {pattern}"
+                    f"Field '{field_name}' must match pattern: {rule.pattern.pattern}"
                 )
             return str(v).lower()
 
@@ -30,3 +30,16 @@ class KpiMappingOut(KpiMappingBase):
 
     class Config:
         from_attributes = True
+
+
+class FormFieldOut(BaseModel):
+    """Schema for a form_field_registry row"""
+    form_field: str
+    label: Optional[str] = None
+    is_kpi: bool
+    in_schema: bool
+    usage_count: int
+    last_seen_period: Optional[date] = None
+
+    class Config:
+        from_attributes = True
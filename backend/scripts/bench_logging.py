@@ -0,0 +1,123 @@
+"""
+Request-latency benchmark for the logging setup.
+
+Runs a synthetic route that logs like a form submission does (mapper
+debug lines in a loop, per-statement SQLAlchemy INFO lines, one access
+line) under each configuration, and prints latency percentiles:
+
+- basicConfig(DEBUG): the old setup, synchronous StreamHandler, all levels on
+- queue + JSON, DEBUG: the new handler with every logger still at DEBUG
+- queue + JSON, defaults: the new handler with LOG_LEVEL=INFO and the
+  DEFAULT_LEVELS (SQLAlchemy at WARNING, mapper debug rate-limited)
+
+--sink-delay-ms simulates a slow log sink (blocked stdout pipe, container
+log driver); synchronous handlers pay it on the request thread. When the
+sink cannot keep up, the queue handler drops records instead of blocking;
+the `dropped` column shows how many.
+
+    python -m backend.scripts.bench_logging --requests 2000 --lines 40 --sink-delay-ms 0.05
+"""
+import argparse
+import io
+import logging
+import statistics
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.services.structured_logging import RateLimitedLog, logging_stats, setup_logging, shutdown_logging
+
+mapper_log = logging.getLogger("backend.services.input_to_kpi_mapper")
+sql_log = logging.getLogger("sqlalchemy.engine.Engine")
+access_log = logging.getLogger("uvicorn.access")
+
+
+class SlowSink(io.TextIOBase):
+    """Discards output after sleeping `delay` seconds per write."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        if self.delay:
+            time.sleep(self.delay)
+        return len(s)
+
+    def flush(self):
+        pass
+
+
+def _app(lines: int, rate_limited: bool) -> FastAPI:
+    app = FastAPI()
+    debug = RateLimitedLog(mapper_log) if rate_limited else mapper_log
+
+    @app.post("/submit")
+    def submit():
+        for i in range(lines):
+            debug.debug("Mapper skipping %s: user entry exists", f"field_{i}", extra={"company_id": 1})
+            sql_log.info("INSERT INTO esg_form_submissions ... [%d]", i)
+        access_log.info('"POST /submit HTTP/1.1" 200')
+        return {"ok": True}
+
+    return app
+
+
+def _basic_config(sink):
+    shutdown_logging()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    for name in ("sqlalchemy", "asyncpg", "uvicorn", "uvicorn.access", mapper_log.name):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+    logging.basicConfig(level=logging.DEBUG, stream=sink, force=True)
+
+
+def _measure(app: FastAPI, requests: int):
+    latencies = []
+    with TestClient(app) as client:
+        for _ in range(20):  # warm-up
+            client.post("/submit")
+        for _ in range(requests):
+            start = time.perf_counter()
+            client.post("/submit")
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {
+        "mean": statistics.fmean(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95) - 1],
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--lines", type=int, default=40, help="mapper + SQL log calls per request")
+    parser.add_argument("--sink-delay-ms", type=float, default=0.05, help="simulated cost per write")
+    args = parser.parse_args()
+    delay = args.sink_delay_ms / 1000
+
+    variants = {
+        "basicConfig(DEBUG)": (lambda sink: _basic_config(sink), False),
+        "queue + JSON, DEBUG": (lambda sink: setup_logging(level="DEBUG", levels={"sqlalchemy": "DEBUG"}, stream=sink), False),
+        "queue + JSON, defaults": (lambda sink: setup_logging(level="INFO", levels={mapper_log.name: "DEBUG"}, stream=sink), True),
+    }
+
+    print(f"{args.requests} requests, {args.lines} log calls each, sink delay {args.sink_delay_ms} ms/write\n")
+    print(f"{'variant':<26}{'mean ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'writes':>10}{'dropped':>9}")
+    for name, (configure, rate_limited) in variants.items():
+        sink = SlowSink(delay)
+        configure(sink)
+        stats = _measure(_app(args.lines, rate_limited), args.requests)
+        dropped = logging_stats().get("dropped", 0)  # queue full: dropped rather than blocking
+        shutdown_logging()  # drain the queue so writes are counted
+        print(f"{name:<26}{stats['mean']:>10.2f}{stats['p50']:>9.2f}{stats['p95']:>9.2f}{stats['p99']:>9.2f}"
+              f"{sink.writes:>10}{dropped:>9}")
+
+
+if __name__ == "__main__":
+    main()
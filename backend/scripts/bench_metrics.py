@@ -0,0 +1,59 @@
+"""
+Per-observation overhead of the in-process metrics registry.
+
+Times a tight loop of each hot-path operation (counter inc on a cached
+child, labelled lookup + inc, histogram observe, the `timed` decorator
+around a no-op) and prints nanoseconds per call, against an empty loop.
+
+    python -m backend.scripts.bench_metrics --iterations 1000000
+"""
+import argparse
+import time
+
+from backend.services.metrics import Registry, timed
+
+
+def _per_call_ns(fn, iterations: int) -> float:
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    registry = Registry()
+    requests = registry.counter("bench_requests_total", "", ("method", "route", "status"))
+    latency = registry.histogram("bench_latency_seconds", "", ("method", "route"))
+    child = requests.labels("GET", "/kpis/", "200")
+    runs = registry.counter("bench_runs_total", "", ("outcome",))
+    duration = registry.histogram("bench_duration_seconds", "")
+
+    @timed(duration, runs)
+    def work():
+        return None
+
+    def noop():
+        return None
+
+    cases = {
+        "empty call (baseline)": noop,
+        "counter child .inc()": child.inc,
+        "labels(...).inc()": lambda: requests.labels("GET", "/kpis/", "200").inc(),
+        "labels(...).observe()": lambda: latency.labels("GET", "/kpis/").observe(0.0123),
+        "@timed no-op function": work,
+    }
+    baseline = None
+    print(f"{args.iterations} iterations\n")
+    print(f"{'operation':<26}{'ns/call':>10}{'over baseline':>16}")
+    for name, fn in cases.items():
+        ns = _per_call_ns(fn, args.iterations)
+        baseline = ns if baseline is None else baseline
+        print(f"{name:<26}{ns:>10.0f}{ns - baseline:>16.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Serialization benchmark for the large list endpoints.
+
+Builds N in-memory rows shaped like each list endpoint's ORM rows and
+compares, per response model:
+- FastAPI default: response-model validation + jsonable_encoder + JSONResponse
+  (Starlette's render: compact separators, ensure_ascii=False)
+- orjson after validation (RESPONSE_VALIDATE_ROWS=1)
+- orjson on trusted rows (the default in backend.services.fast_responses)
+- MessagePack on trusted rows (if msgpack is installed)
+and the payload size raw / gzip / brotli.
+
+    python -m backend.scripts.bench_serialization --rows 10000 --repeat 5
+"""
+import argparse
+import gzip
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+from backend.routes.kpi_routes import KpiOut
+from backend.routes.weight_routes import KpiWeightOut
+from backend.schemas.form_submission import FormSubmissionOut
+from backend.schemas.kpi_mapping_schemas import KpiMappingOut
+from backend.services import fast_responses
+from backend.services.fast_responses import dumps_json, dumps_msgpack, rows_to_dicts
+
+
+def _rows(model, n: int):
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    if model is KpiOut:
+        return [SimpleNamespace(
+            kpi_code=f"ENV_{i:05d}", kpi_description=f"KPI number {i}", pillar="Environmental",
+            unit="tCO2e", normalization_method="inverse", framework_reference="GRI 305-1", status="active",
+        ) for i in range(n)]
+    if model is KpiMappingOut:
+        return [SimpleNamespace(
+            id=i, form_field=f"field_{i}", kpi_code=f"ENV_{i:05d}", reporting_period=date(2024, 1, 1),
+            aggregation_method="SUM", is_current=True, updated_at=now,
+        ) for i in range(n)]
+    if model is FormSubmissionOut:
+        return [SimpleNamespace(
+            id=i, company_id=1, reporting_period=date(2024, 1, 1), form_field=f"field_{i}",
+            field_value=str(i * 1.5), is_kpi=bool(i % 2), methodology="input", is_current=False,
+            created_at=now, updated_at=now + timedelta(seconds=i),
+        ) for i in range(n)]
+    return [
+        {"kpi_code": f"ENV_{i:05d}", "kpi_description": f"KPI number {i}", "pillar": "Social",
+         "weight": float(Decimal("12.5"))}
+        for i in range(n)
+    ]
+
+
+def _time(fn, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, out
+
+
+def _sizes(body: bytes):
+    sizes = {"raw": len(body), "gzip": len(gzip.compress(body, compresslevel=fast_responses.RESPONSE_GZIP_LEVEL))}
+    if fast_responses.brotli is not None:
+        sizes["br"] = len(fast_responses.brotli.compress(body, quality=fast_responses.RESPONSE_BROTLI_QUALITY))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5, help="best-of runs per variant")
+    args = parser.parse_args()
+
+    models = {
+        "list_kpis": KpiOut,
+        "list_mappings": KpiMappingOut,
+        "get_historic": FormSubmissionOut,
+        "get_kpi_weights": KpiWeightOut,
+    }
+    print(f"{args.rows} rows, best of {args.repeat}; orjson={'yes' if fast_responses.orjson else 'no'}, "
+          f"msgpack={'yes' if fast_responses.msgpack else 'no'}, brotli={'yes' if fast_responses.brotli else 'no'}\n")
+    print(f"{'endpoint':<18}{'variant':<26}{'ms':>9}{'raw B':>11}{'gzip B':>10}{'br B':>10}")
+
+    for endpoint, model in models.items():
+        rows = _rows(model, args.rows)
+        adapter = TypeAdapter(List[model])
+        variants = {
+            "fastapi default": lambda: JSONResponse(
+                jsonable_encoder(adapter.validate_python(rows, from_attributes=True))
+            ).body,
+            "orjson + validation": lambda: dumps_json(rows_to_dicts(rows, model, validate=True)),
+            "orjson, trusted rows": lambda: dumps_json(rows_to_dicts(rows, model, validate=False)),
+        }
+        if fast_responses.msgpack is not None:
+            variants["msgpack, trusted rows"] = lambda: dumps_msgpack(rows_to_dicts(rows, model, validate=False))
+
+        for name, fn in variants.items():
+            ms, body = _time(fn, args.repeat)
+            sizes = _sizes(body)
+            print(f"{endpoint:<18}{name:<26}{ms:>9.1f}{sizes['raw']:>11}{sizes['gzip']:>10}{sizes.get('br', '-'):>10}")
+        print()
+
+
+if __name__ == "__main__":
+    main()
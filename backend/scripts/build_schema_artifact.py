@@ -0,0 +1,135 @@
+"""
+Single build step for the ESG schema.
+
+Reads the profiler workbook (ESG_Profiler_Logic_v2.xlsx), the curated flat
+field list and the UI tree, and writes one prebuilt artifact
+(backend/schemas/esg_schema_artifact.json) with a content hash. The build is
+incremental: if none of the source hashes changed it does nothing.
+
+    python -m backend.scripts.build_schema_artifact           # build if stale
+    python -m backend.scripts.build_schema_artifact --force   # always rebuild
+    python -m backend.scripts.build_schema_artifact --check   # exit 1 if stale (CI)
+
+Build-time dependency: openpyxl (pandas is no longer needed).
+"""
+import argparse
+import json
+import re
+import sys
+
+from backend.services.schema_artifact import (
+    ARTIFACT_PATH,
+    FLAT_SCHEMA_PATH,
+    UI_SCHEMA_PATH,
+    WORKBOOK_PATH,
+    compile_payload,
+    file_sha256,
+    read_payload,
+)
+
+SHEET_NAME = "Profiler_Logic"
+
+_MIN_RE = re.compile(r"min_threshold\s*=\s*([0-9.]+)")
+_MAX_RE = re.compile(r"max_threshold\s*=\s*([0-9.]+)")
+_PATTERN_RE = re.compile(r"pattern\s*=\s*(.+)")
+
+
+def parse_threshold(threshold):
+    min_val, max_val, pattern = None, None, None
+    if threshold is None:
+        return min_val, max_val, pattern
+    text = str(threshold)
+    if m := _MIN_RE.search(text):
+        min_val = float(m.group(1))
+    if m := _MAX_RE.search(text):
+        max_val = float(m.group(1))
+    if m := _PATTERN_RE.search(text):
+        pattern = m.group(1).strip()
+    return min_val, max_val, pattern
+
+
+def read_workbook_rules(path=WORKBOOK_PATH) -> dict:
+    """Profiler_Logic sheet → {column: rule}, same shape as esg_validation_schema.json."""
+    try:
+        import openpyxl
+    except ImportError:
+        raise SystemExit("Building the schema artifact requires openpyxl: pip install openpyxl")
+
+    workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    rows = workbook[SHEET_NAME].iter_rows(values_only=True)
+    header = [str(h).strip() if h is not None else "" for h in next(rows)]
+
+    rules = {}
+    for values in rows:
+        row = dict(zip(header, values))
+        field = row.get("Column")
+        if field is None or not str(field).strip():
+            continue  # blank / spacer rows
+        field_type = row.get("Type")
+        min_val, max_val, pattern = parse_threshold(row.get("Threshold"))
+        entry = {
+            "type": field_type,
+            "description": str(row.get("Description") or "").strip(),
+            "category": row.get("Category"),
+            "reference": row.get("Reference"),
+        }
+        if field_type == "numeric":
+            if min_val is not None:
+                entry["min"] = min_val
+            if max_val is not None:
+                entry["max"] = max_val
+        if field_type == "regex" and pattern:
+            entry["pattern"] = pattern
+        rules[str(field).strip()] = entry
+    workbook.close()
+    return rules
+
+
+def source_hashes() -> dict:
+    return {
+        "workbook": file_sha256(WORKBOOK_PATH),
+        "flat_schema": file_sha256(FLAT_SCHEMA_PATH),
+        "ui_schema": file_sha256(UI_SCHEMA_PATH),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Build the prebuilt ESG schema artifact")
+    parser.add_argument("--force", action="store_true", help="rebuild even if sources are unchanged")
+    parser.add_argument("--check", action="store_true", help="only report whether the artifact is stale")
+    args = parser.parse_args()
+
+    hashes = source_hashes()
+    try:
+        current = read_payload(ARTIFACT_PATH).get("source_hashes")
+    except (FileNotFoundError, ValueError, json.JSONDecodeError):
+        current = None
+
+    if current == hashes and not args.force:
+        print(f"✅ {ARTIFACT_PATH.name} is up to date")
+        return 0
+    if args.check:
+        print(f"❌ {ARTIFACT_PATH.name} is stale; run python -m backend.scripts.build_schema_artifact")
+        return 1
+
+    with open(FLAT_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        flat = json.load(f)
+    with open(UI_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        ui_tree = json.load(f)
+
+    payload = compile_payload(read_workbook_rules(), flat, ui_tree)
+    payload["source_hashes"] = hashes
+
+    with open(ARTIFACT_PATH, "w", encoding="utf-8") as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+    print(
+        f"✅ {ARTIFACT_PATH.name} written: {len(payload['validation_rules'])} rules, "
+        f"{len(payload['fields'])} fields, content hash {payload['content_hash'][:12]}"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
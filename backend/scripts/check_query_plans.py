@@ -0,0 +1,259 @@
+"""
+EXPLAIN-based plan regression check for the hot query paths.
+
+Seeds a realistic volume of rows inside a transaction, runs EXPLAIN for each
+hot query and fails (exit code 1) if any of them falls back to a sequential
+scan on one of the large tables. Everything is rolled back at the end, so it
+is safe to point at a development database that has been migrated to head:
+
+    alembic upgrade head
+    python -m backend.scripts.check_query_plans
+"""
+import json
+import sys
+from datetime import date
+
+from sqlalchemy import select, text, tuple_
+
+from backend.database import engine
+from backend.models.esg_scorecard import (
+    CompanyLatestPeriod,
+    EsgFormSubmission,
+    EsgSubmissionSnapshot,
+    ESGKpi,
+    ESGRawScore,
+    ESGFinalScore,
+    ESGKpiWeight,
+    ESGPillarWeight,
+    ESGKpiMapping,
+    FormFieldRegistry,
+)
+from backend.services.rankings import RANKINGS_VIEW, esg_score_rankings
+
+# Seed volume: COMPANIES x PERIODS x FIELDS form rows
+COMPANIES = 300
+PERIODS = 4
+FIELDS = 60
+COMPANY_OFFSET = 900000  # keep seeded ids clear of real companies
+# Rows in the small lookup tables (latest period, field registry): enough that
+# a sequential scan isn't the cheaper plan just because the table is tiny
+DIRECTORY_ROWS = 20000
+
+# Tables that must never be sequentially scanned by a hot query
+WATCHED_TABLES = {
+    "esg_form_submissions",
+    "esg_raw_scores",
+    "esg_final_scores",
+    "esg_kpi_weights",
+    "esg_pillar_weights",
+    "esg_kpi_mappings",
+    "esg_submission_snapshots",
+    "company_latest_period",
+    "form_field_registry",
+    RANKINGS_VIEW,
+}
+
+COMPANY_ID = COMPANY_OFFSET + COMPANIES // 2
+PERIOD = date(2024, 1, 1)
+
+
+def hot_queries():
+    """The statements issued by the engine, mapper and dashboard/form routes."""
+    fs, raw, ranks = EsgFormSubmission, ESGRawScore, esg_score_rankings
+    return {
+        "engine/forms: submission snapshot": select(EsgSubmissionSnapshot).filter_by(
+            company_id=COMPANY_ID, reporting_period=PERIOD
+        ),
+        "engine: current submissions (no snapshot)": select(fs).filter_by(
+            company_id=COMPANY_ID, reporting_period=PERIOD, is_current=True
+        ),
+        "mapper: current inputs": select(fs).filter_by(
+            company_id=COMPANY_ID, reporting_period=PERIOD, is_current=True, methodology="input"
+        ),
+        "dashboard: latest period": select(CompanyLatestPeriod.latest_period).filter_by(
+            company_id=COMPANY_ID
+        ),
+        "dashboard: kpi drilldown (keyset)": select(raw.id, raw.kpi_code, raw.weighted_score, ESGKpi.pillar)
+        .outerjoin(ESGKpi, ESGKpi.kpi_code == raw.kpi_code)
+        .where(
+            raw.company_id == COMPANY_ID,
+            raw.reporting_period == PERIOD,
+            tuple_(raw.weighted_score, raw.id) < tuple_(FIELDS // 2, 2**31 - 1),
+        )
+        .order_by(raw.weighted_score.desc(), raw.id.desc())
+        .limit(20),
+        "dashboard: rankings (keyset)": select(ranks.c.company_id, ranks.c.final_score, ranks.c.final_rank)
+        .where(
+            ranks.c.reporting_period == PERIOD,
+            ranks.c.final_rank.is_not(None),
+            tuple_(ranks.c.final_rank, ranks.c.company_id) > tuple_(10, 0),
+        )
+        .order_by(ranks.c.final_rank, ranks.c.company_id)
+        .limit(20),
+        "mappings: form-field prefix search": select(FormFieldRegistry.form_field)
+        .where(
+            FormFieldRegistry.is_kpi == True,  # noqa: E712
+            FormFieldRegistry.form_field.startswith("field_12", autoescape=True),
+        )
+        .order_by(FormFieldRegistry.form_field)
+        .limit(50),
+        "forms: historic": select(fs)
+        .where(fs.company_id == COMPANY_ID, fs.is_current == False)  # noqa: E712
+        .order_by(fs.reporting_period.desc(), fs.updated_at.desc()),
+        "engine: raw scores for period": select(ESGRawScore).filter_by(
+            company_id=COMPANY_ID, reporting_period=PERIOD
+        ),
+        "engine: final scores for period": select(ESGFinalScore).filter_by(
+            company_id=COMPANY_ID, reporting_period=PERIOD
+        ),
+        "weights: resolver kpi sets": select(ESGKpiWeight).filter_by(
+            company_id=COMPANY_ID, is_current=True
+        ),
+        "weights: resolver pillar sets": select(ESGPillarWeight).filter_by(
+            company_id=COMPANY_ID, is_current=True
+        ),
+        "weights: kpi set by valid_from": select(ESGKpiWeight).filter_by(
+            company_id=COMPANY_ID, valid_from=PERIOD, is_current=True
+        ),
+        "mappings: current for period": select(ESGKpiMapping).filter_by(
+            reporting_period=PERIOD, is_current=True
+        ),
+        "mappings: history": select(ESGKpiMapping)
+        .filter_by(form_field="field_7")
+        .order_by(ESGKpiMapping.updated_at.desc()),
+    }
+
+
+SEED_SQL = [
+    """
+    INSERT INTO companies (id, name)
+    SELECT c, 'Plan check ' || c
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c
+    ON CONFLICT (id) DO NOTHING
+    """,
+    """
+    INSERT INTO esg_kpis (kpi_code, kpi_description, pillar, status)
+    SELECT 'PLANCHK_' || k, 'Plan check KPI ' || k,
+           (ARRAY['Environmental', 'Social', 'Governance'])[1 + k % 3], 'active'
+    FROM generate_series(1, :fields) AS k
+    ON CONFLICT (kpi_code) DO NOTHING
+    """,
+    """
+    INSERT INTO esg_form_submissions
+        (company_id, reporting_period, form_field, field_value, methodology, is_kpi, is_current)
+    SELECT c, DATE '2021-01-01' + (p * INTERVAL '1 year'), 'field_' || f, (c * f)::text,
+           CASE WHEN f % 2 = 0 THEN 'input' ELSE 'kpi' END, f % 2 = 1, (c + f) % 10 <> 0
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c,
+         generate_series(0, :periods - 1) AS p,
+         generate_series(1, :fields) AS f
+    """,
+    """
+    INSERT INTO esg_raw_scores
+        (company_id, reporting_period, kpi_code, user_weightage, normalized_score, weighted_score)
+    SELECT c, DATE '2021-01-01' + (p * INTERVAL '1 year'), 'PLANCHK_' || f, 1, f, f
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c,
+         generate_series(0, :periods - 1) AS p,
+         generate_series(1, :fields) AS f
+    """,
+    """
+    INSERT INTO esg_final_scores
+        (company_id, reporting_period, environmental_score, social_score,
+         governance_score, final_esg_score)
+    SELECT c, DATE '2021-01-01' + (p * INTERVAL '1 year'), c % 89, c % 83, c % 79, c % 97
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c,
+         generate_series(0, :periods - 1) AS p
+    """,
+    """
+    INSERT INTO esg_kpi_weights (company_id, reporting_period, valid_from, kpi_code, weight, is_current)
+    SELECT c, DATE '2021-01-01' + (p * INTERVAL '1 year'), DATE '2021-01-01' + (p * INTERVAL '1 year'),
+           'PLANCHK_' || f, 1, p = :periods - 1
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c,
+         generate_series(0, :periods - 1) AS p,
+         generate_series(1, :fields) AS f
+    """,
+    """
+    INSERT INTO esg_pillar_weights (company_id, reporting_period, valid_from, pillar, pillar_weight, is_current)
+    SELECT c, DATE '2021-01-01' + (p * INTERVAL '1 year'), DATE '2021-01-01' + (p * INTERVAL '1 year'),
+           pillar, 33.3, TRUE
+    FROM generate_series(:c0 + 1, :c0 + :companies) AS c,
+         generate_series(0, :periods - 1) AS p,
+         unnest(ARRAY['Environmental', 'Social', 'Governance']) AS pillar
+    """,
+    """
+    INSERT INTO esg_submission_snapshots (company_id, reporting_period, data)
+    SELECT company_id, reporting_period,
+           jsonb_object_agg(form_field, jsonb_build_object('value', field_value, 'is_kpi', is_kpi,
+                                                           'methodology', methodology))
+    FROM esg_form_submissions
+    WHERE company_id > :c0 AND is_current
+    GROUP BY company_id, reporting_period
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO company_latest_period (company_id, latest_period)
+    SELECT :c0 + c, DATE '2021-01-01' + ((c % :periods) * INTERVAL '1 year')
+    FROM generate_series(1, :directory) AS c
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO form_field_registry (form_field, is_kpi, usage_count)
+    SELECT 'field_' || f, f % 2 = 1, f % 100
+    FROM generate_series(1, :directory) AS f
+    ON CONFLICT DO NOTHING
+    """,
+    f"REFRESH MATERIALIZED VIEW {RANKINGS_VIEW}",
+    """
+    INSERT INTO esg_kpi_mappings (form_field, kpi_code, reporting_period, is_current)
+    SELECT 'field_' || f, 'PLANCHK_' || (1 + f % :fields),
+           DATE '2021-01-01' + (v * INTERVAL '1 year'), v = :periods - 1
+    FROM generate_series(1, :fields * 50) AS f,
+         generate_series(0, :periods - 1) AS v
+    """,
+]
+
+
+def _seq_scans(plan_node, found):
+    if plan_node.get("Node Type") == "Seq Scan" and plan_node.get("Relation Name") in WATCHED_TABLES:
+        found.append(plan_node["Relation Name"])
+    for child in plan_node.get("Plans", []):
+        _seq_scans(child, found)
+    return found
+
+
+def main() -> int:
+    params = {
+        "c0": COMPANY_OFFSET, "companies": COMPANIES, "periods": PERIODS, "fields": FIELDS,
+        "directory": DIRECTORY_ROWS,
+    }
+    failures = []
+
+    with engine.connect() as conn:
+        trans = conn.begin()
+        try:
+            for sql in SEED_SQL:
+                conn.execute(text(sql), params)
+            for table in sorted(WATCHED_TABLES):
+                conn.execute(text(f"ANALYZE {table}"))
+
+            for label, stmt in hot_queries().items():
+                compiled = stmt.compile(conn, compile_kwargs={"literal_binds": True})
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                scans = _seq_scans(plan[0]["Plan"], [])
+                status = "SEQ SCAN on " + ", ".join(scans) if scans else "ok"
+                print(f"{label:<44} {status}")
+                if scans:
+                    failures.append(label)
+        finally:
+            trans.rollback()
+
+    if failures:
+        print(f"\n❌ {len(failures)} hot query plan(s) regressed to a sequential scan")
+        return 1
+    print("\n✅ All hot queries use an index")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
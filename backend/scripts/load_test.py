@@ -0,0 +1,95 @@
+"""
+Concurrency load test for the read-heavy API routes.
+
+Fires requests from N concurrent clients against one or more running
+backends and prints requests/sec and latency percentiles for each, so the
+sync (threadpool) and async builds can be compared side by side:
+
+    uvicorn backend.main:app --port 8000            # build A
+    uvicorn backend.main:app --port 8001            # build B
+    python -m backend.scripts.load_test --base-url http://127.0.0.1:8000 \
+        --base-url http://127.0.0.1:8001 --concurrency 500 --requests 20000
+
+Requires httpx (`pip install httpx`).
+"""
+import argparse
+import asyncio
+import itertools
+import statistics
+import time
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - dev tool only
+    raise SystemExit("load_test requires httpx: pip install httpx")
+
+DEFAULT_PATHS = [
+    "/kpis/",
+    "/kpi-mappings/",
+    "/weights/kpis?company_id=1&reporting_period=2024-01-01",
+    "/weights/pillars?company_id=1&reporting_period=2024-01-01",
+    "/dashboard/latest-period/1",
+    "/form-submissions/current?company_id=1",
+]
+
+
+async def _run(base_url: str, paths, concurrency: int, total: int):
+    latencies = []
+    errors = 0
+    path_cycle = itertools.cycle(paths)
+    remaining = iter(range(total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        async def worker():
+            nonlocal errors
+            for _ in remaining:
+                path = next(path_cycle)
+                start = time.perf_counter()
+                try:
+                    resp = await client.get(path)
+                    if resp.status_code >= 500:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000  # noqa: E731
+    return {
+        "base_url": base_url,
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", action="append", required=True, help="backend to test (repeatable)")
+    parser.add_argument("--path", action="append", help="GET path to hit (repeatable, default: read routes)")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    paths = args.path or DEFAULT_PATHS
+    print(f"{args.concurrency} concurrent clients, {args.requests} requests per target\n")
+    print(f"{'target':<32}{'req/s':>10}{'mean ms':>10}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}")
+    for base_url in args.base_url:
+        r = asyncio.run(_run(base_url, paths, args.concurrency, args.requests))
+        print(
+            f"{r['base_url']:<32}{r['rps']:>10.1f}{r['mean_ms']:>10.1f}"
+            f"{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['errors']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
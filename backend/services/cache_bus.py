@@ -0,0 +1,229 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Write paths call `publish(db, topic, keys)` / `apublish(...)` inside their
+transaction. That bumps the topic's version counter and queues a NOTIFY
+on CACHE_CHANNEL, so every worker's PgListener hears it only if the write
+commits. The writing worker also evicts locally right after commit, so its
+own next request never reads a stale entry.
+
+Caches register an `invalidate(key)` callable per topic; `invalidate(None)`
+means "drop everything for this topic".
+
+If the listener connection drops, `CacheBus` polls the version counters
+every CACHE_POLL_SECONDS and evicts whole topics whose version moved. It
+polls once more after reconnecting to cover events sent while it was down.
+
+Version counters are one sequence per topic (cache_version_<topic>).
+nextval() takes no row lock, so concurrent writers on hot paths such as
+form submissions do not queue behind each other. A bump from a rolled-back
+transaction only causes one extra eviction in polling mode.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.database import AsyncSessionLocal
+from backend.services.pg_listener import anotify, notify, pg_listener
+
+logger = logging.getLogger(__name__)
+
+CACHE_CHANNEL = "esg_cache"
+CACHE_POLL_SECONDS = float(os.getenv("CACHE_POLL_SECONDS", "5.0"))
+CACHE_NOTIFY_MAX_KEYS = int(os.getenv("CACHE_NOTIFY_MAX_KEYS", "200"))  # NOTIFY payloads cap at 8000 bytes
+
+# Topics (one version sequence each; see migrations 3f6b1d2a9c47, 9a1c6e4d2b37).
+# Add a topic only together with a cache that registers for it.
+KPI_CATALOG = "kpi_catalog"
+KPI_MAPPINGS = "kpi_mappings"
+WEIGHTS = "weights"                # keys: company_id
+WEIGHT_PROFILE = "weight_profile"  # keys: profile_id
+TOPICS = (KPI_CATALOG, KPI_MAPPINGS, WEIGHTS, WEIGHT_PROFILE)
+
+
+def _bump_sql(topic: str):
+    if topic not in TOPICS:
+        raise ValueError(f"Unknown cache topic {topic}")
+    return text(f"SELECT nextval('cache_version_{topic}')")
+
+
+VERSIONS_SQL = text(" UNION ALL ".join(
+    f"SELECT '{t}' AS topic, CASE WHEN is_called THEN last_value ELSE 0 END AS version FROM cache_version_{t}"
+    for t in TOPICS
+))
+
+
+def _keys(keys: Optional[Iterable]) -> Optional[List]:
+    if keys is None:
+        return None
+    keys = sorted(set(keys), key=str)
+    return keys if len(keys) <= CACHE_NOTIFY_MAX_KEYS else None  # too many: evict the whole topic
+
+
+def _payload(topic: str, keys: Optional[List], version: int) -> dict:
+    return {"topic": topic, "keys": keys, "version": version, "sent_at": time.time(), "pid": os.getpid()}
+
+
+class CacheBus:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._handlers: Dict[str, List[Callable]] = defaultdict(list)
+        self._versions: Dict[str, int] = {}
+        self._task: Optional[asyncio.Task] = None
+        # Metrics
+        self.received = 0
+        self.malformed = 0
+        self.polls = 0
+        self.poll_evictions = 0
+        self.by_topic: Dict[str, int] = defaultdict(int)
+        self.lag_last_ms = 0.0
+        self.lag_max_ms = 0.0
+        self._lag_total_ms = 0.0
+
+    # -----------------------------
+    # Registration / eviction
+    # -----------------------------
+    def register(self, topic: str, invalidate: Callable[[Optional[object]], None]):
+        """invalidate(key) is called per key, or once with None to drop the whole topic."""
+        if topic not in TOPICS:
+            raise ValueError(f"Unknown cache topic {topic}")
+        self._handlers[topic].append(invalidate)
+
+    def evict(self, topic: str, keys: Optional[Iterable] = None):
+        for invalidate in self._handlers.get(topic, ()):
+            try:
+                if keys is None:
+                    invalidate(None)
+                else:
+                    for key in keys:
+                        invalidate(key)
+            except Exception:
+                logger.exception("Cache invalidation for %s failed", topic)
+
+    def _seen(self, topic: str, version: int):
+        with self._lock:
+            if version > self._versions.get(topic, 0):
+                self._versions[topic] = version
+
+    # -----------------------------
+    # Publishing (inside the writer's transaction)
+    # -----------------------------
+    def _evict_on_commit(self, session: Session, topic: str, keys: Optional[List], version: int):
+        def _after_commit(_session):
+            self.evict(topic, keys)
+            self._seen(topic, version)
+        event.listen(session, "after_commit", _after_commit, once=True)
+
+    def publish(self, db: Session, topic: str, keys: Optional[Iterable] = None):
+        keys = _keys(keys)
+        version = db.scalar(_bump_sql(topic))
+        notify(db, CACHE_CHANNEL, _payload(topic, keys, version))
+        self._evict_on_commit(db, topic, keys, version)
+
+    async def apublish(self, db: AsyncSession, topic: str, keys: Optional[Iterable] = None):
+        keys = _keys(keys)
+        version = await db.scalar(_bump_sql(topic))
+        await anotify(db, CACHE_CHANNEL, _payload(topic, keys, version))
+        self._evict_on_commit(db.sync_session, topic, keys, version)
+
+    # -----------------------------
+    # Receiving (PgListener callback)
+    # -----------------------------
+    def on_notify(self, payload: str):
+        try:
+            event_ = json.loads(payload)
+            topic, keys, version = event_["topic"], event_.get("keys"), int(event_["version"])
+            lag_ms = max(0.0, (time.time() - float(event_["sent_at"])) * 1000)
+        except (ValueError, KeyError, TypeError):
+            self.malformed += 1
+            logger.warning("Ignoring malformed cache event: %.200s", payload)
+            return
+
+        self.received += 1
+        self.by_topic[topic] += 1
+        self.lag_last_ms = lag_ms
+        self.lag_max_ms = max(self.lag_max_ms, lag_ms)
+        self._lag_total_ms += lag_ms
+
+        self.evict(topic, keys)
+        self._seen(topic, version)
+
+    # -----------------------------
+    # Fallback: version polling
+    # -----------------------------
+    async def poll(self, evict: bool = True):
+        """Evict every topic whose version moved past what this worker has seen."""
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(VERSIONS_SQL)).all()
+        self.polls += 1
+        for topic, version in rows:
+            with self._lock:
+                moved = version > self._versions.get(topic, 0)
+            if moved and evict:
+                self.poll_evictions += 1
+                self.evict(topic, None)
+            self._seen(topic, version)
+
+    async def _run(self):
+        try:
+            await self.poll(evict=False)  # baseline; caches start empty
+        except Exception as e:
+            logger.warning("Cache version baseline failed: %s", e)
+
+        seen_reconnects = pg_listener.reconnects
+        while True:
+            await asyncio.sleep(CACHE_POLL_SECONDS)
+            if pg_listener.connected and pg_listener.reconnects == seen_reconnects:
+                continue
+            # Listener down, or back after a drop: poll (one catch-up poll once reconnected)
+            try:
+                await self.poll()
+            except Exception as e:
+                logger.warning("Cache version poll failed: %s", e)
+                continue
+            if pg_listener.connected:
+                seen_reconnects = pg_listener.reconnects
+
+    def start(self):
+        pg_listener.subscribe(CACHE_CHANNEL, self.on_notify)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "mode": "notify" if pg_listener.connected else "polling",
+            "received": self.received,
+            "malformed": self.malformed,
+            "by_topic": dict(self.by_topic),
+            "lag_ms": {
+                "last": round(self.lag_last_ms, 2),
+                "max": round(self.lag_max_ms, 2),
+                "avg": round(self._lag_total_ms / self.received, 2) if self.received else 0.0,
+            },
+            "polls": self.polls,
+            "poll_evictions": self.poll_evictions,
+            "versions": dict(self._versions),
+        }
+
+
+cache_bus = CacheBus()
+publish = cache_bus.publish
+apublish = cache_bus.apublish
@@ -0,0 +1,153 @@
+"""
+Fast serialization for large list endpoints.
+
+`list_response()` turns rows into a ready-made Response:
+- JSON via orjson (falls back to the stdlib encoder if orjson is missing);
+- trusted ORM rows are copied field-by-field instead of being re-validated
+  through the response model (RESPONSE_VALIDATE_ROWS=1 restores validation).
+  Models that declare validators or serializers always take the validating
+  path, since those change the output (e.g. field_value coercion);
+- MessagePack when the client sends `Accept: application/msgpack`
+  (needs `msgpack`);
+- brotli (needs `brotli`) or gzip when allowed by Accept-Encoding and the
+  body is larger than RESPONSE_COMPRESS_MIN_BYTES.
+
+Routes keep their `response_model` so the OpenAPI schema is unchanged.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Iterable, List, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional
+    brotli = None
+
+RESPONSE_VALIDATE_ROWS = os.getenv("RESPONSE_VALIDATE_ROWS", "0").strip().lower() in ("1", "true", "yes", "on")
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_GZIP_LEVEL = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+RESPONSE_BROTLI_QUALITY = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def dumps_json(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def dumps_msgpack(data: Any) -> bytes:
+    return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+@lru_cache(maxsize=None)
+def _adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+@lru_cache(maxsize=None)
+def _has_validators(model: Type[BaseModel]) -> bool:
+    """True if the model (or a nested model field) transforms values on validation/dump."""
+    decorators = model.__pydantic_decorators__
+    if any((
+        decorators.validators, decorators.field_validators, decorators.root_validators,
+        decorators.model_validators, decorators.field_serializers, decorators.model_serializers,
+        decorators.computed_fields,
+    )):
+        return True
+    for field in model.model_fields.values():
+        for arg in (field.annotation, *getattr(field.annotation, "__args__", ())):
+            if isinstance(arg, type) and issubclass(arg, BaseModel) and _has_validators(arg):
+                return True
+    return False
+
+
+def rows_to_dicts(rows: Iterable, model: Type[BaseModel], validate: Optional[bool] = None) -> List[dict]:
+    """Rows (ORM objects or dicts) → plain dicts with the model's fields."""
+    if _has_validators(model) or (RESPONSE_VALIDATE_ROWS if validate is None else validate):
+        return [item.model_dump() for item in _adapter(model).validate_python(list(rows), from_attributes=True)]
+
+    fields = tuple(model.model_fields)
+    return [
+        {f: row.get(f) for f in fields} if isinstance(row, dict) else {f: getattr(row, f, None) for f in fields}
+        for row in rows
+    ]
+
+
+class FastJSONResponse(Response):
+    """orjson-backed default response class for the app."""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+def _accepts(header: str, token: str) -> bool:
+    """True if `token` is listed in an Accept-Encoding style header with q > 0."""
+    for part in header.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        if name.lower() != token:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def encode(request: Request, data: Any) -> Response:
+    """Negotiate body format (JSON / MessagePack) and compression for `data`."""
+    accept = request.headers.get("accept", "").lower()
+    if msgpack is not None and any(t in accept for t in MSGPACK_TYPES):
+        body, media_type = dumps_msgpack(data), "application/msgpack"
+    else:
+        body, media_type = dumps_json(data), "application/json"
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= RESPONSE_COMPRESS_MIN_BYTES:
+        accept_encoding = request.headers.get("accept-encoding", "").lower()
+        if brotli is not None and _accepts(accept_encoding, "br"):
+            body = brotli.compress(body, quality=RESPONSE_BROTLI_QUALITY)
+            headers["Content-Encoding"] = "br"
+        elif _accepts(accept_encoding, "gzip"):
+            body = gzip.compress(body, compresslevel=RESPONSE_GZIP_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def list_response(request: Request, rows: Iterable, model: Type[BaseModel], validate: Optional[bool] = None) -> Response:
+    return encode(request, rows_to_dicts(rows, model, validate))
@@ -0,0 +1,123 @@
+"""
+Maintained form-field registry (form_field_registry).
+
+The /kpi-mappings/form-fields dropdown reads this small table instead of
+running SELECT DISTINCT over esg_form_submissions.
+
+- Schema fields are seeded from the artifact at startup (`seed_from_artifact`).
+- Submission writes add RETURNING `INSERTED` and pass the rows to
+  `registry_upsert_stmt`. Only rows inserted for the first time (a new
+  company/period/field) touch the registry: they bump usage_count and move
+  last_seen_period forward. Edits of existing values don't lock the shared
+  registry rows, so concurrent companies don't queue on them, except when an
+  edit turns a field into a KPI the registry doesn't list as one yet
+  (`kpi_promotion_stmt`, a one-off per field).
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, literal_column, or_, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from backend.models.esg_scorecard import FormFieldRegistry
+from backend.services.schema_artifact import load_artifact
+
+logger = logging.getLogger(__name__)
+
+# Add to an esg_form_submissions upsert's RETURNING: true for fresh inserts
+INSERTED = literal_column("xmax = 0").label("inserted")
+
+
+def registry_upsert_stmt(rows: Iterable):
+    """
+    Upsert for the registry from RETURNING rows (form_field, reporting_period,
+    is_kpi, inserted); None if no row was a first insert.
+    """
+    fields: Dict[str, dict] = {}
+    for row in rows:
+        if not getattr(row, "inserted", False):
+            continue
+        entry = fields.setdefault(row.form_field, {
+            "form_field": row.form_field,
+            "is_kpi": False,
+            "usage_count": 0,
+            "last_seen_period": row.reporting_period,
+        })
+        entry["is_kpi"] = entry["is_kpi"] or bool(row.is_kpi)
+        entry["usage_count"] += 1
+        entry["last_seen_period"] = max(entry["last_seen_period"], row.reporting_period)
+    if not fields:
+        return None
+
+    # Sorted so concurrent writers lock registry rows in the same order
+    stmt = insert(FormFieldRegistry).values([fields[k] for k in sorted(fields)])
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["form_field"],
+        set_={
+            "is_kpi": FormFieldRegistry.is_kpi | excluded.is_kpi,
+            "usage_count": FormFieldRegistry.usage_count + excluded.usage_count,
+            "last_seen_period": func.greatest(FormFieldRegistry.last_seen_period, excluded.last_seen_period),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def kpi_promotion_stmt(rows: Iterable):
+    """
+    Mark fields is_kpi when an existing submission row was updated to is_kpi
+    (RETURNING rows that were not first inserts). Registry rows already
+    flagged fail the WHERE and are not locked. None if there is nothing to check.
+    """
+    fields = sorted({
+        row.form_field for row in rows
+        if row.is_kpi and not getattr(row, "inserted", False)
+    })
+    if not fields:
+        return None
+    return (
+        update(FormFieldRegistry)
+        .where(FormFieldRegistry.form_field.in_(fields), FormFieldRegistry.is_kpi.is_(False))
+        .values(is_kpi=True, updated_at=func.now())
+    )
+
+
+def seed_stmt(fields: Optional[list] = None):
+    """Upsert the artifact's fields; rows already matching are left alone."""
+    fields = load_artifact().fields if fields is None else fields
+    by_name = {f["name"]: f for f in fields if f.get("name")}  # one row per field
+    stmt = insert(FormFieldRegistry).values([
+        {
+            "form_field": name,
+            "label": f.get("label"),
+            "is_kpi": f.get("method") == "kpi",
+            "in_schema": True,
+        }
+        for name, f in sorted(by_name.items())
+    ])
+    excluded = stmt.excluded
+    return stmt.on_conflict_do_update(
+        index_elements=["form_field"],
+        set_={
+            "label": excluded.label,
+            "is_kpi": FormFieldRegistry.is_kpi | excluded.is_kpi,
+            "in_schema": True,
+            "updated_at": func.now(),
+        },
+        where=or_(
+            FormFieldRegistry.label.is_distinct_from(excluded.label),
+            FormFieldRegistry.in_schema.is_not(True),
+            excluded.is_kpi & ~FormFieldRegistry.is_kpi,
+        ),
+    )
+
+
+async def seed_from_artifact(db: AsyncSession):
+    fields = load_artifact().fields
+    if not fields:
+        return 0
+    await db.execute(seed_stmt(fields))
+    await db.commit()
+    logger.info("Form field registry seeded with %d schema fields", len(fields))
+    return len(fields)
@@ -0,0 +1,161 @@
+"""
+Postgres-backed store for `Idempotency-Key` replays (idempotency_keys table).
+
+Clients that retry a write with the same Idempotency-Key get the original
+response back instead of re-running the write, whichever uvicorn worker the
+retry lands on. Keys are unique per (scope, client, key): scope is the
+route, client is the X-Client-Id header (else the remote address), so two
+clients that happen to pick the same key don't collide.
+
+- `begin()` claims the key as in-flight in its own short transaction, so a
+  concurrent retry on any worker gets 409; a completed key is replayed and
+  a key reused with a different body gets 422.
+- `complete()` stores the response; `release()` drops the claim when the
+  write failed, so the client can retry.
+- A claim left in-flight by a crashed worker is taken over after
+  IDEMPOTENCY_LEASE_SECONDS (the retry then re-runs the write, which the
+  upsert routes treat as a no-op for unchanged rows). Completed keys expire after
+  IDEMPOTENCY_TTL_SECONDS and are purged every IDEMPOTENCY_PURGE_EVERY
+  completions.
+"""
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, Request
+from sqlalchemy import and_, delete, func, null, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+
+from backend.database import AsyncSessionLocal
+from backend.models.esg_scorecard import IdempotencyKey
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCY_LEASE_SECONDS = int(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "120"))
+IDEMPOTENCY_PURGE_EVERY = int(os.getenv("IDEMPOTENCY_PURGE_EVERY", "500"))
+CLIENT_ID_HEADER = "X-Client-Id"
+
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+
+@dataclass
+class CachedResponse:
+    fingerprint: str
+    status_code: int
+    body: Any
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+def client_identity(request: Request) -> str:
+    """X-Client-Id if the client sends one, else its address."""
+    return request.headers.get(CLIENT_ID_HEADER) or (request.client.host if request.client else "")
+
+
+class IdempotencyStore:
+    def __init__(self, ttl_seconds: int = IDEMPOTENCY_TTL_SECONDS, lease_seconds: int = IDEMPOTENCY_LEASE_SECONDS):
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.lease = timedelta(seconds=lease_seconds)
+        self._completed = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        """Stable hash of the request body, used to detect key reuse with a different payload."""
+        raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _where(scope: str, client_id: str, key: str):
+        return and_(
+            IdempotencyKey.scope == scope,
+            IdempotencyKey.client_id == client_id,
+            IdempotencyKey.key == key,
+        )
+
+    def _claim_stmt(self, scope: str, client_id: str, key: str, fingerprint: str):
+        """Insert as in-flight, or take over an abandoned claim / expired response."""
+        stmt = insert(IdempotencyKey).values(
+            scope=scope, client_id=client_id, key=key, fingerprint=fingerprint, state=IN_FLIGHT,
+        )
+        return stmt.on_conflict_do_update(
+            index_elements=["scope", "client_id", "key"],
+            set_={
+                "fingerprint": stmt.excluded.fingerprint,
+                "state": IN_FLIGHT,
+                "status_code": None,
+                "body": null(),
+                "headers": null(),
+                "claimed_at": func.now(),
+                "completed_at": None,
+            },
+            where=or_(
+                and_(IdempotencyKey.state == IN_FLIGHT, IdempotencyKey.claimed_at < func.now() - self.lease),
+                and_(IdempotencyKey.state == DONE, IdempotencyKey.completed_at < func.now() - self.ttl),
+            ),
+        ).returning(IdempotencyKey.key)
+
+    async def begin(self, scope: str, client_id: str, key: str, fingerprint: str) -> Optional[CachedResponse]:
+        """None if this request now owns the key; the stored response if it already completed."""
+        async with AsyncSessionLocal() as db:
+            claimed = await db.scalar(self._claim_stmt(scope, client_id, key, fingerprint))
+            await db.commit()
+            if claimed is not None:
+                return None
+
+            entry = (await db.execute(
+                select(IdempotencyKey).where(self._where(scope, client_id, key))
+            )).scalar_one_or_none()
+
+        if entry is None:  # released between the two statements: the client should retry
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still being processed")
+        if entry.fingerprint != fingerprint:
+            raise HTTPException(
+                status_code=422,
+                detail="Idempotency-Key was already used with a different request body",
+            )
+        if entry.state != DONE:
+            raise HTTPException(
+                status_code=409,
+                detail="A request with this Idempotency-Key is still being processed",
+            )
+        return CachedResponse(entry.fingerprint, entry.status_code, entry.body, entry.headers or {})
+
+    async def complete(self, scope: str, client_id: str, key: str, entry: CachedResponse) -> None:
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(IdempotencyKey)
+                .where(self._where(scope, client_id, key))
+                .values(
+                    state=DONE,
+                    status_code=entry.status_code,
+                    body=entry.body,
+                    headers=entry.headers,
+                    completed_at=func.now(),
+                )
+            )
+            if self._due_for_purge():
+                await db.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.state == DONE,
+                    IdempotencyKey.completed_at < func.now() - self.ttl,
+                ))
+            await db.commit()
+
+    async def release(self, scope: str, client_id: str, key: str) -> None:
+        """Drop an in-flight claim after a failed write."""
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(IdempotencyKey).where(
+                self._where(scope, client_id, key), IdempotencyKey.state == IN_FLIGHT,
+            ))
+            await db.commit()
+
+    def _due_for_purge(self) -> bool:
+        with self._lock:
+            self._completed += 1
+            return self._completed % IDEMPOTENCY_PURGE_EVERY == 0
+
+
+idempotency_store = IdempotencyStore()
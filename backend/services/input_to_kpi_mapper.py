@@ -1,7 +1,17 @@
+import logging
+
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.sql import func
 from backend.models.esg_scorecard import EsgFormSubmission
+from backend.services.form_field_registry import INSERTED, kpi_promotion_stmt, registry_upsert_stmt
+from backend.services.metrics import registry, timed
+from backend.services.structured_logging import RateLimitedLog
+from backend.services.submission_snapshots import SNAPSHOT_COLUMNS, snapshot_upsert_stmt
+
+logger = logging.getLogger(__name__)
+_debug = RateLimitedLog(logger)  # called per submission write
 
 # Extended emission factors (kg CO2 per unit)
 EMISSION_FACTORS = {
@@ -13,7 +23,11 @@ EMISSION_FACTORS = {
     # Add more fuels if schema expands
 }
 
+MAPPER_RUNS = registry.counter("kpi_mapper_runs_total", "Input→KPI mapper runs by outcome", ("outcome",))
+MAPPER_DURATION = registry.histogram("kpi_mapper_duration_seconds", "Input→KPI mapper run time")
 
+
+@timed(MAPPER_DURATION, MAPPER_RUNS)
 def map_inputs_to_kpis(db: Session, company_id: int, reporting_period: str):
     """
     Convert ESG Input methodology records into KPI methodology records.
@@ -111,6 +125,7 @@ def map_inputs_to_kpis(db: Session, company_id: int, reporting_period: str):
             )
 
     # --- Upsert KPI records into esg_form_submissions ---
+    written = []
     for kpi_field, value in kpis.items():
         # ✅ Skip if user already entered this KPI
         user_kpi_exists = db.query(EsgFormSubmission).filter_by(
@@ -123,7 +138,7 @@ def map_inputs_to_kpis(db: Session, company_id: int, reporting_period: str):
         ).first()
 
         if user_kpi_exists:
-            print(f"[Mapper] Skipping {kpi_field} — user entry exists.")
+            _debug.debug("Mapper skipping %s: user entry exists", kpi_field, extra={"company_id": company_id})
             continue
 
         # Otherwise insert/update the computed KPI
@@ -145,9 +160,24 @@ def map_inputs_to_kpis(db: Session, company_id: int, reporting_period: str):
                 "is_kpi": True,
                 "methodology": "kpi",
             },
-        )
-        db.execute(stmt)
+            # Skip the write when the computed value has not changed
+            where=or_(
+                EsgFormSubmission.field_value.is_distinct_from(str(value)),
+                EsgFormSubmission.is_kpi.is_not(True),
+                EsgFormSubmission.methodology.is_distinct_from("kpi"),
+                EsgFormSubmission.is_current.is_not(True),
+            ),
+        ).returning(*SNAPSHOT_COLUMNS, INSERTED)
+        written.extend(db.execute(stmt).all())
+
+    # ✅ Keep the wide snapshot and the field registry in step, same transaction
+    for derived in (snapshot_upsert_stmt(written), registry_upsert_stmt(written), kpi_promotion_stmt(written)):
+        if derived is not None:
+            db.execute(derived)
 
     db.commit()
-    print(f"[Mapper] Computed KPIs: {kpis}")
+    _debug.debug(
+        "Mapper computed %d KPIs (%d written)", len(kpis), len(written),
+        extra={"company_id": company_id, "reporting_period": str(reporting_period)},
+    )
     return kpis
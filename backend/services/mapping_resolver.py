@@ -0,0 +1,124 @@
+"""
+Period-aware form_field → KPI mapping resolution for the engine.
+
+Mappings are versioned per reporting period (kpi_mapping_routes): a row
+with reporting_period = P applies to P only, and a row without a period is
+the default for every period. For a period, a form_field uses its
+period-specific row where present, else its default.
+
+All current mappings are loaded once, joined to the KPI catalog (pillar,
+normalization method), into a `MappingIndex`; the merged table for each
+period is built on first use and kept with the index. KPI_MAPPINGS and
+KPI_CATALOG events on the cache bus drop the index on every worker; it
+also expires after MAPPING_CACHE_TTL_SECONDS as a backstop.
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from backend.models.esg_scorecard import ESGKpi, ESGKpiMapping
+from backend.services.cache_bus import KPI_CATALOG, KPI_MAPPINGS, cache_bus
+
+MAPPING_CACHE_TTL_SECONDS = float(os.getenv("MAPPING_CACHE_TTL_SECONDS", "300"))
+
+
+class MappedKpi(NamedTuple):
+    kpi_code: str
+    aggregation_method: str
+    pillar: str
+    normalization_method: Optional[str]
+
+
+MappingTable = Dict[str, MappedKpi]
+
+
+@dataclass
+class MappingIndex:
+    defaults: MappingTable
+    by_period: Dict[date, MappingTable]
+    version: int
+    loaded_at: float = field(default_factory=time.monotonic)
+    _tables: Dict[Optional[date], MappingTable] = field(default_factory=dict)
+
+    def table(self, period: Optional[date]) -> MappingTable:
+        """form_field → MappedKpi in effect for `period` (built once per period)."""
+        table = self._tables.get(period)
+        if table is None:
+            specific = self.by_period.get(period)
+            table = {**self.defaults, **specific} if specific else self.defaults
+            self._tables[period] = table
+        return table
+
+
+def _mappings_stmt():
+    # Latest row wins if a field has more than one current row for a period
+    return (
+        select(
+            ESGKpiMapping.form_field,
+            ESGKpiMapping.reporting_period,
+            ESGKpiMapping.kpi_code,
+            ESGKpiMapping.aggregation_method,
+            ESGKpi.pillar,
+            ESGKpi.normalization_method,
+        )
+        .join(ESGKpi, ESGKpi.kpi_code == ESGKpiMapping.kpi_code)
+        .where(ESGKpiMapping.is_current == True)
+        .order_by(ESGKpiMapping.updated_at.nulls_first(), ESGKpiMapping.id)
+    )
+
+
+def _build(rows, version: int) -> MappingIndex:
+    defaults: MappingTable = {}
+    by_period: Dict[date, MappingTable] = {}
+    for row in rows:
+        entry = MappedKpi(
+            row.kpi_code, (row.aggregation_method or "SUM").upper(), row.pillar, row.normalization_method
+        )
+        target = defaults if row.reporting_period is None else by_period.setdefault(row.reporting_period, {})
+        target[row.form_field] = entry
+    return MappingIndex(defaults, by_period, version)
+
+
+class MappingResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[MappingIndex] = None
+        self._version = 0
+        self.builds = 0
+
+    def invalidate(self, _key=None):
+        with self._lock:
+            self._index = None
+            self._version += 1
+
+    def index(self, db: Session) -> MappingIndex:
+        with self._lock:
+            index, version = self._index, self._version
+        if index is not None and time.monotonic() - index.loaded_at < MAPPING_CACHE_TTL_SECONDS:
+            return index
+
+        index = _build(db.execute(_mappings_stmt()).all(), version)
+        with self._lock:
+            self.builds += 1
+            # Don't keep an index that an invalidation overtook while it was loading
+            if self._version == version:
+                self._index = index
+        return index
+
+    def for_period(self, db: Session, period) -> MappingTable:
+        if isinstance(period, str):
+            period = date.fromisoformat(period)
+        return self.index(db).table(period)
+
+
+mapping_resolver = MappingResolver()
+
+# Mapping or catalog writes on any worker drop the index (see backend.services.cache_bus)
+cache_bus.register(KPI_MAPPINGS, mapping_resolver.invalidate)
+cache_bus.register(KPI_CATALOG, mapping_resolver.invalidate)
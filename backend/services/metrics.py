@@ -0,0 +1,455 @@
+"""
+In-process metrics with a Prometheus text endpoint (no client library).
+
+    REQUESTS = registry.counter("http_requests_total", "Requests", ("method", "route", "status"))
+    REQUESTS.labels("GET", "/kpis/", "200").inc()
+
+- Counter / Gauge / Histogram with fixed label names; `labels()` children
+  are cached, so an observation is a dict lookup plus a locked add.
+- `registry.callback(...)` exposes values that already live elsewhere
+  (pool status, cache hits) and are read only at scrape time.
+- `timed(histogram, counter)` decorates a function with duration + outcome.
+- `MetricsMiddleware` records per-route latency and status (route template,
+  not the raw path, to keep label cardinality bounded).
+
+Multiprocess mode: with METRICS_MULTIPROC_DIR set, every worker writes its
+snapshot to <dir>/metrics_<pid>.json every METRICS_FLUSH_SECONDS (off the
+request path) and at exit; /metrics merges all files plus the serving
+worker's live values. Counters and histograms are summed; gauges are
+combined per their `multiprocess_mode` ("sum", "max", "min" or "all" = one
+series per pid), and only from live workers. Clear the directory when the
+server starts from scratch.
+"""
+import atexit
+import functools
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# ------------------------------------------------------------------
+# Metric types
+# ------------------------------------------------------------------
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children: Dict[LabelValues, object] = {}
+
+    def labels(self, *values):
+        child = self._children.get(values)  # fast path: already str labels
+        if child is not None:
+            return child
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _default(self):
+        if self.labelnames:
+            raise ValueError(f"{self.name} has labels; use .labels()")
+        return self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def snapshot(self) -> dict:
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "series": [[list(k), c.value()] for k, c in list(self._children.items())],
+        }
+
+
+class _Value:
+    __slots__ = ("_v", "_lock")
+
+    def __init__(self):
+        self._v = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self._v += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self._v -= amount
+
+    def set(self, value: float):
+        self._v = float(value)
+
+    def value(self) -> float:
+        return self._v
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), multiprocess_mode: str = "sum"):
+        super().__init__(name, documentation, labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def _new_child(self):
+        return _Value()
+
+    def set(self, value: float):
+        self._default().set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default().inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default().dec(amount)
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "mode": self.multiprocess_mode}
+
+
+class _HistogramValue:
+    __slots__ = ("_bounds", "_counts", "_sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        self._counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    def value(self) -> dict:
+        return {"counts": list(self._counts), "sum": self._sum}
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self._default().observe(value)
+
+    def time(self):
+        return _Timer(self._default())
+
+    def snapshot(self) -> dict:
+        return {**super().snapshot(), "buckets": list(self.buckets)}
+
+
+class _Timer:
+    def __init__(self, target):
+        self.target = target
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.target.observe(time.perf_counter() - self.started)
+
+
+class _Callback:
+    """Value read at scrape time: fn() → number, or {label values tuple: number}."""
+
+    def __init__(self, name, documentation, type_, fn, labelnames=(), multiprocess_mode="sum"):
+        self.name = name
+        self.documentation = documentation
+        self.type = type_
+        self.fn = fn
+        self.labelnames = tuple(labelnames)
+        self.multiprocess_mode = multiprocess_mode
+
+    def snapshot(self) -> dict:
+        try:
+            value = self.fn()
+        except Exception:
+            value = {}
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return {
+            "type": self.type,
+            "help": self.documentation,
+            "labelnames": list(self.labelnames),
+            "series": [[[str(v) for v in k], float(v)] for k, v in items],
+            "mode": self.multiprocess_mode,
+        }
+
+
+# ------------------------------------------------------------------
+# Registry
+# ------------------------------------------------------------------
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._flusher: Optional[threading.Thread] = None
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), multiprocess_mode="sum") -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, multiprocess_mode))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def callback(self, name, documentation, fn: Callable, type_="gauge", labelnames=(), multiprocess_mode="sum"):
+        return self._register(_Callback(name, documentation, type_, fn, labelnames, multiprocess_mode))
+
+    def snapshot(self) -> dict:
+        return {name: m.snapshot() for name, m in list(self._metrics.items())}
+
+    # -----------------------------
+    # Multiprocess files
+    # -----------------------------
+    def _path(self, pid: int) -> str:
+        return os.path.join(METRICS_MULTIPROC_DIR, f"metrics_{pid}.json")
+
+    def flush(self):
+        if not METRICS_MULTIPROC_DIR:
+            return
+        path = self._path(os.getpid())
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(), f, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    def start_flusher(self):
+        """Periodic snapshot writer for multiprocess mode (call once per worker)."""
+        if not METRICS_MULTIPROC_DIR or (self._flusher is not None and self._flusher.is_alive()):
+            return
+        os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+
+        def _loop():
+            while True:
+                time.sleep(METRICS_FLUSH_SECONDS)
+                try:
+                    self.flush()
+                except OSError:
+                    pass
+
+        self._flusher = threading.Thread(target=_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.flush)
+
+    def _snapshots(self) -> List[Tuple[int, bool, dict]]:
+        """(pid, alive, snapshot) for every worker; this worker's values are live."""
+        own = os.getpid()
+        result = [(own, True, self.snapshot())]
+        if not METRICS_MULTIPROC_DIR or not os.path.isdir(METRICS_MULTIPROC_DIR):
+            return result
+        for entry in os.scandir(METRICS_MULTIPROC_DIR):
+            if not (entry.name.startswith("metrics_") and entry.name.endswith(".json")):
+                continue
+            try:
+                pid = int(entry.name[len("metrics_"):-len(".json")])
+            except ValueError:
+                continue
+            if pid == own:
+                continue
+            try:
+                with open(entry.path, encoding="utf-8") as f:
+                    result.append((pid, _alive(pid), json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return result
+
+    # -----------------------------
+    # Exposition
+    # -----------------------------
+    def render(self) -> str:
+        merged = _merge(self._snapshots())
+        lines: List[str] = []
+        for name in sorted(merged):
+            m = merged[name]
+            lines.append(f"# HELP {name} {m['help']}")
+            lines.append(f"# TYPE {name} {m['type']}")
+            names = m["labelnames"]
+            for key, value in sorted(m["series"].items()):
+                if m["type"] == "histogram":
+                    cumulative = 0
+                    bounds = list(m["buckets"]) + [math.inf]
+                    for bound, count in zip(bounds, value["counts"]):
+                        cumulative += count
+                        le = 'le="%s"' % _num(bound)
+                        lines.append(f"{name}_bucket{_labels(names, key, le)} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(names, key)} {_num(value['sum'])}")
+                    lines.append(f"{name}_count{_labels(names, key)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(names, key)} {_num(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge(snapshots: Iterable[Tuple[int, bool, dict]]) -> dict:
+    merged: dict = {}
+    for pid, alive, snapshot in snapshots:
+        for name, m in snapshot.items():
+            is_gauge = m["type"] == "gauge"
+            if is_gauge and not alive:
+                continue  # a dead worker's gauges are stale; its counters still count
+            mode = m.get("mode", "sum")
+            out = merged.setdefault(name, {
+                "type": m["type"], "help": m["help"], "buckets": m.get("buckets"),
+                "labelnames": m["labelnames"] + (["pid"] if is_gauge and mode == "all" else []),
+                "series": {},
+            })
+            for key, value in m["series"]:
+                key = tuple(key) + ((str(pid),) if is_gauge and mode == "all" else ())
+                current = out["series"].get(key)
+                if current is None:
+                    out["series"][key] = value if not isinstance(value, dict) else {
+                        "counts": list(value["counts"]), "sum": value["sum"]
+                    }
+                elif isinstance(value, dict):
+                    current["counts"] = [a + b for a, b in zip(current["counts"], value["counts"])]
+                    current["sum"] += value["sum"]
+                elif is_gauge and mode == "max":
+                    out["series"][key] = max(current, value)
+                elif is_gauge and mode == "min":
+                    out["series"][key] = min(current, value)
+                else:
+                    out["series"][key] = current + value
+    return merged
+
+
+registry = Registry()
+
+
+# ------------------------------------------------------------------
+# Helpers
+# ------------------------------------------------------------------
+def timed(histogram: Histogram, outcomes: Optional[Counter] = None):
+    """Decorator: observe duration in `histogram`, count runs by outcome ("ok"/"error")."""
+    ok = outcomes.labels("ok") if outcomes is not None else None
+    error = outcomes.labels("error") if outcomes is not None else None
+    target = histogram._default()
+
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                if error is not None:
+                    error.inc()
+                raise
+            finally:
+                target.observe(time.perf_counter() - started)
+            if ok is not None:
+                ok.inc()
+            return result
+        return wrapper
+    return decorate
+
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests by method, route template and status", ("method", "route", "status")
+)
+HTTP_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by method and route template", ("method", "route")
+)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware (no BaseHTTPMiddleware task/stream overhead)."""
+
+    def __init__(self, app, skip_paths: Sequence[str] = ("/metrics",)):
+        self.app = app
+        self.skip_paths = set(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope.get("path") in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = "500"
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = str(message["status"])
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "<unmatched>"
+            method = scope.get("method", "")
+            HTTP_LATENCY.labels(method, template).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, template, status).inc()
@@ -0,0 +1,142 @@
+"""
+Postgres LISTEN/NOTIFY fan-out, one listener connection per worker.
+
+Writers call `notify(db, channel, payload)` inside their transaction, so the
+message is only delivered if the transaction commits. Each worker process
+holds one dedicated asyncpg connection that LISTENs on every subscribed
+channel and hands payloads to in-process callbacks; it reconnects with
+backoff if the connection drops.
+
+LISTEN needs a session-level connection, so behind PgBouncer (transaction
+pooling) point DATABASE_LISTEN_URL at Postgres directly.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.database import DATABASE_URL
+
+logger = logging.getLogger(__name__)
+
+DATABASE_LISTEN_URL = os.getenv("DATABASE_LISTEN_URL", DATABASE_URL)
+PG_LISTEN_RETRY_SECONDS = float(os.getenv("PG_LISTEN_RETRY_SECONDS", "1.0"))
+PG_LISTEN_RETRY_MAX_SECONDS = float(os.getenv("PG_LISTEN_RETRY_MAX_SECONDS", "30.0"))
+
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+def _encode(payload: Any) -> str:
+    if isinstance(payload, str):
+        return payload
+    return json.dumps(payload, default=str, separators=(",", ":"))
+
+
+def notify(db: Session, channel: str, payload: Any):
+    """pg_notify in the caller's transaction (delivered on commit)."""
+    db.execute(NOTIFY_SQL, {"channel": channel, "payload": _encode(payload)})
+
+
+async def anotify(db: AsyncSession, channel: str, payload: Any):
+    """Async-session form of notify()."""
+    await db.execute(NOTIFY_SQL, {"channel": channel, "payload": _encode(payload)})
+
+
+def _asyncpg_dsn(url: str) -> str:
+    """SQLAlchemy URL → plain postgresql:// DSN for asyncpg.connect()."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class PgListener:
+    def __init__(self, url: str = DATABASE_LISTEN_URL):
+        self.url = url
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = defaultdict(list)
+        self._conn = None
+        self._task: Optional[asyncio.Task] = None
+        self._connected = asyncio.Event()
+        self.reconnects = 0
+
+    # -----------------------------
+    # Subscriptions
+    # -----------------------------
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        """Register a callback(payload) for a channel; safe before or after start()."""
+        self._callbacks[channel].append(callback)
+        if self._conn is not None and len(self._callbacks[channel]) == 1:
+            asyncio.get_running_loop().create_task(self._listen(channel))
+
+    def _dispatch(self, connection, pid, channel, payload):
+        for callback in self._callbacks.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Listener callback for %s failed", channel)
+
+    async def _listen(self, channel: str):
+        try:
+            await self._conn.add_listener(channel, self._dispatch)
+        except Exception as e:
+            logger.warning("LISTEN %s failed: %s", channel, e)
+
+    # -----------------------------
+    # Connection lifecycle
+    # -----------------------------
+    @property
+    def connected(self) -> bool:
+        return self._connected.is_set()
+
+    async def _run(self):
+        import asyncpg
+
+        delay = PG_LISTEN_RETRY_SECONDS
+        while True:
+            try:
+                self._conn = await asyncpg.connect(_asyncpg_dsn(self.url))
+                for channel in list(self._callbacks):
+                    await self._conn.add_listener(channel, self._dispatch)
+                self._connected.set()
+                delay = PG_LISTEN_RETRY_SECONDS
+                logger.info("Listening on %s", ", ".join(self._callbacks) or "(no channels)")
+
+                # Wait for the connection to drop
+                closed = asyncio.get_running_loop().create_future()
+                self._conn.add_termination_listener(lambda _conn: closed.done() or closed.set_result(None))
+                await closed
+                logger.warning("Listener connection lost; reconnecting")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Listener connection failed: %s (retry in %.0fs)", e, delay)
+            finally:
+                self._connected.clear()
+                conn, self._conn = self._conn, None
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, PG_LISTEN_RETRY_MAX_SECONDS)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+pg_listener = PgListener()
@@ -0,0 +1,50 @@
+"""
+Precomputed ESG rankings.
+
+esg_score_rankings is a materialized view over esg_final_scores (one row per
+company + period) with rank and percentile columns for the final score and
+each pillar; companies without a given score have NULL rank and percentile
+for it (migration 2c7d5b9e3f14). It is refreshed CONCURRENTLY after engine batch runs so
+/dashboard/rankings keeps serving the previous snapshot while it rebuilds.
+"""
+import logging
+
+from sqlalchemy import Date, Float, Integer, column, table, text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+RANKINGS_VIEW = "esg_score_rankings"
+
+# metric → (score column, rank column, percentile column)
+RANKING_METRICS = {
+    "final_score": ("final_score", "final_rank", "final_percentile"),
+    "environmental": ("environmental", "environmental_rank", "environmental_percentile"),
+    "social": ("social", "social_rank", "social_percentile"),
+    "governance": ("governance", "governance_rank", "governance_percentile"),
+}
+
+# Not part of Base.metadata: the view is owned by its migration
+esg_score_rankings = table(
+    RANKINGS_VIEW,
+    column("company_id", Integer),
+    column("reporting_period", Date),
+    column("companies_in_period", Integer),
+    *[
+        c
+        for score, rank, pct in RANKING_METRICS.values()
+        for c in (column(score, Float), column(rank, Integer), column(pct, Float))
+    ],
+)
+
+
+def refresh_rankings(db: Session) -> bool:
+    """REFRESH MATERIALIZED VIEW CONCURRENTLY; returns False (and logs) on failure."""
+    try:
+        db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {RANKINGS_VIEW}"))
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        logger.warning("Refreshing %s failed: %s", RANKINGS_VIEW, e)
+        return False
@@ -0,0 +1,150 @@
+"""
+Prebuilt ESG schema artifact.
+
+`backend/scripts/build_schema_artifact.py` compiles the profiler workbook
+(validation rules), the curated flat field list and the UI tree into one
+JSON document with a content hash. Both FastAPI apps load it once at
+startup through `load_artifact()`; regex patterns are compiled a single time
+here rather than on every validation.
+"""
+import hashlib
+import json
+import logging
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Pattern
+
+logger = logging.getLogger(__name__)
+
+ARTIFACT_VERSION = 1
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+ARTIFACT_PATH = BACKEND_DIR / "schemas" / "esg_schema_artifact.json"
+
+# Sources (the workbook is only read at build time)
+WORKBOOK_PATH = BACKEND_DIR.parent / "ESG_Profiler_Logic_v2.xlsx"
+RULES_JSON_PATH = BACKEND_DIR / "schemas" / "esg_validation_schema.json"
+FLAT_SCHEMA_PATH = BACKEND_DIR / "schemas" / "esg_validation_schema_flat.json"
+UI_SCHEMA_PATH = BACKEND_DIR / "esg_schema_gui.json"
+
+FIELD_KEYS = (
+    "name", "type", "label", "method", "theme", "unit",
+    "description", "category", "reference", "min", "max", "pattern",
+)
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    name: str
+    type: str
+    min: Optional[float] = None
+    max: Optional[float] = None
+    pattern: Optional[Pattern] = None
+
+
+@dataclass(frozen=True)
+class SchemaArtifact:
+    content_hash: str
+    fields: List[dict]                       # /schema payload (flat, normalised)
+    ui_tree: Dict[str, Any]                  # grouped UI schema
+    validation_rules: Dict[str, dict]        # /validation-schema payload (workbook rules)
+    compiled_rules: Dict[str, CompiledRule]  # workbook rules, ready to apply
+    field_rules: Dict[str, CompiledRule]     # per-form-field rules, ready to apply
+    indexes: Dict[str, Dict[str, List[str]]]
+
+
+# ------------------------------------------------------------------
+# Build helpers (used by the build script and the no-artifact fallback)
+# ------------------------------------------------------------------
+def file_sha256(path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _canonical(payload) -> bytes:
+    return json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def compile_payload(validation_rules: Dict[str, dict], flat_fields: List[dict], ui_tree: Dict[str, Any]) -> dict:
+    """Assemble the artifact document from already-parsed sources."""
+    fields = [{key: entry.get(key) for key in FIELD_KEYS} for entry in flat_fields]
+    indexes: Dict[str, Dict[str, List[str]]] = {"by_category": {}, "by_method": {}, "by_type": {}}
+    for f in fields:
+        for index, key in (("by_category", "category"), ("by_method", "method"), ("by_type", "type")):
+            if f.get(key):
+                indexes[index].setdefault(f[key], []).append(f["name"])
+
+    for pattern in [r.get("pattern") for r in validation_rules.values()] + [f.get("pattern") for f in fields]:
+        if pattern:
+            re.compile(pattern)  # fail the build, not the request, on a bad regex
+
+    payload = {
+        "version": ARTIFACT_VERSION,
+        "validation_rules": validation_rules,
+        "fields": fields,
+        "ui_tree": ui_tree,
+        "indexes": indexes,
+    }
+    payload["content_hash"] = hashlib.sha256(_canonical(payload)).hexdigest()
+    return payload
+
+
+def _compile_rule(name: str, rule: dict) -> CompiledRule:
+    pattern = rule.get("pattern")
+    return CompiledRule(
+        name=name,
+        type=rule.get("type") or "text",
+        min=rule.get("min"),
+        max=rule.get("max"),
+        pattern=re.compile(pattern) if pattern else None,
+    )
+
+
+def _from_payload(payload: dict) -> SchemaArtifact:
+    return SchemaArtifact(
+        content_hash=payload["content_hash"],
+        fields=payload["fields"],
+        ui_tree=payload["ui_tree"],
+        validation_rules=payload["validation_rules"],
+        compiled_rules={name: _compile_rule(name, r) for name, r in payload["validation_rules"].items()},
+        field_rules={f["name"]: _compile_rule(f["name"], f) for f in payload["fields"]},
+        indexes=payload["indexes"],
+    )
+
+
+def _payload_from_json_sources() -> dict:
+    with open(RULES_JSON_PATH, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    with open(FLAT_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        flat = json.load(f)
+    with open(UI_SCHEMA_PATH, "r", encoding="utf-8") as f:
+        ui_tree = json.load(f)
+    return compile_payload(rules, flat, ui_tree)
+
+
+# ------------------------------------------------------------------
+# Runtime loader
+# ------------------------------------------------------------------
+def read_payload(path=ARTIFACT_PATH) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    if payload.get("version") != ARTIFACT_VERSION:
+        raise ValueError(f"Unsupported schema artifact version {payload.get('version')}")
+    return payload
+
+
+@lru_cache(maxsize=1)
+def load_artifact() -> SchemaArtifact:
+    try:
+        payload = read_payload()
+    except FileNotFoundError:
+        logger.warning(
+            "%s not found; compiling from JSON sources. "
+            "Run `python -m backend.scripts.build_schema_artifact`.", ARTIFACT_PATH,
+        )
+        payload = _payload_from_json_sources()
+    return _from_payload(payload)
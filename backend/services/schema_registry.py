@@ -0,0 +1,97 @@
+"""
+In-memory registry for the JSON schema documents served to the frontend.
+
+Each document is parsed once, optionally normalised, and kept as
+pre-serialised response bytes with a strong ETag. The source file's mtime
+is re-checked at most every SCHEMA_RELOAD_CHECK_SECONDS; when it changes the
+document is rebuilt. Repeat visitors that send If-None-Match get a 304.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from fastapi import Request, Response
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_RELOAD_CHECK_SECONDS = float(os.getenv("SCHEMA_RELOAD_CHECK_SECONDS", "1.0"))
+SCHEMA_CACHE_MAX_AGE = int(os.getenv("SCHEMA_CACHE_MAX_AGE", "60"))
+
+
+class SchemaDocument:
+    def __init__(self, path, transform: Optional[Callable[[Any], Any]] = None, default: Any = None):
+        self.path = str(path)
+        self.transform = transform
+        self.default = default
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self.data: Any = default
+        self.body: bytes = b""
+        self.etag: str = ""
+        self._refresh(force=True)
+
+    # -----------------------------
+    # Loading
+    # -----------------------------
+    def _refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._checked_at < SCHEMA_RELOAD_CHECK_SECONDS:
+            return
+        with self._lock:
+            self._checked_at = now
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                mtime = None
+            if not force and mtime == self._mtime:
+                return
+            self._load(mtime)
+
+    def _load(self, mtime: Optional[float]):
+        data = self.default
+        if mtime is not None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if self.transform:
+                    data = self.transform(data)
+            except Exception as e:
+                logger.warning("Schema %s could not be loaded: %s", self.path, e)
+                data = self.default
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.data = data
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self._mtime = mtime
+        logger.info("Schema %s loaded (%d bytes, etag %s)", self.path, len(body), self.etag)
+
+    def get(self) -> Any:
+        """Parsed (and transformed) document for in-process use."""
+        self._refresh()
+        return self.data
+
+    # -----------------------------
+    # HTTP
+    # -----------------------------
+    def _not_modified(self, request: Request) -> bool:
+        header = request.headers.get("if-none-match")
+        if not header:
+            return False
+        tags = [t.strip() for t in header.split(",")]
+        # If-None-Match uses weak comparison, so W/"x" matches "x"
+        return "*" in tags or any(t.removeprefix("W/") == self.etag for t in tags)
+
+    def response(self, request: Request) -> Response:
+        self._refresh()
+        headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={SCHEMA_CACHE_MAX_AGE}, must-revalidate",
+        }
+        if self._not_modified(request):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
@@ -0,0 +1,68 @@
+"""
+Score update fan-out for /dashboard/stream/{company_id}.
+
+run_esg_engine publishes each persisted result on SCORE_CHANNEL via
+pg_notify; every worker's PgListener receives it and pushes it to the
+queues of the SSE clients watching that company.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Set
+
+from sqlalchemy.orm import Session
+
+from backend.services.pg_listener import notify
+
+logger = logging.getLogger(__name__)
+
+SCORE_CHANNEL = "esg_scores"
+SCORE_STREAM_QUEUE_SIZE = int(os.getenv("SCORE_STREAM_QUEUE_SIZE", "16"))
+
+
+def publish_scores(db: Session, result: dict):
+    """Queue a score update in the engine's transaction (sent on commit)."""
+    notify(db, SCORE_CHANNEL, {
+        "company_id": result["company_id"],
+        "reporting_period": str(result["reporting_period"]),
+        "pillar_scores": result["pillar_scores"],
+        "final_score": result["final_score"],
+    })
+
+
+class ScoreBroadcaster:
+    def __init__(self):
+        self._queues: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+
+    @property
+    def clients(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    @contextmanager
+    def subscribe(self, company_id: int):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SCORE_STREAM_QUEUE_SIZE)
+        self._queues[company_id].add(queue)
+        try:
+            yield queue
+        finally:
+            self._queues[company_id].discard(queue)
+            if not self._queues[company_id]:
+                del self._queues[company_id]
+
+    def on_notify(self, payload: str):
+        """PgListener callback: route one update to the company's subscribers."""
+        try:
+            company_id = int(json.loads(payload)["company_id"])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Ignoring malformed score notification: %.200s", payload)
+            return
+        for queue in self._queues.get(company_id, ()):
+            if queue.full():
+                queue.get_nowait()  # slow client: drop the oldest update, keep the newest
+            queue.put_nowait(payload)
+
+
+score_broadcaster = ScoreBroadcaster()
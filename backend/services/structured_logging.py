@@ -0,0 +1,232 @@
+"""
+Non-blocking structured logging.
+
+`setup_logging()` replaces the old `logging.basicConfig(level=DEBUG)`:
+- request threads only enqueue records (QueueHandler, bounded queue; records
+  are dropped and counted when it is full instead of blocking); one
+  QueueListener thread formats and writes them;
+- records are JSON lines (LOG_FORMAT=json, default) or plain text
+  (LOG_FORMAT=text) with any `extra=` fields included;
+- levels: LOG_LEVEL for the root, LOG_LEVELS for per-module overrides,
+  e.g. LOG_LEVELS="backend.engine=DEBUG,sqlalchemy.engine=INFO". Defaults
+  keep SQLAlchemy/asyncpg at WARNING so SQL is not logged per statement;
+- `RateLimitedLog` for debug lines inside hot loops (token bucket per
+  message, optional 1-in-N sampling, suppressed counts reported).
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_DEBUG_RATE_PER_SECOND = float(os.getenv("LOG_DEBUG_RATE_PER_SECOND", "5"))
+LOG_DEBUG_BURST = int(os.getenv("LOG_DEBUG_BURST", "20"))
+
+# Applied before LOG_LEVELS, which can override any of them
+DEFAULT_LEVELS = {
+    "sqlalchemy": "WARNING",
+    "asyncpg": "WARNING",
+    "uvicorn": "INFO",
+    "uvicorn.access": "INFO",
+}
+
+# Loggers that install their own handlers (uvicorn's dictConfig); routed through the queue instead
+ADOPTED_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """"a.b=DEBUG,c=WARNING" → {"a.b": "DEBUG", "c": "WARNING"}."""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+# ------------------------------------------------------------------
+# Formatting (listener thread)
+# ------------------------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = record.stack_info
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extra = {k: v for k, v in vars(record).items() if k not in _RESERVED and not k.startswith("_")}
+        return f"{line} {extra}" if extra else line
+
+
+# ------------------------------------------------------------------
+# Enqueueing (request threads)
+# ------------------------------------------------------------------
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller: a full queue drops the record and counts it."""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-args and tracebacks now (they may not survive the thread hop);
+        # JSON formatting is left to the listener thread.
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_state: Dict[str, object] = {}
+
+
+def setup_logging(
+    level: str = LOG_LEVEL,
+    levels: Optional[Dict[str, str]] = None,
+    fmt: str = LOG_FORMAT,
+    stream=None,
+) -> NonBlockingQueueHandler:
+    """Install the queue handler on the root logger (idempotent; re-running reconfigures)."""
+    shutdown_logging()
+
+    target = logging.StreamHandler(stream or sys.stderr)
+    target.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    q: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    handler = NonBlockingQueueHandler(q)
+    listener = logging.handlers.QueueListener(q, target, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    for name in ADOPTED_LOGGERS:
+        adopted = logging.getLogger(name)
+        adopted.handlers.clear()
+        adopted.propagate = True
+
+    for name, lvl in {**DEFAULT_LEVELS, **(levels if levels is not None else parse_levels(LOG_LEVELS))}.items():
+        logging.getLogger(name).setLevel(lvl)
+
+    listener.start()
+    _state.update(handler=handler, listener=listener)
+    return handler
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread."""
+    listener = _state.pop("listener", None)
+    handler = _state.pop("handler", None)
+    if listener is not None:
+        listener.stop()
+    if handler is not None:
+        logging.getLogger().removeHandler(handler)
+
+
+def logging_stats() -> dict:
+    handler = _state.get("handler")
+    if handler is None:
+        return {"configured": False}
+    return {"configured": True, "queued": handler.queue.qsize(), "dropped": handler.dropped}
+
+
+atexit.register(shutdown_logging)
+
+
+# ------------------------------------------------------------------
+# Rate-limited / sampled debug for hot loops
+# ------------------------------------------------------------------
+class RateLimitedLog:
+    """
+    Debug logging for hot paths. Each message template gets a token bucket
+    (`per_second`, `burst`); with `sample_every=N` only every Nth call is
+    considered. Suppressed calls are counted and reported as `suppressed`
+    on the next record that gets through. Costs one level check when DEBUG
+    is off for the logger.
+    """
+
+    def __init__(self, logger: logging.Logger, per_second: float = LOG_DEBUG_RATE_PER_SECOND,
+                 burst: int = LOG_DEBUG_BURST, sample_every: int = 1):
+        self.logger = logger
+        self.per_second = per_second
+        self.burst = burst
+        self.sample_every = max(1, sample_every)
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}  # msg → [tokens, last_refill, calls, suppressed]
+
+    def _allow(self, msg: str):
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(msg)
+            if bucket is None:
+                bucket = self._buckets[msg] = [float(self.burst), now, 0, 0]
+            bucket[2] += 1
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.per_second)
+            bucket[1] = now
+            if bucket[2] % self.sample_every or bucket[0] < 1:
+                bucket[3] += 1
+                return None
+            bucket[0] -= 1
+            suppressed, bucket[3] = bucket[3], 0
+            return suppressed
+
+    def log(self, level: int, msg: str, *args, **kwargs):
+        if not self.logger.isEnabledFor(level):
+            return
+        suppressed = self._allow(msg)
+        if suppressed is None:
+            return
+        if suppressed:
+            kwargs["extra"] = {**kwargs.get("extra", {}), "suppressed": suppressed}
+        kwargs.setdefault("stacklevel", 3)
+        self.logger.log(level, msg, *args, **kwargs)
+
+    def debug(self, msg: str, *args, **kwargs):
+        self.log(logging.DEBUG, msg, *args, **kwargs)
+
+    def info(self, msg: str, *args, **kwargs):
+        self.log(logging.INFO, msg, *args, **kwargs)
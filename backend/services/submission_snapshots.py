@@ -0,0 +1,110 @@
+"""
+Wide per-company/period snapshot of esg_form_submissions.
+
+esg_submission_snapshots holds one JSONB document per (company_id,
+reporting_period): {form_field: {"value", "is_kpi", "methodology",
+"updated_at"}}. Writers pass the rows they just upserted (the RETURNING
+rows) to `snapshot_upsert_stmt` and execute the result in the same
+transaction, so the snapshot never drifts from the EAV table. Readers use
+one primary-key lookup instead of scanning every field row.
+
+company_latest_period is maintained the same way (`latest_period_upsert_stmt`)
+so the dashboard resolves a company's latest period with a key lookup.
+"""
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Iterable, List, Optional
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+
+from backend.models.esg_scorecard import CompanyLatestPeriod, EsgFormSubmission, EsgSubmissionSnapshot
+
+# Columns writers must RETURNING so their rows can be folded into the snapshot
+SNAPSHOT_COLUMNS = (
+    EsgFormSubmission.company_id,
+    EsgFormSubmission.reporting_period,
+    EsgFormSubmission.form_field,
+    EsgFormSubmission.field_value,
+    EsgFormSubmission.is_kpi,
+    EsgFormSubmission.methodology,
+    EsgFormSubmission.updated_at,
+)
+
+
+def _entry(row) -> dict:
+    return {
+        "value": row.field_value,
+        "is_kpi": row.is_kpi,
+        "methodology": row.methodology,
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+    }
+
+
+def snapshot_upsert_stmt(rows: Iterable):
+    """
+    One INSERT ... ON CONFLICT that merges the given submission rows into
+    their snapshots (jsonb `||`, so untouched fields are kept).
+    Returns None when there is nothing to write.
+    """
+    patches = {}
+    for row in rows:
+        patches.setdefault((row.company_id, row.reporting_period), {})[row.form_field] = _entry(row)
+    if not patches:
+        return None
+
+    stmt = insert(EsgSubmissionSnapshot).values([
+        {"company_id": company_id, "reporting_period": period, "data": data}
+        for (company_id, period), data in patches.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["company_id", "reporting_period"],
+        set_={
+            "data": EsgSubmissionSnapshot.data.op("||")(stmt.excluded.data),
+            "updated_at": func.now(),
+        },
+    )
+
+
+def latest_period_upsert_stmt(rows: Iterable):
+    """Advance company_latest_period for the companies in `rows` (never moves backwards)."""
+    latest = {}
+    for row in rows:
+        current = latest.get(row.company_id)
+        if current is None or row.reporting_period > current:
+            latest[row.company_id] = row.reporting_period
+    if not latest:
+        return None
+
+    stmt = insert(CompanyLatestPeriod).values([
+        {"company_id": company_id, "latest_period": period}
+        for company_id, period in latest.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["company_id"],
+        set_={
+            "latest_period": func.greatest(CompanyLatestPeriod.latest_period, stmt.excluded.latest_period),
+            "updated_at": func.now(),
+        },
+        where=CompanyLatestPeriod.latest_period < stmt.excluded.latest_period,
+    )
+
+
+def snapshot_submissions(snapshot: EsgSubmissionSnapshot, methodology: Optional[str] = None) -> List[SimpleNamespace]:
+    """Expand a snapshot back into submission-like rows (form_field, field_value, ...)."""
+    rows = []
+    for form_field, entry in (snapshot.data or {}).items():
+        if methodology and entry.get("methodology") != methodology:
+            continue
+        updated_at = entry.get("updated_at")
+        rows.append(SimpleNamespace(
+            company_id=snapshot.company_id,
+            reporting_period=snapshot.reporting_period,
+            form_field=form_field,
+            field_value=entry.get("value"),
+            is_kpi=entry.get("is_kpi"),
+            methodology=entry.get("methodology"),
+            updated_at=datetime.fromisoformat(updated_at) if updated_at else None,
+            created_at=None,
+        ))
+    return rows
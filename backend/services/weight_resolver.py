@@ -0,0 +1,340 @@
+"""
+Effective-dated weight resolution.
+
+A weight set saved for period P is in force from P (valid_from) until the
+next set for the same company starts (valid_to, exclusive; NULL = open).
+KPI weights and pillar weights are separate families of sets.
+
+A company without its own set in force falls back to its weight profile
+(a shared named scheme) with the company's sparse overrides on top, so
+changing a scheme is one profile write instead of companies × KPIs rows.
+
+Each company's current sets are loaded once into a sorted interval index,
+so "weights in force on period P" is a bisect instead of a query. Profiles
+are cached separately and merged at resolve time. Writes publish WEIGHTS /
+WEIGHT_PROFILE events on the cache bus, which evict the entry on every
+worker; entries also expire after WEIGHT_CACHE_TTL_SECONDS as a backstop.
+
+The engine and /weights/* resolve through `weight_resolver`; SQL that
+needs the same rule uses `in_force()` and `effective_weights()`.
+"""
+import os
+import threading
+import time
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, exists, func, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from backend.models.esg_scorecard import (
+    CompanyWeightOverride,
+    CompanyWeightProfile,
+    ESGKpiWeight,
+    ESGPillarWeight,
+    WeightProfileEntry,
+)
+from backend.services.cache_bus import WEIGHT_PROFILE, WEIGHTS, cache_bus
+
+WEIGHT_CACHE_TTL_SECONDS = float(os.getenv("WEIGHT_CACHE_TTL_SECONDS", "30"))
+WEIGHT_CACHE_MAX_COMPANIES = int(os.getenv("WEIGHT_CACHE_MAX_COMPANIES", "10000"))
+
+KINDS = ("kpi", "pillar")
+
+
+@dataclass(frozen=True)
+class WeightSet:
+    valid_from: date
+    valid_to: Optional[date]
+    weights: Dict[str, float]
+
+    def covers(self, period: date) -> bool:
+        return self.valid_from <= period and (self.valid_to is None or period < self.valid_to)
+
+
+class IntervalIndex:
+    """Non-overlapping weight sets sorted by valid_from; lookups are O(log n)."""
+
+    def __init__(self, sets: Iterable[WeightSet]):
+        self._sets: List[WeightSet] = sorted(sets, key=lambda s: s.valid_from)
+        self._starts = [s.valid_from for s in self._sets]
+
+    def at(self, period: date) -> Optional[WeightSet]:
+        i = bisect_right(self._starts, period) - 1
+        if i < 0:
+            return None
+        found = self._sets[i]
+        return found if found.covers(period) else None
+
+    def __len__(self):
+        return len(self._sets)
+
+    @classmethod
+    def from_rows(cls, rows, key: str, value: str) -> "IntervalIndex":
+        grouped: Dict[date, dict] = {}
+        for row in rows:
+            entry = grouped.setdefault(row.valid_from, {"valid_to": row.valid_to, "weights": {}})
+            if entry["valid_to"] is not None and (row.valid_to is None or row.valid_to > entry["valid_to"]):
+                entry["valid_to"] = row.valid_to
+            entry["weights"][getattr(row, key)] = float(getattr(row, value))
+        return cls(WeightSet(start, e["valid_to"], e["weights"]) for start, e in grouped.items())
+
+
+def _by_kind(rows) -> Dict[str, Dict[str, float]]:
+    """(kind, code, weight) rows → {kind: {code: weight}}."""
+    out: Dict[str, Dict[str, float]] = {kind: {} for kind in KINDS}
+    for row in rows:
+        out.setdefault(row.kind, {})[row.code] = float(row.weight)
+    return out
+
+
+@dataclass
+class CompanyWeights:
+    kpi: IntervalIndex
+    pillar: IntervalIndex
+    profile_id: Optional[int] = None
+    overrides: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class ProfileWeights:
+    weights: Dict[str, Dict[str, float]]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass(frozen=True)
+class ResolvedWeights:
+    kpi: Dict[str, float]
+    pillar: Dict[str, float]
+    kpi_valid_from: Optional[date] = None
+    pillar_valid_from: Optional[date] = None
+    # "company" (own effective-dated set), "profile" (profile + overrides) or None
+    kpi_source: Optional[str] = None
+    pillar_source: Optional[str] = None
+    profile_id: Optional[int] = None
+
+
+# ------------------------------------------------------------------
+# SQL forms of the same rules
+# ------------------------------------------------------------------
+def in_force(model, period: date):
+    """SQL predicate matching the rows of `model` in force on `period` (same rule as the index)."""
+    return and_(
+        model.is_current == True,
+        model.valid_from <= period,
+        or_(model.valid_to.is_(None), model.valid_to > period),
+    )
+
+
+def effective_weights(kind: str, period: date, company_ids: Optional[Iterable[int]] = None):
+    """
+    Subquery (company_id, code, weight) of the `kind` weights in force on
+    `period`: the company's own set if it has one, else its profile entries
+    with overrides applied. Same order as WeightResolver._resolve.
+    """
+    if kind == "kpi":
+        model, code, weight = ESGKpiWeight, ESGKpiWeight.kpi_code, ESGKpiWeight.weight
+    else:
+        model, code, weight = ESGPillarWeight, ESGPillarWeight.pillar, ESGPillarWeight.pillar_weight
+    ids = list(company_ids) if company_ids is not None else None
+
+    own = select(model.company_id, code.label("code"), weight.label("weight")).where(in_force(model, period))
+    if ids is not None:
+        own = own.where(model.company_id.in_(ids))
+    own = own.cte(f"own_{kind}")
+
+    assigned = select(CompanyWeightProfile.company_id, CompanyWeightProfile.profile_id).where(
+        ~exists().where(own.c.company_id == CompanyWeightProfile.company_id)
+    )
+    if ids is not None:
+        assigned = assigned.where(CompanyWeightProfile.company_id.in_(ids))
+    assigned = assigned.cte(f"assigned_{kind}")
+
+    entry, override = WeightProfileEntry, CompanyWeightOverride
+    from_profile = select(
+        assigned.c.company_id, entry.code, func.coalesce(override.weight, entry.weight)
+    ).select_from(
+        assigned.join(entry, and_(entry.profile_id == assigned.c.profile_id, entry.kind == kind)).outerjoin(
+            override,
+            and_(override.company_id == assigned.c.company_id, override.kind == kind, override.code == entry.code),
+        )
+    )
+    # Overrides for codes the profile does not list
+    extra = select(assigned.c.company_id, override.code, override.weight).select_from(
+        assigned.join(override, and_(override.company_id == assigned.c.company_id, override.kind == kind))
+    ).where(
+        ~exists().where(entry.profile_id == assigned.c.profile_id, entry.kind == kind, entry.code == override.code)
+    )
+
+    return union_all(select(own.c.company_id, own.c.code, own.c.weight), from_profile, extra).subquery(
+        f"effective_{kind}"
+    )
+
+
+# ------------------------------------------------------------------
+# Loading
+# ------------------------------------------------------------------
+def _as_date(period) -> date:
+    return date.fromisoformat(period) if isinstance(period, str) else period
+
+
+def _kpi_stmt(company_id: int):
+    return select(
+        ESGKpiWeight.kpi_code, ESGKpiWeight.weight, ESGKpiWeight.valid_from, ESGKpiWeight.valid_to
+    ).where(ESGKpiWeight.company_id == company_id, ESGKpiWeight.is_current == True)
+
+
+def _pillar_stmt(company_id: int):
+    return select(
+        ESGPillarWeight.pillar, ESGPillarWeight.pillar_weight, ESGPillarWeight.valid_from, ESGPillarWeight.valid_to
+    ).where(ESGPillarWeight.company_id == company_id, ESGPillarWeight.is_current == True)
+
+
+def _assignment_stmt(company_id: int):
+    return select(CompanyWeightProfile.profile_id).where(CompanyWeightProfile.company_id == company_id)
+
+
+def _overrides_stmt(company_id: int):
+    return select(CompanyWeightOverride.kind, CompanyWeightOverride.code, CompanyWeightOverride.weight).where(
+        CompanyWeightOverride.company_id == company_id
+    )
+
+
+def _profile_stmt(profile_id: int):
+    return select(WeightProfileEntry.kind, WeightProfileEntry.code, WeightProfileEntry.weight).where(
+        WeightProfileEntry.profile_id == profile_id
+    )
+
+
+def _build(kpi_rows, pillar_rows, profile_id, override_rows) -> CompanyWeights:
+    return CompanyWeights(
+        kpi=IntervalIndex.from_rows(kpi_rows, "kpi_code", "weight"),
+        pillar=IntervalIndex.from_rows(pillar_rows, "pillar", "pillar_weight"),
+        profile_id=profile_id,
+        overrides=_by_kind(override_rows),
+    )
+
+
+class WeightResolver:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._companies: Dict[int, CompanyWeights] = {}
+        self._profiles: Dict[int, ProfileWeights] = {}
+        self.hits = 0
+        self.misses = 0
+
+    # -----------------------------
+    # Cache
+    # -----------------------------
+    def _cached(self, cache: dict, key: int):
+        with self._lock:
+            entry = cache.get(key)
+            if entry is not None and time.monotonic() - entry.loaded_at < WEIGHT_CACHE_TTL_SECONDS:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def _store(self, cache: dict, key: int, entry):
+        with self._lock:
+            if len(cache) >= WEIGHT_CACHE_MAX_COMPANIES and key not in cache:
+                cache.pop(next(iter(cache)))  # oldest insert
+            cache[key] = entry
+        return entry
+
+    def invalidate(self, company_id: Optional[int] = None):
+        with self._lock:
+            if company_id is None:
+                self._companies.clear()
+            else:
+                self._companies.pop(company_id, None)
+
+    def invalidate_profile(self, profile_id: Optional[int] = None):
+        with self._lock:
+            if profile_id is None:
+                self._profiles.clear()
+            else:
+                self._profiles.pop(profile_id, None)
+
+    # -----------------------------
+    # Loading (sync engine path / async routes)
+    # -----------------------------
+    def company(self, db: Session, company_id: int) -> CompanyWeights:
+        entry = self._cached(self._companies, company_id)
+        if entry is None:
+            entry = self._store(self._companies, company_id, _build(
+                db.execute(_kpi_stmt(company_id)).all(),
+                db.execute(_pillar_stmt(company_id)).all(),
+                db.scalar(_assignment_stmt(company_id)),
+                db.execute(_overrides_stmt(company_id)).all(),
+            ))
+        return entry
+
+    async def acompany(self, db: AsyncSession, company_id: int) -> CompanyWeights:
+        entry = self._cached(self._companies, company_id)
+        if entry is None:
+            entry = self._store(self._companies, company_id, _build(
+                (await db.execute(_kpi_stmt(company_id))).all(),
+                (await db.execute(_pillar_stmt(company_id))).all(),
+                await db.scalar(_assignment_stmt(company_id)),
+                (await db.execute(_overrides_stmt(company_id))).all(),
+            ))
+        return entry
+
+    def profile(self, db: Session, profile_id: Optional[int]) -> Optional[ProfileWeights]:
+        if profile_id is None:
+            return None
+        entry = self._cached(self._profiles, profile_id)
+        if entry is None:
+            rows = db.execute(_profile_stmt(profile_id)).all()
+            entry = self._store(self._profiles, profile_id, ProfileWeights(_by_kind(rows)))
+        return entry
+
+    async def aprofile(self, db: AsyncSession, profile_id: Optional[int]) -> Optional[ProfileWeights]:
+        if profile_id is None:
+            return None
+        entry = self._cached(self._profiles, profile_id)
+        if entry is None:
+            rows = (await db.execute(_profile_stmt(profile_id))).all()
+            entry = self._store(self._profiles, profile_id, ProfileWeights(_by_kind(rows)))
+        return entry
+
+    # -----------------------------
+    # Resolution
+    # -----------------------------
+    @staticmethod
+    def _resolve(entry: CompanyWeights, profile: Optional[ProfileWeights], period) -> ResolvedWeights:
+        period = _as_date(period)
+        resolved = {"profile_id": entry.profile_id}
+        for kind, index in (("kpi", entry.kpi), ("pillar", entry.pillar)):
+            own = index.at(period)
+            if own is not None:
+                weights, source, valid_from = dict(own.weights), "company", own.valid_from
+            elif profile is not None:
+                weights = {**profile.weights.get(kind, {}), **entry.overrides.get(kind, {})}
+                source, valid_from = "profile", None
+            else:
+                weights, source, valid_from = {}, None, None
+            resolved.update({kind: weights, f"{kind}_source": source, f"{kind}_valid_from": valid_from})
+        return ResolvedWeights(**resolved)
+
+    def resolve(self, db: Session, company_id: int, period) -> ResolvedWeights:
+        """Weights in force for a company on `period` (sync session)."""
+        entry = self.company(db, company_id)
+        return self._resolve(entry, self.profile(db, entry.profile_id), period)
+
+    async def aresolve(self, db: AsyncSession, company_id: int, period) -> ResolvedWeights:
+        """Weights in force for a company on `period` (async session)."""
+        entry = await self.acompany(db, company_id)
+        return self._resolve(entry, await self.aprofile(db, entry.profile_id), period)
+
+
+weight_resolver = WeightResolver()
+
+# Writes on any worker evict here (see backend.services.cache_bus)
+cache_bus.register(WEIGHTS, weight_resolver.invalidate)
+cache_bus.register(WEIGHT_PROFILE, weight_resolver.invalidate_profile)
@@ -0,0 +1,99 @@
+"""
+Portfolio-wide weight validation.
+
+One grouped query computes, per company and pillar, the pillar weight and
+the sum of KPI weights in force on a period (KPI pillar taken from
+esg_kpis), for a list of companies or all of them. Weights are the
+effective ones (own set, else profile + overrides). Python only folds the
+rows into the per-company report.
+"""
+from datetime import date
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from backend.models.esg_scorecard import ESGKpi
+from backend.services.weight_resolver import effective_weights
+
+TOLERANCE = 0.001
+
+
+def weight_totals_stmt(period: date, company_ids: Optional[Iterable[int]] = None):
+    ids = list(company_ids) if company_ids is not None else None
+    kpi_weights = effective_weights("kpi", period, ids)
+    pillar_weights = effective_weights("pillar", period, ids)
+
+    kpi = (
+        select(
+            kpi_weights.c.company_id,
+            ESGKpi.pillar,
+            func.sum(kpi_weights.c.weight).label("kpi_total"),
+            func.count().label("kpi_count"),
+        )
+        .join(ESGKpi, ESGKpi.kpi_code == kpi_weights.c.code)
+        .group_by(kpi_weights.c.company_id, ESGKpi.pillar)
+        .cte("kpi")
+    )
+    pillar = (
+        select(
+            pillar_weights.c.company_id,
+            pillar_weights.c.code.label("pillar"),
+            func.sum(pillar_weights.c.weight).label("pillar_weight"),
+        )
+        .group_by(pillar_weights.c.company_id, pillar_weights.c.code)
+        .cte("pillar")
+    )
+
+    company_id = func.coalesce(pillar.c.company_id, kpi.c.company_id).label("company_id")
+    return (
+        select(
+            company_id,
+            func.coalesce(pillar.c.pillar, kpi.c.pillar).label("pillar"),
+            pillar.c.pillar_weight,
+            func.sum(pillar.c.pillar_weight).over(partition_by=company_id).label("pillar_total"),
+            kpi.c.kpi_total,
+            kpi.c.kpi_count,
+        )
+        .select_from(
+            pillar.join(
+                kpi,
+                (kpi.c.company_id == pillar.c.company_id) & (kpi.c.pillar == pillar.c.pillar),
+                full=True,
+            )
+        )
+        .order_by(company_id)
+    )
+
+
+def _empty_report() -> dict:
+    return {
+        "pillar_weights": {"total": 0.0, "details": {}},
+        "kpi_weights": {"totals": {}},
+        "validations": {"pillar_sum_ok": False, "kpi_sum_ok": False},
+    }
+
+
+def check_weight_totals(db: Session, period: date, company_ids: Optional[Iterable[int]] = None) -> Dict[int, dict]:
+    """{company_id: weights-check report}; company_ids=None checks every company with weights."""
+    ids = list(company_ids) if company_ids is not None else None
+    reports: Dict[int, dict] = {cid: _empty_report() for cid in ids or []}
+
+    for row in db.execute(weight_totals_stmt(period, ids)):
+        report = reports.setdefault(row.company_id, _empty_report())
+        report["pillar_weights"]["total"] = float(row.pillar_total or 0.0)
+        if row.pillar_weight is not None:
+            report["pillar_weights"]["details"][row.pillar] = float(row.pillar_weight)
+            report["kpi_weights"]["totals"][row.pillar] = float(row.kpi_total or 0.0)
+        elif row.kpi_total is not None:
+            # KPI weights for a pillar with no pillar weight: reported, not validated
+            report["kpi_weights"]["totals"][row.pillar] = float(row.kpi_total)
+
+    for report in reports.values():
+        pillars = report["pillar_weights"]["details"]
+        totals = report["kpi_weights"]["totals"]
+        report["validations"] = {
+            "pillar_sum_ok": bool(pillars) and abs(report["pillar_weights"]["total"] - 100.0) < TOLERANCE,
+            "kpi_sum_ok": all(abs(totals.get(p, 0.0) - 100.0) <= TOLERANCE for p in pillars),
+        }
+    return reports
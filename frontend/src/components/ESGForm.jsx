@@ -50,6 +50,17 @@ const API = {
   historic: `${API_BASE}/form-submissions/historic`,
 };
 
+// Read-your-writes with read replicas: reads shortly after a save go to the
+// primary (X-Read-Primary; matches DB_READ_YOUR_WRITES_SECONDS on the backend).
+// Credentials let the backend's sticky cookie work too when the API is same-site.
+const READ_YOUR_WRITES_MS = 5000;
+let lastSavedAt = 0;
+const readConfig = (params) => ({
+  params,
+  withCredentials: true,
+  headers: Date.now() - lastSavedAt < READ_YOUR_WRITES_MS ? { "X-Read-Primary": "true" } : {},
+});
+
 const themeIcon = (theme) => {
   const map = {
     Carbon: <WhatshotIcon />,
@@ -182,7 +193,7 @@ export default function ESGForm({ schema }) {
   const fetchCurrentData = useCallback(async () => {
     try {
       setLoading(true);
-      const { data } = await axios.get(API.current, { params: { company_id: 1, is_current: true } });
+      const { data } = await axios.get(API.current, readConfig({ company_id: 1, is_current: true }));
       const arr = Array.isArray(data) ? data : data?.data || [];
       const map = {};
       arr.forEach((r) => {
@@ -202,7 +213,7 @@ export default function ESGForm({ schema }) {
   const fetchHistoricData = useCallback(async () => {
     try {
       setLoading(true);
-      const { data } = await axios.get(API.historic, { params: { company_id: 1, is_current: false } });
+      const { data } = await axios.get(API.historic, readConfig({ company_id: 1, is_current: false }));
       const arr = Array.isArray(data) ? data : data?.data || [];
       const map = {};
       arr.forEach((r) => {
@@ -240,7 +251,8 @@ export default function ESGForm({ schema }) {
       }
 
       // ✅ Send list (we'll fix backend to accept it)
-      await axios.post(`${API.submit}batch`, payload);
+      await axios.post(`${API.submit}batch`, payload, { withCredentials: true });
+      lastSavedAt = Date.now();
       setSnackbar({ open: true, severity: "success", msg: "Form saved successfully." });
     } catch (e) {
       console.error("Error submitting:", e);